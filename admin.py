@@ -1,10 +1,10 @@
 from django.contrib import admin
 
-from .models import RentalItem, Rental, RentalBlackout
+from .models import RentalItem, Rental, RentalAllocation, RentalBlackout, RentalUnit, SeasonalRate
 
 @admin.register(RentalItem)
 class RentalItemAdmin(admin.ModelAdmin):
-    list_display = ['name', 'code', 'daily_rate', 'is_available', 'created_at']
+    list_display = ['name', 'code', 'daily_rate', 'weekly_rate', 'monthly_rate', 'is_available', 'created_at']
     search_fields = ['name', 'code', 'description']
     readonly_fields = ['created_at', 'updated_at']
 
@@ -19,3 +19,17 @@ class RentalBlackoutAdmin(admin.ModelAdmin):
     list_display = ['item', 'start_date', 'end_date', 'reason', 'created_at']
     readonly_fields = ['created_at', 'updated_at']
 
+@admin.register(SeasonalRate)
+class SeasonalRateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'item', 'start_date', 'end_date', 'multiplier', 'created_at']
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(RentalUnit)
+class RentalUnitAdmin(admin.ModelAdmin):
+    list_display = ['serial', 'item', 'condition', 'is_active', 'created_at']
+    search_fields = ['serial', 'notes']
+    readonly_fields = ['created_at', 'updated_at']
+
+@admin.register(RentalAllocation)
+class RentalAllocationAdmin(admin.ModelAdmin):
+    list_display = ['rental', 'unit']
@@ -11,15 +11,16 @@ CONTEXT = """
 **RentalItem**
 - `name` (str, required), `code` (str, optional), `description` (text)
 - `daily_rate` (decimal — price per day), `category` (str, optional), `location` (str, optional)
+- `weekly_rate`, `monthly_rate` (decimal, 0 = tier not offered — price of a full 7 / 30 days)
 - `quantity_total` (int, default 1 — total units available for this item)
 - `is_available` (bool, default True), `is_active` (bool, default True)
 
 **Rental**
-- `reference` (str, required), `item` (FK → RentalItem, CASCADE)
+- `reference` (str, unique per hub — generated as R-000001, R-000002... when not given), `item` (FK → RentalItem, CASCADE)
 - `customer_name` (str, required), `customer` (FK → customers.Customer, SET_NULL, nullable)
 - `status` choices: reserved | active | returned | overdue | cancelled (default: reserved)
 - `start_date`, `end_date` (dates, required)
-- `total` (decimal — calculated: days × daily_rate)
+- `total` (decimal — calculated server-side by `rentals.pricing`: inclusive days priced at monthly/weekly/daily tiers, scaled by SeasonalRate multipliers; never set by hand)
 - `deposit_amount` (decimal), `deposit_paid` (bool), `deposit_returned` (bool)
 - `condition_out` (text — item condition at checkout), `condition_in` (text — item condition at return)
 - `notes`
@@ -29,18 +30,36 @@ CONTEXT = """
 - `start_date`, `end_date` (dates), `reason` (str)
 - Marks periods when an item is unavailable (maintenance, reserved, etc.).
 
+**SeasonalRate**
+- `item` (FK → RentalItem, nullable — empty applies to every item of the hub)
+- `name`, `start_date`, `end_date`, `multiplier` (decimal, e.g. 1.25 for +25% in high season)
+
 ### Key Flows
 
 1. **Add item**: create RentalItem with name, daily_rate, and quantity_total.
 2. **Create reservation**: create Rental with status='reserved', set start_date/end_date, fill customer info.
 3. **Checkout**: update status to 'active', record condition_out, mark deposit_paid if collected.
 4. **Return**: update status to 'returned', record condition_in, set deposit_returned if refunded.
-5. **Overdue**: update status to 'overdue' if end_date has passed and item not returned.
+5. **Overdue**: set automatically by the `rentals_mark_overdue` command for active rentals whose end_date has passed; no manual update needed.
 6. **Block availability**: create RentalBlackout to prevent bookings during a period.
 
 ### Relationships
 
 - Rental → RentalItem (CASCADE), Rental → customers.Customer (SET_NULL).
 - RentalBlackout → RentalItem (CASCADE).
-- No automatic availability calculation — manage is_available on RentalItem manually.
+- Free units per item and date range are computed from overlapping reserved/active/overdue rentals
+  and blackouts (see `rentals.availability`); a blackout blocks every unit of the item.
+- `is_available` on RentalItem is a manual on/off switch and is not derived from bookings.
+
+### Querying
+
+- List tools return one page (`limit`, max 100) plus `next_cursor`; pass it back as `cursor` for more.
+- For an overview (rentals per status, revenue this month, deposits held, overdue value) call
+  `get_rentals_summary`; it is computed live in two queries.
+- For questions about totals or breakdowns use `group_by` (e.g. rentals by status, item or month)
+  instead of paging through every row.
+- "Do we have enough X for the coming weeks?" → `get_demand_forecast` (expected units out per day per
+  week vs units available, per category and location; refreshed weekly by `rentals_forecast`).
+- "What can I rent out from A to B?" → `find_available_items` (free units per item, computed
+  server-side from the occupancy grids); never work availability out from listed rentals.
 """
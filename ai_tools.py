@@ -1,28 +1,152 @@
 """AI tools for the Rentals module."""
 from assistant.tools import AssistantTool, register_tool
 
+# Rows returned per call; larger result sets are paged with ``cursor``.
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Groups returned by the ``group_by`` summary modes.
+MAX_GROUPS = 50
+
+# Accepted ``group_by`` values; the schema enum is only advisory.
+ITEM_GROUPS = ('category', 'location', 'is_available')
+RENTAL_GROUPS = ('status', 'item', 'month', 'deposit_paid')
+
+
+def _hub_id(request):
+    return request.session.get('hub_id')
+
+
+def _limit(args):
+    try:
+        limit = int(args.get('limit') or DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        limit = DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _jsonable(row):
+    import datetime
+    import uuid
+    from decimal import Decimal
+    return {
+        key: str(value) if isinstance(value, (Decimal, uuid.UUID, datetime.date)) else value
+        for key, value in row.items()
+    }
+
+
+def _page(qs, fields, sort_field, args, descending=False):
+    """One keyset page of ``qs`` projected to ``fields``, plus the next cursor."""
+    from rentals.pagination import keyset_page
+    page = keyset_page(
+        qs.values('id', *fields), sort_field, descending=descending,
+        after=args.get('cursor'), per_page=_limit(args),
+    )
+    return [_jsonable(row) for row in page], page.next_cursor
+
+
+def _group_error(value, allowed):
+    return {"error": f"group_by must be one of: {', '.join(allowed)} (got {value!r})"}
+
+
+def _summary(qs, group, **sums):
+    """Row counts (and ``sums``) per ``group`` expression, largest groups first."""
+    from django.db.models import Count, F, Sum
+    if isinstance(group, str):
+        group = F(group)
+    rows = (
+        qs.annotate(group=group).values('group')
+        .annotate(count=Count('id'), **{name: Sum(field) for name, field in sums.items()})
+        .order_by('-count', 'group')[:MAX_GROUPS]
+    )
+    return [_jsonable(row) for row in rows]
+
 
 @register_tool
 class ListRentalItems(AssistantTool):
     name = "list_rental_items"
-    description = "List items available for rent."
+    description = (
+        "List items available for rent, a page at a time (pass next_cursor back as cursor), "
+        "or summarise them with group_by instead of listing rows."
+    )
     module_id = "rentals"
     required_permission = "rentals.view_rentalitem"
     parameters = {
         "type": "object",
-        "properties": {"is_available": {"type": "boolean"}, "category": {"type": "string"}},
+        "properties": {
+            "is_available": {"type": "boolean"}, "category": {"type": "string"},
+            "search": {"type": "string", "description": "Prefix search on name, code and description (best matches only, not paged)"},
+            "group_by": {"type": "string", "enum": list(ITEM_GROUPS), "description": "Return item counts and units per group instead of rows"},
+            "limit": {"type": "integer", "description": f"Rows per page (max {MAX_LIMIT})"},
+            "cursor": {"type": "string", "description": "next_cursor from the previous page"},
+        },
         "required": [],
         "additionalProperties": False,
     }
+    fields = ('name', 'code', 'daily_rate', 'is_available', 'category', 'quantity_total')
 
     def execute(self, args, request):
         from rentals.models import RentalItem
-        qs = RentalItem.objects.filter(is_active=True)
+        qs = RentalItem.objects.filter(hub_id=_hub_id(request), is_active=True)
         if 'is_available' in args:
             qs = qs.filter(is_available=args['is_available'])
         if args.get('category'):
             qs = qs.filter(category__icontains=args['category'])
-        return {"items": [{"id": str(i.id), "name": i.name, "code": i.code, "daily_rate": str(i.daily_rate), "is_available": i.is_available, "category": i.category, "quantity_total": i.quantity_total} for i in qs]}
+        if args.get('search'):
+            from rentals.search import search_rental_items
+            qs = search_rental_items(qs, args['search'])
+        if args.get('group_by'):
+            if args['group_by'] not in ITEM_GROUPS:
+                return _group_error(args['group_by'], ITEM_GROUPS)
+            return {"groups": _summary(qs, args['group_by'], units='quantity_total')}
+        if args.get('search'):
+            rows = qs.order_by('-search_rank', 'name').values('id', *self.fields)[:_limit(args)]
+            return {"items": [_jsonable(row) for row in rows], "next_cursor": None}
+        rows, cursor = _page(qs, self.fields, 'name', args)
+        return {"items": rows, "next_cursor": cursor}
+
+
+@register_tool
+class FindAvailableItems(AssistantTool):
+    name = "find_available_items"
+    description = (
+        "Find items that can be rented out for every day between start_date and end_date, "
+        "optionally by category, location and number of units. Returns ranked candidates with "
+        "their free units; total_free tells whether a multi-unit request can be split across items."
+    )
+    module_id = "rentals"
+    required_permission = "rentals.view_rentalitem"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "start_date": {"type": "string", "description": "YYYY-MM-DD"},
+            "end_date": {"type": "string", "description": "YYYY-MM-DD (inclusive)"},
+            "quantity": {"type": "integer", "description": "Units needed (default 1)"},
+            "category": {"type": "string", "description": "Exact category name"},
+            "location": {"type": "string"},
+            "limit": {"type": "integer", "description": f"Candidates to return (max {MAX_LIMIT})"},
+        },
+        "required": ["start_date", "end_date"],
+        "additionalProperties": False,
+    }
+
+    def execute(self, args, request):
+        import datetime
+        from rentals.occupancy import GRID_DAYS, find_available
+        try:
+            start_date = datetime.date.fromisoformat(args['start_date'])
+            end_date = datetime.date.fromisoformat(args['end_date'])
+        except ValueError:
+            return {"error": "Dates must be YYYY-MM-DD"}
+        if end_date < start_date:
+            return {"error": "end_date must not be before start_date"}
+        if (end_date - start_date).days >= GRID_DAYS:
+            return {"error": f"Search windows are limited to {GRID_DAYS} days"}
+        candidates, total_free = find_available(
+            _hub_id(request), start_date, end_date, quantity=max(int(args.get('quantity') or 1), 1),
+            category=args.get('category'), location=args.get('location'), limit=_limit(args),
+        )
+        return {"items": [_jsonable(c) for c in candidates], "total_free": total_free}
 
 
 @register_tool
@@ -36,8 +160,8 @@ class CreateRentalItem(AssistantTool):
         "type": "object",
         "properties": {
             "name": {"type": "string"}, "code": {"type": "string"}, "description": {"type": "string"},
-            "daily_rate": {"type": "string"}, "category": {"type": "string"},
-            "quantity_total": {"type": "integer"},
+            "daily_rate": {"type": "string"}, "weekly_rate": {"type": "string"}, "monthly_rate": {"type": "string"},
+            "category": {"type": "string"}, "quantity_total": {"type": "integer"},
         },
         "required": ["name", "daily_rate"],
         "additionalProperties": False,
@@ -46,30 +170,125 @@ class CreateRentalItem(AssistantTool):
     def execute(self, args, request):
         from decimal import Decimal
         from rentals.models import RentalItem
-        i = RentalItem.objects.create(name=args['name'], code=args.get('code', ''), description=args.get('description', ''), daily_rate=Decimal(args['daily_rate']), category=args.get('category', ''), quantity_total=args.get('quantity_total', 1))
+        i = RentalItem.objects.create(hub_id=_hub_id(request), name=args['name'], code=args.get('code', ''), description=args.get('description', ''), daily_rate=Decimal(args['daily_rate']), weekly_rate=Decimal(args.get('weekly_rate') or '0'), monthly_rate=Decimal(args.get('monthly_rate') or '0'), category=args.get('category', ''), quantity_total=args.get('quantity_total', 1))
         return {"id": str(i.id), "name": i.name, "created": True}
 
 
 @register_tool
 class ListRentals(AssistantTool):
     name = "list_rentals"
-    description = "List rental agreements."
+    description = (
+        "List rental agreements, newest first, a page at a time (pass next_cursor back as cursor), "
+        "or summarise them with group_by (counts and revenue per group) instead of listing rows."
+    )
     module_id = "rentals"
     required_permission = "rentals.view_rental"
     parameters = {
         "type": "object",
-        "properties": {"status": {"type": "string", "description": "reserved, active, returned, overdue, cancelled"}, "limit": {"type": "integer"}},
+        "properties": {
+            "status": {"type": "string", "description": "reserved, active, returned, overdue, cancelled"},
+            "item_id": {"type": "string"},
+            "start_from": {"type": "string", "description": "Only rentals starting on or after this date (YYYY-MM-DD)"},
+            "start_to": {"type": "string", "description": "Only rentals starting on or before this date (YYYY-MM-DD)"},
+            "search": {"type": "string", "description": "Prefix search on reference, customer name and notes (best matches only, not paged)"},
+            "group_by": {"type": "string", "enum": list(RENTAL_GROUPS), "description": "Return counts and total revenue per group instead of rows"},
+            "limit": {"type": "integer", "description": f"Rows per page (max {MAX_LIMIT})"},
+            "cursor": {"type": "string", "description": "next_cursor from the previous page"},
+        },
         "required": [],
         "additionalProperties": False,
     }
+    fields = ('reference', 'customer_name', 'status', 'start_date', 'end_date', 'total')
 
     def execute(self, args, request):
+        from django.db.models import F
+        from django.db.models.functions import TruncMonth
         from rentals.models import Rental
-        qs = Rental.objects.select_related('item', 'customer').all()
+        qs = Rental.objects.filter(hub_id=_hub_id(request))
         if args.get('status'):
             qs = qs.filter(status=args['status'])
-        limit = args.get('limit', 20)
-        return {"rentals": [{"id": str(r.id), "reference": r.reference, "item": r.item.name if r.item else None, "customer_name": r.customer_name, "status": r.status, "start_date": str(r.start_date), "end_date": str(r.end_date), "total": str(r.total)} for r in qs.order_by('-start_date')[:limit]]}
+        if args.get('item_id'):
+            qs = qs.filter(item_id=args['item_id'])
+        if args.get('start_from'):
+            qs = qs.filter(start_date__gte=args['start_from'])
+        if args.get('start_to'):
+            qs = qs.filter(start_date__lte=args['start_to'])
+        if args.get('search'):
+            from rentals.search import search_rentals
+            qs = search_rentals(qs, args['search'])
+        if args.get('group_by'):
+            if args['group_by'] not in RENTAL_GROUPS:
+                return _group_error(args['group_by'], RENTAL_GROUPS)
+            group = {'item': 'item__name', 'month': TruncMonth('start_date')}.get(args['group_by'], args['group_by'])
+            return {"groups": _summary(qs, group, revenue='total')}
+        qs = qs.annotate(item_name=F('item__name'))
+        fields = (*self.fields, 'item_name')
+        if args.get('search'):
+            rows = qs.order_by('-search_rank', '-start_date').values('id', *fields)[:_limit(args)]
+            return {"rentals": [_jsonable(row) for row in rows], "next_cursor": None}
+        rows, cursor = _page(qs, fields, 'start_date', args, descending=True)
+        return {"rentals": rows, "next_cursor": cursor}
+
+
+@register_tool
+class GetRentalsSummary(AssistantTool):
+    name = "get_rentals_summary"
+    description = (
+        "Current rentals overview of the hub: rentals per status, revenue (all time and this month), "
+        "deposits held, overdue value, item counts and units out. Use it for 'how is the business doing' "
+        "questions instead of listing rentals."
+    )
+    module_id = "rentals"
+    required_permission = "rentals.view_rental"
+    parameters = {
+        "type": "object",
+        "properties": {},
+        "required": [],
+        "additionalProperties": False,
+    }
+
+    def execute(self, args, request):
+        from rentals.metrics import dashboard_summary
+        summary = dashboard_summary(_hub_id(request))
+        summary['status_counts'] = _jsonable(summary['status_counts'])
+        return _jsonable(summary)
+
+
+@register_tool
+class GetDemandForecast(AssistantTool):
+    name = "get_demand_forecast"
+    description = (
+        "Expected units out per day for each of the coming weeks, per item category and location, "
+        "next to the units available (precomputed weekly). Use it to judge whether stock or "
+        "quantity_total should change."
+    )
+    module_id = "rentals"
+    required_permission = "rentals.view_rentalitem"
+    parameters = {
+        "type": "object",
+        "properties": {
+            "category": {"type": "string", "description": "Exact category name"},
+            "location": {"type": "string"},
+        },
+        "required": [],
+        "additionalProperties": False,
+    }
+
+    def execute(self, args, request):
+        from django.utils import timezone
+        from rentals.forecasting import pressure, week_start
+        from rentals.models import DemandForecast
+        hub_id = _hub_id(request)
+        qs = DemandForecast.objects.filter(hub_id=hub_id, week_start__gte=week_start(timezone.localdate()))
+        if args.get('category') is not None:
+            qs = qs.filter(category=args['category'])
+        if args.get('location') is not None:
+            qs = qs.filter(location=args['location'])
+        rows = qs.values('category', 'location', 'week_start', 'expected_units', 'capacity')[:MAX_LIMIT]
+        return {
+            "forecast": [_jsonable(row) for row in rows],
+            "busiest": [_jsonable(row) for row in pressure(hub_id)],
+        }
 
 
 @register_tool
@@ -92,14 +311,21 @@ class CreateRental(AssistantTool):
 
     def execute(self, args, request):
         from decimal import Decimal
-        from rentals.models import Rental
-        r = Rental.objects.create(
-            item_id=args['item_id'], customer_name=args['customer_name'],
+        from rentals.booking import BookingError, save_rental
+        from rentals.models import Rental, RentalItem
+        if not RentalItem.objects.filter(hub_id=_hub_id(request), id=args['item_id']).exists():
+            return {"error": "Rental item not found"}
+        r = Rental(
+            hub_id=_hub_id(request), item_id=args['item_id'], customer_name=args['customer_name'],
             start_date=args['start_date'], end_date=args['end_date'],
-            deposit_amount=Decimal(args['deposit_amount']) if args.get('deposit_amount') else None,
+            deposit_amount=Decimal(args['deposit_amount']) if args.get('deposit_amount') else Decimal('0'),
             notes=args.get('notes', ''),
         )
-        return {"id": str(r.id), "reference": r.reference, "created": True}
+        try:
+            save_rental(r, reprice=True)
+        except BookingError as e:
+            return {"error": str(e)}
+        return {"id": str(r.id), "reference": r.reference, "total": str(r.total), "created": True}
 
 
 @register_tool
@@ -127,9 +353,10 @@ class UpdateRental(AssistantTool):
 
     def execute(self, args, request):
         from decimal import Decimal
+        from rentals.booking import BookingError, save_rental
         from rentals.models import Rental
         try:
-            r = Rental.objects.get(id=args['rental_id'])
+            r = Rental.objects.get(hub_id=_hub_id(request), id=args['rental_id'])
         except Rental.DoesNotExist:
             return {"error": "Rental not found"}
         for field in ('status', 'start_date', 'end_date', 'customer_name', 'deposit_paid', 'deposit_returned', 'condition_out', 'condition_in', 'notes'):
@@ -137,8 +364,11 @@ class UpdateRental(AssistantTool):
                 setattr(r, field, args[field])
         if 'deposit_amount' in args:
             r.deposit_amount = Decimal(str(args['deposit_amount']))
-        r.save()
-        return {"id": str(r.id), "reference": r.reference, "status": r.status, "updated": True}
+        try:
+            save_rental(r, reprice=True)
+        except BookingError as e:
+            return {"error": str(e)}
+        return {"id": str(r.id), "reference": r.reference, "status": r.status, "total": str(r.total), "updated": True}
 
 
 @register_tool
@@ -158,7 +388,7 @@ class DeleteRental(AssistantTool):
     def execute(self, args, request):
         from rentals.models import Rental
         try:
-            r = Rental.objects.get(id=args['rental_id'])
+            r = Rental.objects.get(hub_id=_hub_id(request), id=args['rental_id'])
         except Rental.DoesNotExist:
             return {"error": "Rental not found"}
         r.delete()
@@ -0,0 +1,199 @@
+"""
+Assignment of physical units (``RentalUnit``) to rentals.
+
+``quantity_total`` is still what limits bookings (see booking.py). This
+module decides which unit each live rental takes. An item with no units
+recorded is never allocated.
+
+Each unit's bookings are kept as two sorted lists of day ordinals, starts
+and ends. A unit's bookings never overlap, so both lists have the same
+order, and one ``bisect`` finds the bookings on either side of a new one.
+That tells whether the new booking fits and how many free days it leaves
+before and after. :func:`place` puts the longest bookings first and gives
+each one the unit where it leaves the fewest free days (best fit). Empty
+units are kept for bookings that would not fit anywhere else, and short
+gaps get filled instead of spreading bookings over every unit.
+
+:func:`allocate` places a batch of rentals with one query for the units'
+existing bookings and one insert. :func:`reallocate` repacks an item's
+reservations over a window, e.g. after a unit is retired. Rentals that do
+not fit any unit are returned unassigned rather than refused.
+
+Bulk actions (bulk_actions.py) and soft deletes change rentals without
+calling :func:`sync_rental`. Allocations are always read together with their
+rental's current status and dates, so a cancelled, returned or deleted
+rental no longer holds its unit. Changing dates is different: a unit must
+never hold two overlapping bookings, so every path that moves dates
+(``save_rental`` and the bulk extension) allocates again in the same
+transaction.
+"""
+import datetime
+from bisect import bisect_right, insort
+
+from django.db import transaction
+
+from .availability import BLOCKING_STATUSES
+from .models import RentalAllocation, RentalItem, RentalUnit, Rental
+
+# Slack of an open side (no booking before or after).
+FAR = 1 << 30
+
+# Bookings read on each side of a window to measure the gaps next to it.
+SCHEDULE_MARGIN = datetime.timedelta(days=90)
+
+
+class UnitSchedule:
+    """The bookings of one unit as sorted start and end day ordinals."""
+
+    __slots__ = ('unit', 'starts', 'ends')
+
+    def __init__(self, unit, intervals=()):
+        self.unit = unit
+        intervals = sorted(intervals)
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+
+    def slack(self, start, end):
+        """Free days left on both sides of ``start..end``, or None when it overlaps a booking."""
+        i = bisect_right(self.starts, start)
+        before = start - self.ends[i - 1] - 1 if i else FAR
+        after = self.starts[i] - end - 1 if i < len(self.starts) else FAR
+        if before < 0 or after < 0:
+            return None
+        return before + after
+
+    def add(self, start, end):
+        insort(self.starts, start)
+        insort(self.ends, end)
+
+
+def place(schedules, bookings):
+    """
+    Best-fit ``bookings`` (``(key, start, end)`` with day ordinals) into ``schedules``.
+
+    Returns ``({key: schedule}, [unplaced keys])``. Ties go to the earlier
+    schedule, so results are stable for the same input.
+    """
+    placed, unplaced = {}, []
+    for key, start, end in sorted(bookings, key=lambda booking: (booking[1] - booking[2], booking[1])):
+        best, best_slack = None, None
+        for schedule in schedules:
+            slack = schedule.slack(start, end)
+            if slack is not None and (best_slack is None or slack < best_slack):
+                best, best_slack = schedule, slack
+                if not slack:
+                    break
+        if best is None:
+            unplaced.append(key)
+            continue
+        best.add(start, end)
+        placed[key] = best
+    return placed, unplaced
+
+
+def load_schedules(item_id, start_date, end_date, exclude_rental_ids=()):
+    """
+    Schedules of the item's active units with their bookings around ``start_date..end_date``.
+
+    Two queries: the units, then their bookings that come within
+    ``SCHEDULE_MARGIN`` of the window.
+    """
+    units = list(RentalUnit.objects.filter(item_id=item_id, is_active=True).order_by('serial'))
+    if not units:
+        return []
+    rows = RentalAllocation.objects.filter(
+        unit__in=units, rental__is_deleted=False, rental__status__in=BLOCKING_STATUSES,
+        rental__start_date__lte=end_date + SCHEDULE_MARGIN, rental__end_date__gte=start_date - SCHEDULE_MARGIN,
+    ).exclude(rental_id__in=list(exclude_rental_ids)).values_list(
+        'unit_id', 'rental__start_date', 'rental__end_date',
+    )
+    intervals = {}
+    for unit_id, start, end in rows:
+        intervals.setdefault(unit_id, []).append((start.toordinal(), end.toordinal()))
+    return [UnitSchedule(unit, intervals.get(unit.pk, ())) for unit in units]
+
+
+def allocate(item_id, rentals, keep_units=False):
+    """
+    Assign units of one item to ``rentals`` in one pass.
+
+    Earlier allocations of these rentals are replaced. With ``keep_units``
+    a rental stays on its current unit when its dates still fit there (for
+    rentals already out with the customer). Returns the rentals that fit no
+    unit (they are left unassigned). Call inside the transaction that holds
+    the item lock.
+    """
+    rentals = list(rentals)
+    if not rentals:
+        return []
+    ids = [rental.pk for rental in rentals]
+    current = {}
+    if keep_units:
+        current = dict(RentalAllocation.objects.filter(rental_id__in=ids).values_list('rental_id', 'unit_id'))
+    schedules = load_schedules(
+        item_id, min(rental.start_date for rental in rentals), max(rental.end_date for rental in rentals),
+        exclude_rental_ids=ids,
+    )
+    by_unit = {schedule.unit.pk: schedule for schedule in schedules}
+    bookings, kept = [], set()
+    for rental in rentals:
+        start, end = rental.start_date.toordinal(), rental.end_date.toordinal()
+        schedule = by_unit.get(current.get(rental.pk))
+        if schedule is not None and schedule.slack(start, end) is not None:
+            schedule.add(start, end)
+            kept.add(rental.pk)
+        else:
+            bookings.append((rental.pk, start, end))
+    RentalAllocation.objects.filter(rental_id__in=[pk for pk in ids if pk not in kept]).delete()
+    if not schedules:
+        return rentals
+    by_id = {rental.pk: rental for rental in rentals}
+    placed, unplaced = place(schedules, bookings)
+    RentalAllocation.objects.bulk_create([
+        RentalAllocation(hub_id=by_id[pk].hub_id, rental_id=pk, unit=schedule.unit)
+        for pk, schedule in placed.items()
+    ], batch_size=1000)
+    return [by_id[pk] for pk in unplaced]
+
+
+def reallocate(item_id, start_date, end_date):
+    """
+    Repack the item's reservations overlapping ``start_date..end_date``.
+
+    Active and overdue rentals keep their units (they are already out).
+    Returns the reservations left without a unit.
+    """
+    with transaction.atomic():
+        list(RentalItem.objects.select_for_update().filter(pk=item_id).values_list('pk', flat=True))
+        reservations = Rental.objects.filter(
+            item_id=item_id, status='reserved', start_date__lte=end_date, end_date__gte=start_date,
+        ).only('pk', 'hub_id', 'start_date', 'end_date')
+        return allocate(item_id, reservations)
+
+
+def sync_rental(rental):
+    """
+    Keep ``rental``'s allocation in step after a save (called by booking.save_rental).
+
+    Cancelled and deleted rentals release their unit; returned rentals keep
+    it as history. A blocking rental keeps its unit while the new dates
+    still fit there and is allocated again otherwise.
+    """
+    if rental.is_deleted or rental.status == 'cancelled':
+        RentalAllocation.objects.filter(rental_id=rental.pk).delete()
+        return None
+    current = RentalAllocation.objects.filter(rental_id=rental.pk).first()
+    if rental.status not in BLOCKING_STATUSES:
+        return current
+    schedules = load_schedules(rental.item_id, rental.start_date, rental.end_date, exclude_rental_ids=[rental.pk])
+    start, end = rental.start_date.toordinal(), rental.end_date.toordinal()
+    if current and any(
+        schedule.unit.pk == current.unit_id and schedule.slack(start, end) is not None for schedule in schedules
+    ):
+        return current
+    if current:
+        current.delete()
+    placed, _ = place(schedules, [(rental.pk, start, end)])
+    if not placed:
+        return None
+    return RentalAllocation.objects.create(hub_id=rental.hub_id, rental_id=rental.pk, unit=placed[rental.pk].unit)
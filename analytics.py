@@ -0,0 +1,188 @@
+"""
+Utilisation and revenue analytics over the rental history.
+
+:func:`report` measures how hard each item, category or location worked
+between two dates (both inclusive). Per group it returns, in unit-days:
+
+- ``unit_days``: units times days in the period;
+- ``blocked_days``: lost to blackouts (a blackout blocks every unit);
+- ``available_days``: ``unit_days`` minus ``blocked_days``;
+- ``rented_days``: covered by reserved, active, returned or overdue
+  rentals, clipped to the period;
+- ``idle_days``: available but not rented;
+
+plus ``utilisation`` (rented / available, in percent), ``revenue`` (each
+rental's total pro-rated to its days inside the period) and
+``revenue_per_unit``.
+
+Rented days and pro-rated revenue are summed per item in the database:
+each rental's days inside the period come from ``Greatest``/``Least`` on
+its dates and :class:`DaysBetween`, so the query returns one row per item
+however many rentals overlap the period. Items and the blackouts
+overlapping the period are read as plain tuples; blackouts are merged per
+item in Python, since overlapping blackouts must count once. Reports are cached
+per hub, period and grouping under the hub's write generation (see
+``fragment_cache``), so any write to the hub drops them.
+
+Rentals archived as history (``archive(history_days=...)``) are no longer
+in the rentals table and are not counted. ``archived_history`` in the
+report is true when any of them ended inside or after the period (one
+more query), so the page can say the figures are incomplete.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import DateField, FloatField, Func, IntegerField, Sum, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Greatest, Least
+
+from . import fragment_cache
+from .models import RentalArchive, RentalItem, Rental, RentalBlackout
+
+ANALYTICS_CACHE_TIMEOUT = 3600
+
+# Rentals that keep a unit out of stock for their dates.
+BOOKED_STATUSES = ('reserved', 'active', 'returned', 'overdue')
+
+GROUPS = ('item', 'category', 'location')
+
+ZERO = Decimal('0')
+
+
+class DaysBetween(Func):
+    """Whole days from the second date expression to the first (``end - start``)."""
+
+    arity = 2
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(', **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='DATEDIFF', template='%(function)s(%(expressions)s)',
+                           arg_joiner=', ', **extra_context)
+
+
+def _cache():
+    return caches[getattr(settings, 'RENTALS_FRAGMENT_CACHE', 'default')]
+
+
+def _merged_days(ranges, period_start, period_end):
+    """Days inside the period covered by any of ``ranges``, counting overlaps once."""
+    days, last = 0, None
+    for start, end in sorted(ranges):
+        start, end = max(start, period_start), min(end, period_end)
+        if last is not None and start <= last:
+            start = last + datetime.timedelta(days=1)
+        if start <= end:
+            days += (end - start).days + 1
+            last = end
+    return days
+
+
+def _pct(part, whole):
+    return round(Decimal(part) * 100 / Decimal(whole), 1) if whole else ZERO
+
+
+def _row(key, label, units, unit_days, blocked, rented, revenue):
+    available = unit_days - blocked
+    revenue = revenue.quantize(Decimal('0.01'))
+    return {
+        'key': key,
+        'label': label,
+        'units': units,
+        'unit_days': unit_days,
+        'blocked_days': blocked,
+        'available_days': available,
+        'rented_days': rented,
+        'idle_days': max(available - rented, 0),
+        'utilisation': _pct(rented, available),
+        'revenue': revenue,
+        'revenue_per_unit': (revenue / units).quantize(Decimal('0.01')) if units else ZERO,
+    }
+
+
+def compute(hub_id, start, end, group='item'):
+    """Uncached :func:`report`."""
+    if group not in GROUPS:
+        raise ValueError(f'group must be one of {", ".join(GROUPS)}')
+    days = (end - start).days + 1
+
+    items = {
+        pk: (name, code, category, location, units)
+        for pk, name, code, category, location, units in RentalItem.objects.filter(hub_id=hub_id)
+        .values_list('pk', 'name', 'code', 'category', 'location', 'quantity_total')
+        .iterator()
+    }
+    inside = DaysBetween(
+        Least('end_date', Value(end, output_field=DateField())),
+        Greatest('start_date', Value(start, output_field=DateField())),
+    ) + 1
+    length = DaysBetween('end_date', 'start_date') + 1
+    rented, revenue = {}, {}
+    rentals = Rental.objects.filter(
+        hub_id=hub_id, status__in=BOOKED_STATUSES, start_date__lte=end, end_date__gte=start,
+    ).values('item_id').annotate(
+        rented=Sum(inside),
+        revenue=Sum(Cast('total', FloatField()) * inside / Cast(length, FloatField())),
+    ).order_by()
+    for row in rentals:
+        rented[row['item_id']] = row['rented'] or 0
+        revenue[row['item_id']] = Decimal(str(row['revenue'] or 0))
+
+    blackouts = defaultdict(list)
+    ranges = RentalBlackout.objects.filter(
+        hub_id=hub_id, start_date__lte=end, end_date__gte=start,
+    ).values_list('item_id', 'start_date', 'end_date')
+    for item_id, blackout_start, blackout_end in ranges.iterator():
+        blackouts[item_id].append((blackout_start, blackout_end))
+
+    # Per item, then rolled up into the requested grouping
+    totals = defaultdict(lambda: [None, 0, 0, 0, 0, ZERO])
+    for pk, (name, code, category, location, units) in items.items():
+        key, label = {
+            'item': (str(pk), f'{code} {name}'.strip()),
+            'category': (category, category),
+            'location': (location, location),
+        }[group]
+        entry = totals[key]
+        entry[0] = label
+        entry[1] += units
+        entry[2] += units * days
+        entry[3] += units * _merged_days(blackouts.get(pk, ()), start, end)
+        entry[4] += rented.get(pk, 0)
+        entry[5] += revenue.get(pk, ZERO)
+
+    archived_history = (
+        RentalArchive.objects.filter(hub_id=hub_id, model='rental', reason='history')
+        .annotate(end_date=KeyTextTransform('end_date', 'data'))
+        .filter(end_date__gte=start.isoformat())
+        .exists()
+    )
+
+    rows = [_row(key, *entry) for key, entry in totals.items()]
+    rows.sort(key=lambda row: (-row['utilisation'], row['label']))
+    sums = [sum(entry[i] for entry in totals.values()) for i in range(1, 5)]
+    overall = _row(None, '', *sums, sum((entry[5] for entry in totals.values()), ZERO))
+    return {
+        'start': start, 'end': end, 'days': days, 'group': group,
+        'rows': rows, 'totals': overall, 'archived_history': archived_history,
+    }
+
+
+def report(hub_id, start, end, group='item'):
+    """Utilisation and revenue per ``group`` between ``start`` and ``end``, cached."""
+    key = f'rentals:analytics:{hub_id}:{fragment_cache.generation(hub_id)}:{group}:{start}:{end}'
+    data = _cache().get(key)
+    if data is None:
+        data = compute(hub_id, start, end, group)
+        _cache().set(key, data, ANALYTICS_CACHE_TIMEOUT)
+    return data
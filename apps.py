@@ -9,4 +9,4 @@ class RentalsConfig(AppConfig):
     verbose_name = _('Rental Management')
 
     def ready(self):
-        pass
+        from . import signals  # noqa: F401
@@ -0,0 +1,125 @@
+"""
+Archival of soft-deleted and historical rows.
+
+Soft-deleted rows stay in the working tables and enlarge every scan and
+index. :func:`archive` moves them, once they have been deleted for a
+number of days, into ``RentalArchive`` (one JSON row per archived record)
+and removes them from the working tables. Optionally it also moves returned
+and cancelled rentals that ended before a retention horizon.
+
+Rows are moved in batches of ``batch_size``, each batch copied and deleted in
+its own transaction, so the job can be stopped and resumed at any point.
+Deleting an item also moves its rentals, blackouts, seasonal rates and
+units, which must go first because of their foreign keys. Unit allocations
+of moved rentals and units are dropped, not archived.
+
+Deletes are plain ``DELETE ... WHERE id IN (...)`` statements rather than
+``QuerySet.delete()``. That avoids loading every row to send the per-row
+delete signals. None of the moved rows count towards availability, so the
+occupancy grids stay valid. The hubs' counters and list caches are
+refreshed once at the end.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import fragment_cache, metrics
+from .models import (
+    OccupancyGrid, RentalAllocation, RentalArchive, RentalItem, Rental, RentalBlackout, RentalUnit, SeasonalRate,
+)
+from .search import unindex_instances
+
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_AFTER_DAYS = 30
+
+# Rentals past the retention horizon in these statuses are archived as history.
+HISTORY_STATUSES = ('returned', 'cancelled')
+
+
+def _delete_rows(model, pks):
+    pk = model._meta.pk
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(pk.column)} IN ({placeholders})',
+            [pk.get_db_prep_value(value, connection) for value in pks],
+        )
+
+
+def _move(model, label, pks, reason):
+    """Copy ``pks`` of ``model`` into the archive and delete them; returns their hub ids."""
+    rows = list(model._base_manager.filter(pk__in=pks).values())
+    RentalArchive.objects.bulk_create([
+        RentalArchive(hub_id=row.get('hub_id'), model=label, object_id=row['id'], reason=reason, data=row)
+        for row in rows
+    ])
+    if model is RentalItem:
+        OccupancyGrid.objects.filter(item_id__in=pks).delete()
+    if model is Rental:
+        RentalAllocation.objects.filter(rental_id__in=pks).delete()
+    if model is RentalUnit:
+        RentalAllocation.objects.filter(unit_id__in=pks).delete()
+    if model in (RentalItem, Rental):
+        unindex_instances([model(pk=row['id']) for row in rows])
+    _delete_rows(model, [row['id'] for row in rows])
+    return {row.get('hub_id') for row in rows}
+
+
+def _steps(cutoff, horizon, hub_id):
+    """``(model, label, queryset, reason)`` in dependency order."""
+    gone_items = dict(item__is_deleted=True, item__deleted_at__lt=cutoff)
+    deleted = dict(is_deleted=True, deleted_at__lt=cutoff)
+    steps = [
+        (Rental, 'rental', Rental.all_objects.filter(**deleted), 'deleted'),
+        (Rental, 'rental', Rental.all_objects.filter(**gone_items), 'deleted'),
+        (RentalBlackout, 'blackout', RentalBlackout.all_objects.filter(**deleted), 'deleted'),
+        (RentalBlackout, 'blackout', RentalBlackout.all_objects.filter(**gone_items), 'deleted'),
+        (SeasonalRate, 'seasonalrate', SeasonalRate.all_objects.filter(**gone_items), 'deleted'),
+        (RentalUnit, 'rentalunit', RentalUnit.all_objects.filter(**deleted), 'deleted'),
+        (RentalUnit, 'rentalunit', RentalUnit.all_objects.filter(**gone_items), 'deleted'),
+        (RentalItem, 'rentalitem', RentalItem.all_objects.filter(**deleted), 'deleted'),
+    ]
+    if horizon:
+        history = Rental.objects.filter(status__in=HISTORY_STATUSES, end_date__lt=horizon)
+        steps.insert(0, (Rental, 'rental', history, 'history'))
+    if hub_id:
+        steps = [(model, label, qs.filter(hub_id=hub_id), reason) for model, label, qs, reason in steps]
+    return steps
+
+
+def archive(older_than_days=ARCHIVE_AFTER_DAYS, history_days=None, hub_id=None,
+            batch_size=ARCHIVE_BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Move rows deleted more than ``older_than_days`` days ago into the archive.
+
+    With ``history_days``, returned and cancelled rentals that ended more
+    than that many days ago are archived too. Returns
+    ``{'rental': n, 'blackout': n, 'seasonalrate': n, 'rentalunit': n, 'rentalitem': n}``;
+    with ``dry_run`` nothing moves and the counts are an upper bound (rows
+    matched by two steps are counted twice).
+    """
+    cutoff = timezone.now() - datetime.timedelta(days=older_than_days)
+    horizon = timezone.localdate() - datetime.timedelta(days=history_days) if history_days else None
+    totals = {'rental': 0, 'blackout': 0, 'seasonalrate': 0, 'rentalunit': 0, 'rentalitem': 0}
+    hubs = set()
+
+    for model, label, qs, reason in _steps(cutoff, horizon, hub_id):
+        if dry_run:
+            totals[label] += qs.count()
+            continue
+        while True:
+            with transaction.atomic():
+                pks = list(qs.order_by().values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                hubs |= _move(model, label, pks, reason)
+            totals[label] += len(pks)
+            if progress:
+                progress(dict(totals))
+
+    for hub in hubs - {None}:
+        metrics.reconcile_hub(hub)
+        fragment_cache.bump(hub)
+    return totals
@@ -0,0 +1,161 @@
+"""
+Async (ASGI) variants of the read-heavy rentals views.
+
+With ``RENTALS_ASYNC_VIEWS = True`` the URLs of the dashboard, the items
+and rentals lists and the item detail page route here instead of
+``views.py``. The contexts are built with the async ORM, so a request
+waiting on the database does not hold a worker thread. Queries that do not
+depend on each other (the dashboard counters and forecast, or an item's
+blackouts and open rentals) are started together with ``asyncio.gather``.
+
+The platform decorators are synchronous. :func:`async_page` runs
+``login_required`` before the context is built and then hands the finished
+context to the usual ``login_required``/``with_module_nav``/``htmx_view``
+stack on a thread, so templates, navigation and HTMX handling are exactly
+those of the sync views.
+
+Exports, infinite-scroll chunks and datatable refreshes are handed to the
+sync views: the first two stream through sync iterators, and the fragments
+usually come from the per-hub cache without touching the database.
+
+Django still runs each async ORM query through ``sync_to_async`` on one
+shared thread, so queries started together are not yet sent to the database
+in parallel. The gain today is in concurrency (no thread held while a
+request waits), not in the latency of a single request.
+"""
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.http import Http404
+from django.http.response import HttpResponseBase
+
+from apps.accounts.decorators import login_required
+from apps.modules_runtime.navigation import with_module_nav
+
+from . import forecasting, fragment_cache, views
+from .metrics import adashboard_metrics
+from .models import RentalItem, Rental, RentalBlackout
+from .pagination import KEYSET_CHUNK_SIZE, acached_count, keyset_page
+
+
+async def _alist(qs):
+    return [obj async for obj in qs]
+
+
+def _session_hub(request, *args, **kwargs):
+    return request.session.get('hub_id')
+
+
+def _context(request, *args, context=None, **kwargs):
+    return context
+
+
+def async_page(nav, templates, sync_view=None):
+    """
+    Turn an async context builder into a view rendered like the sync ones.
+
+    ``nav`` and ``templates`` are the arguments of ``with_module_nav`` and
+    ``htmx_view``. The builder is called as ``build(request, hub_id, ...)``
+    and returns a context dict or a response. Requests matched by
+    :func:`_handled_by_sync_view` go to ``sync_view`` unchanged.
+    """
+    check = login_required(_session_hub)
+    page = login_required(with_module_nav(*nav)(views.htmx_view(*templates)(_context)))
+
+    def decorator(build):
+        @functools.wraps(build)
+        async def view(request, *args, **kwargs):
+            if sync_view is not None and _handled_by_sync_view(request):
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            hub_id = await sync_to_async(check)(request, *args, **kwargs)
+            if isinstance(hub_id, HttpResponseBase):
+                return hub_id
+            context = await build(request, hub_id, *args, **kwargs)
+            if isinstance(context, HttpResponseBase):
+                return context
+            return await sync_to_async(page)(request, *args, context=context, **kwargs)
+        return view
+    return decorator
+
+
+def _handled_by_sync_view(request):
+    if request.GET.get('export') in ('csv', 'excel') or request.GET.get('rows'):
+        return True
+    return bool(request.htmx and request.htmx.target == 'datatable-body')
+
+
+async def _apaginate(request, hub_id, qs, sort_key, sort_dir, per_page):
+    """
+    Async :func:`views._paginate`.
+
+    The total (usually a cache hit) is read first so large hubs go straight
+    to cursor pages and never run a deep OFFSET query. Cursor pages use the
+    sync :func:`keyset_page` on a thread.
+    """
+    namespace = f'{hub_id}:{await fragment_cache.ageneration(hub_id)}'
+    total = await acached_count(qs, namespace=namespace)
+    if views._uses_keyset(request, qs, per_page, total):
+        return await sync_to_async(keyset_page)(
+            qs, sort_key, descending=sort_dir == 'desc',
+            after=request.GET.get('after'), before=request.GET.get('before'),
+            per_page=per_page or KEYSET_CHUNK_SIZE, count=total, scroll=per_page == 0,
+        )
+    paginator = Paginator(qs, per_page or KEYSET_CHUNK_SIZE)
+    paginator.count = total
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    page_obj.object_list = await _alist(page_obj.object_list)
+    return page_obj
+
+
+# ======================================================================
+# Views
+# ======================================================================
+
+@async_page(('rentals', 'dashboard'), ('rentals/pages/index.html', 'rentals/partials/dashboard_content.html'))
+async def dashboard(request, hub_id):
+    metrics, forecast = await asyncio.gather(adashboard_metrics(hub_id), forecasting.apressure(hub_id))
+    return {**metrics, 'forecast': forecast}
+
+
+@async_page(
+    ('rentals', 'items'),
+    ('rentals/pages/rental_items.html', 'rentals/partials/rental_items_content.html'),
+    sync_view=views.rental_items_list,
+)
+async def rental_items_list(request, hub_id):
+    state = views._list_state(request, 'code')
+    qs, sort_key = views._rental_items_query(request, hub_id, state)
+    page_obj = await _apaginate(request, hub_id, qs, sort_key, state['sort_dir'], state['per_page'])
+    return {'rental_items': page_obj, 'page_obj': page_obj, **state}
+
+
+@async_page(
+    ('rentals', 'rentals'),
+    ('rentals/pages/rentals.html', 'rentals/partials/rentals_content.html'),
+    sync_view=views.rentals_list,
+)
+async def rentals_list(request, hub_id):
+    state = views._list_state(request, 'reference')
+    qs, sort_key = views._rentals_query(request, hub_id, state)
+    page_obj = await _apaginate(request, hub_id, qs, sort_key, state['sort_dir'], state['per_page'])
+    return {'rentals': page_obj, 'page_obj': page_obj, **state}
+
+
+@async_page(
+    ('rentals', 'items'),
+    ('rentals/pages/rental_item_detail.html', 'rentals/partials/rental_item_detail_content.html'),
+)
+async def rental_item_detail(request, hub_id, pk):
+    item, blackouts, active_rentals = await asyncio.gather(
+        RentalItem.objects.filter(pk=pk, hub_id=hub_id).afirst(),
+        _alist(RentalBlackout.objects.filter(item_id=pk, hub_id=hub_id).order_by('-start_date')),
+        _alist(
+            Rental.objects.filter(item_id=pk, hub_id=hub_id, status__in=['active', 'reserved'])
+            .order_by('-start_date')[:10]
+        ),
+    )
+    if item is None:
+        raise Http404
+    return {'item': item, 'blackouts': blackouts, 'active_rentals': active_rentals}
@@ -0,0 +1,97 @@
+"""
+Set-based bulk actions for the rentals datatable.
+
+Each action picks the selected rows it applies to (for example only active
+or overdue rentals can be marked returned), locks them, and changes them
+with a single ``UPDATE`` inside one transaction. Actions that add booked
+days (extending end dates) validate the capacity of every affected item
+for the whole batch before writing; a conflict rolls the batch back.
+
+``update()`` skips the save signals, so dashboard counters, the list cache,
+occupancy grids and totals are refreshed here for the changed rows only.
+Extended rentals are also allocated units again (see allocation.py), so a
+unit never holds two overlapping bookings.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import DateField, ExpressionWrapper, F, Q
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from . import allocation, fragment_cache, occupancy
+from .availability import BLOCKING_STATUSES, ONE_DAY
+from .booking import check_batch_capacity
+from .metrics import track_bulk
+from .models import Rental
+from .pricing import reprice_open_rentals
+
+MAX_EXTEND_DAYS = 365
+
+# action: (rows it applies to, values to set)
+RENTAL_ACTIONS = {
+    'mark_active': (Q(status='reserved'), {'status': 'active'}),
+    'mark_returned': (Q(status__in=('active', 'overdue')), {'status': 'returned'}),
+    'cancel': (Q(status__in=BLOCKING_STATUSES), {'status': 'cancelled'}),
+    'deposit_paid': (Q(deposit_paid=False), {'deposit_paid': True}),
+    'deposit_returned': (Q(deposit_paid=True, deposit_returned=False), {'deposit_returned': True}),
+    'extend': (Q(status__in=BLOCKING_STATUSES), None),
+    'delete': (Q(), {'is_deleted': True}),
+}
+
+
+class BulkActionError(Exception):
+    """The action or its arguments are not valid."""
+
+
+def run_rental_action(hub_id, ids, action, days=None):
+    """
+    Apply ``action`` to the hub's rentals in ``ids``.
+
+    Returns the primary keys of the rows that changed. Raises
+    :class:`BulkActionError` for unknown actions or arguments and
+    :class:`~rentals.booking.BookingConflict` when an extension does not fit.
+    """
+    if action not in RENTAL_ACTIONS:
+        raise BulkActionError(_('Unknown action.'))
+    condition, values = RENTAL_ACTIONS[action]
+    if action == 'extend':
+        try:
+            days = int(days)
+        except (TypeError, ValueError):
+            days = 0
+        if not 1 <= days <= MAX_EXTEND_DAYS:
+            raise BulkActionError(_('Enter a number of days between 1 and %(max)s.') % {'max': MAX_EXTEND_DAYS})
+        delta = datetime.timedelta(days=days)
+        values = {'end_date': ExpressionWrapper(F('end_date') + delta, output_field=DateField())}
+    values = {**values, 'updated_at': timezone.now()}
+    if action == 'delete':
+        values['deleted_at'] = timezone.now()
+
+    with transaction.atomic():
+        rows = list(
+            Rental.objects.select_for_update()
+            .filter(condition, hub_id=hub_id, id__in=ids)
+            .values_list('pk', 'item_id', 'end_date')
+        )
+        if not rows:
+            return []
+        pks = [row[0] for row in rows]
+        if action == 'extend':
+            check_batch_capacity([(item_id, end + ONE_DAY, end + delta) for pk, item_id, end in rows])
+        with track_bulk(Rental, pks):
+            Rental.objects.filter(pk__in=pks).update(**values)
+        if action == 'extend':
+            extended = Rental.objects.filter(pk__in=pks).only('pk', 'hub_id', 'item', 'start_date', 'end_date')
+            by_item = {}
+            for rental in extended:
+                by_item.setdefault(rental.item_id, []).append(rental)
+            for item_id, rentals in by_item.items():
+                allocation.allocate(item_id, rentals, keep_units=True)
+
+    if action == 'extend':
+        reprice_open_rentals(rental_ids=pks)
+    fragment_cache.bump(hub_id)
+    if action in ('mark_returned', 'cancel', 'extend', 'delete'):
+        occupancy.rebuild_item_ids({row[1] for row in rows})
+    return pks
@@ -0,0 +1,223 @@
+"""
+Weekly demand forecasts per item category and location.
+
+:func:`run` turns each hub's rental history into one weekly series per
+``(category, location)``. Each value is the average number of units out
+per day in one of the last ``HISTORY_WEEKS`` weeks. Each series is
+projected ``weeks`` ahead and stored in ``DemandForecast`` along with the
+units the category has at that location. The dashboard and the assistant
+then read the forecasts instead of computing them.
+
+The model is a damped seasonal naive forecast. The level is the mean of
+the last ``LEVEL_WEEKS`` weeks. Once the history covers the same weeks a
+year earlier, each forecast week adds ``SEASONAL_WEIGHT`` times that
+week's distance from the level a year earlier.
+
+The series are built with NumPy: every rental adds one unit to a
+per-series difference array from its first day to its last
+(``numpy.add.at`` over day offsets), and a cumulative sum averaged per
+week gives the weekly values. Fitting works on a chunk of series at once
+as a 2-D array and never touches the database, so the chunks are sent to
+a ``ProcessPoolExecutor``. The parent process does the database work: one
+history query, one capacity query and one write per hub. NumPy is imported
+where it is used, so the views that only read forecasts do not need it.
+"""
+import datetime
+from collections import defaultdict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from functools import partial
+
+import django
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .analytics import BOOKED_STATUSES
+from .metrics import hub_ids
+from .models import DemandForecast, RentalItem, Rental
+
+HISTORY_WEEKS = 104
+FORECAST_WEEKS = 8
+LEVEL_WEEKS = 4
+SEASON_WEEKS = 52
+SEASONAL_WEIGHT = 0.5
+
+# Series per process pool task.
+FORECAST_CHUNK_SIZE = 200
+
+DAY = datetime.timedelta(days=1)
+WEEK = datetime.timedelta(weeks=1)
+
+
+def week_start(day):
+    """Monday of ``day``'s week."""
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def weekly_series(hub_id, first_week, weeks=HISTORY_WEEKS):
+    """``{(category, location): array of units out per day, one value per week}`` from one query."""
+    import numpy as np
+
+    days = weeks * 7
+    last_day = first_week + (days - 1) * DAY
+    rows = list(Rental.objects.filter(
+        hub_id=hub_id, status__in=BOOKED_STATUSES, start_date__lte=last_day, end_date__gte=first_week,
+    ).values_list('item__category', 'item__location', 'start_date', 'end_date'))
+    if not rows:
+        return {}
+    categories, locations, starts, ends = zip(*rows)
+    keys = {}
+    index = np.fromiter(
+        (keys.setdefault((category or '', location or ''), len(keys)) for category, location in zip(categories, locations)),
+        dtype=np.intp, count=len(rows),
+    )
+    origin = np.datetime64(first_week, 'D')
+    first = np.clip((np.array(starts, dtype='datetime64[D]') - origin).astype(np.int64), 0, days - 1)
+    after = np.clip((np.array(ends, dtype='datetime64[D]') - origin).astype(np.int64), 0, days - 1) + 1
+    diff = np.zeros((len(keys), days + 1))
+    np.add.at(diff, (index, first), 1)
+    np.add.at(diff, (index, after), -1)
+    weekly = diff.cumsum(axis=1)[:, :days].reshape(len(keys), weeks, 7).mean(axis=2)
+    return {key: weekly[i] for key, i in keys.items()}
+
+
+def capacity(hub_id):
+    """Active units per ``(category, location)``."""
+    rows = (
+        RentalItem.objects.filter(hub_id=hub_id, is_active=True)
+        .values('category', 'location').annotate(units=Sum('quantity_total')).order_by()
+    )
+    return {(row['category'], row['location']): row['units'] or 0 for row in rows}
+
+
+def fit_matrix(values, horizon=FORECAST_WEEKS):
+    """
+    Forecast the ``horizon`` weeks following each row of ``values``.
+
+    ``values`` is a 2-D array with one series per row, oldest week first,
+    all of the same length. Returns an array of shape ``(rows, horizon)``.
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    n = values.shape[1]
+    level = values[:, -LEVEL_WEEKS:].mean(axis=1)
+    forecast = np.repeat(level[:, None], horizon, axis=1)
+    last_year = n - SEASON_WEEKS
+    if last_year >= LEVEL_WEEKS:
+        seasonal_base = values[:, last_year - LEVEL_WEEKS:last_year].mean(axis=1)
+        seen = min(horizon, n - last_year)
+        forecast[:, :seen] += SEASONAL_WEIGHT * (values[:, last_year:last_year + seen] - seasonal_base[:, None])
+    return np.maximum(forecast, 0.0)
+
+
+def fit(values, horizon=FORECAST_WEEKS):
+    """Forecast the ``horizon`` weeks following ``values`` (oldest week first)."""
+    return fit_matrix([values], horizon)[0].tolist()
+
+
+def fit_chunk(chunk, horizon=FORECAST_WEEKS):
+    """Fit every ``(key, values)`` of ``chunk`` as one matrix (run in the worker processes)."""
+    keys, values = zip(*chunk)
+    return list(zip(keys, fit_matrix(values, horizon).tolist()))
+
+
+def _fitted(jobs, horizon, workers):
+    chunks = [jobs[i:i + FORECAST_CHUNK_SIZE] for i in range(0, len(jobs), FORECAST_CHUNK_SIZE)]
+    fit_all = partial(fit_chunk, horizon=horizon)
+    if workers == 1 or len(chunks) < 2:
+        for chunk in chunks:
+            yield from fit_all(chunk)
+        return
+    # Spawned workers start clean, so they never inherit (or have to close)
+    # the caller's database connections; the initializer sets Django up
+    # before the first chunk imports this module
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as executor:
+        for results in executor.map(fit_all, chunks):
+            yield from results
+
+
+def run(hub_id=None, weeks=FORECAST_WEEKS, workers=None, today=None, progress=None):
+    """
+    Recompute the forecasts of one hub (or every hub).
+
+    ``workers`` is the process pool size (default: one per CPU; 1 fits
+    in-process). Returns the number of forecast rows written.
+    """
+    if not 1 <= weeks <= SEASON_WEEKS:
+        raise ValueError(f'weeks must be between 1 and {SEASON_WEEKS}')
+    current = week_start(today or timezone.localdate())
+    first_week = current - HISTORY_WEEKS * WEEK
+    hubs = [hub_id] if hub_id else sorted(hub_ids(), key=str)
+
+    jobs, capacities = [], {}
+    for hub in hubs:
+        capacities[hub] = capacity(hub)
+        series = weekly_series(hub, first_week)
+        for key in capacities[hub]:
+            series.setdefault(key, [0.0] * HISTORY_WEEKS)
+        jobs += [((hub, *key), values) for key, values in series.items()]
+
+    rows = defaultdict(list)
+    for (hub, category, location), forecast in _fitted(jobs, weeks, workers):
+        units = capacities[hub].get((category, location), 0)
+        rows[hub] += [
+            DemandForecast(
+                hub_id=hub, category=category, location=location, week_start=current + h * WEEK,
+                expected_units=Decimal(f'{expected:.2f}'), capacity=units,
+            )
+            for h, expected in enumerate(forecast)
+        ]
+
+    written = 0
+    for hub in hubs:
+        with transaction.atomic():
+            DemandForecast.objects.filter(hub_id=hub).delete()
+            DemandForecast.objects.bulk_create(rows[hub], batch_size=1000)
+        written += len(rows[hub])
+        if progress:
+            progress(hub, len(rows[hub]))
+    return written
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+def _upcoming(hub_id):
+    return DemandForecast.objects.filter(
+        hub_id=hub_id, week_start__gte=week_start(timezone.localdate()),
+    ).values_list('category', 'location', 'week_start', 'expected_units', 'capacity')
+
+
+def _pressure(rows, limit):
+    peaks = {}
+    for category, location, week, expected, units in rows:
+        peak = peaks.get((category, location))
+        if peak is None or expected > peak['expected_units']:
+            peaks[(category, location)] = {
+                'category': category, 'location': location, 'week_start': week,
+                'expected_units': expected, 'capacity': units,
+                'load': round(expected * 100 / units, 1) if units else None,
+            }
+    ranked = sorted(
+        (peak for peak in peaks.values() if peak['expected_units']),
+        key=lambda peak: (peak['load'] is None, peak['load'] or 0, peak['expected_units']), reverse=True,
+    )
+    return ranked[:limit]
+
+
+def pressure(hub_id, limit=5):
+    """
+    The ``limit`` categories/locations whose peak upcoming demand is highest
+    relative to their units (demand without any units first).
+    """
+    return _pressure(_upcoming(hub_id), limit)
+
+
+async def apressure(hub_id, limit=5):
+    """Async :func:`pressure`."""
+    return _pressure([row async for row in _upcoming(hub_id)], limit)
@@ -6,12 +6,14 @@ from .models import RentalItem, Rental, RentalBlackout
 class RentalItemForm(forms.ModelForm):
     class Meta:
         model = RentalItem
-        fields = ['name', 'code', 'description', 'daily_rate', 'is_available', 'is_active', 'category', 'location', 'quantity_total']
+        fields = ['name', 'code', 'description', 'daily_rate', 'weekly_rate', 'monthly_rate', 'is_available', 'is_active', 'category', 'location', 'quantity_total']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'input input-sm w-full'}),
             'code': forms.TextInput(attrs={'class': 'input input-sm w-full'}),
             'description': forms.Textarea(attrs={'class': 'textarea textarea-sm w-full', 'rows': 3}),
             'daily_rate': forms.TextInput(attrs={'class': 'input input-sm w-full', 'type': 'number'}),
+            'weekly_rate': forms.TextInput(attrs={'class': 'input input-sm w-full', 'type': 'number'}),
+            'monthly_rate': forms.TextInput(attrs={'class': 'input input-sm w-full', 'type': 'number'}),
             'is_available': forms.CheckboxInput(attrs={'class': 'toggle'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'toggle'}),
             'category': forms.TextInput(attrs={'class': 'input input-sm w-full'}),
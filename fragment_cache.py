@@ -0,0 +1,134 @@
+"""
+Per-hub cache for rendered datatable fragments.
+
+Fragments are keyed by hub, a per-hub *generation* counter, the fragment
+name, the active language and the request's query parameters. Any write to a
+hub's rentals data bumps its generation (save/delete signals, plus explicit
+calls from bulk paths), which makes every older key unreachable in O(1)
+without scanning or deleting anything. A bump inside a transaction is
+repeated when it commits, so a fragment rendered from the pre-commit rows
+in between cannot outlive the write. Orphaned entries expire through the
+timeout and the cache backend's own eviction (LocMemCache is LRU-bounded by
+``MAX_ENTRIES``).
+
+The cache alias defaults to ``default`` and can be pointed at a dedicated
+backend with the ``RENTALS_FRAGMENT_CACHE`` setting.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.translation import get_language
+
+from . import instrumentation
+
+FRAGMENT_TIMEOUT = 300
+
+
+def _cache():
+    return caches[getattr(settings, 'RENTALS_FRAGMENT_CACHE', 'default')]
+
+
+def _incr(key):
+    cache = _cache()
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def generation(hub_id):
+    """Current write generation of a hub."""
+    key = f'rentals:gen:{hub_id}'
+    value = _cache().get(key)
+    if value is None:
+        _cache().add(key, 1, timeout=None)
+        value = _cache().get(key, 1)
+    return value
+
+
+async def ageneration(hub_id):
+    """Async :func:`generation`."""
+    key = f'rentals:gen:{hub_id}'
+    value = await _cache().aget(key)
+    if value is None:
+        await _cache().aadd(key, 1, timeout=None)
+        value = await _cache().aget(key, 1)
+    return value
+
+
+def bump(hub_id):
+    """
+    Invalidate every cached fragment of a hub.
+
+    Inside a transaction the generation is bumped again on commit: until
+    then other readers still see the old rows and could cache them under
+    the new generation.
+    """
+    if hub_id is None:
+        return
+    key = f'rentals:gen:{hub_id}'
+    _incr(key)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _incr(key))
+
+
+def fragment_key(hub_id, name, params):
+    raw = repr(sorted((k, sorted(v) if isinstance(v, list) else v) for k, v in params.items()))
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    return f'rentals:frag:{hub_id}:{generation(hub_id)}:{name}:{get_language()}:{digest}'
+
+
+def get_or_render(hub_id, name, params, render, timeout=FRAGMENT_TIMEOUT):
+    """Return cached HTML for the fragment, calling ``render()`` on a miss."""
+    key = fragment_key(hub_id, name, params)
+    html = _cache().get(key)
+    if html is not None:
+        _incr(f'rentals:frag:hits:{hub_id}')
+        return html
+    _incr(f'rentals:frag:misses:{hub_id}')
+    html = render()
+    _cache().set(key, html, timeout)
+    return html
+
+
+def _render(template, context_factory, request):
+    context = context_factory()
+    with instrumentation.rendering():
+        return render_to_string(template, context, request)
+
+
+def fragment_response(request, hub_id, template, context_factory, params=None):
+    """
+    ``HttpResponse`` for ``template`` rendered from ``context_factory()``.
+
+    ``params`` defaults to the request's query string. The factory (and so
+    every query it runs) is only called on a cache miss.
+    """
+    if params is None:
+        params = dict(request.GET.lists())
+    html = get_or_render(
+        hub_id, template, params,
+        lambda: _render(template, context_factory, request),
+    )
+    return HttpResponse(html)
+
+
+def stats(hub_id):
+    """Hit/miss counters of a hub since they were last evicted."""
+    cache = _cache()
+    hits = cache.get(f'rentals:frag:hits:{hub_id}', 0)
+    misses = cache.get(f'rentals:frag:misses:{hub_id}', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits * 100 / total, 1) if total else 0,
+        'generation': generation(hub_id),
+    }
@@ -0,0 +1,286 @@
+"""
+Bulk CSV/XLSX import of rental items and historical rentals.
+
+Rows are streamed from the file (``csv`` reader or openpyxl's read-only
+workbook), validated one by one with the same rules as ``RentalItemForm``
+and ``RentalForm``, and written with ``bulk_create`` in batches of
+``batch_size``, each batch in its own transaction. Only the current batch
+is held in memory. Item codes in rental files are resolved through a single
+``code -> id`` map fetched up front (and extended with items created by the
+same run), and blank rental references are numbered per batch from one
+reserved block (``references.reserve_references``), so validation never
+queries per row.
+
+Rows that fail validation are written, with the reason, to an optional CSV
+error report and skipped. Headers may be the model field names or the
+column titles used by the exports (``Daily Rate``, ``Customer Name``...).
+
+``bulk_create`` skips the save signals, so each batch sets ``search_text``
+and feeds the search index itself, and the hub's counters, list cache and
+occupancy grids are rebuilt once at the end. Rental history is imported as
+recorded: totals are kept and capacity is not re-validated.
+"""
+import csv
+import os
+
+from django.db import transaction
+
+from . import fragment_cache, metrics, occupancy, references
+from .forms import RentalForm, RentalItemForm
+from .models import RentalItem, Rental
+from .search import build_search_text, index_instances
+
+IMPORT_BATCH_SIZE = 2000
+
+# Header aliases used by the exports (after normalisation).
+HEADER_ALIASES = {
+    'rentalitem': 'item',
+    'item_code': 'item',
+    'code_item': 'item',
+}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on', 'si', 'sí', 'x'}
+
+
+class ImportRentalItemForm(RentalItemForm):
+    """``RentalItemForm`` without per-row uniqueness queries (codes are checked against the map)."""
+
+    def validate_unique(self):
+        pass
+
+
+class ImportRentalForm(RentalForm):
+    """``RentalForm`` minus the foreign keys, which are resolved from the code map."""
+
+    class Meta(RentalForm.Meta):
+        fields = [f for f in RentalForm.Meta.fields if f not in ('item', 'customer')]
+
+    def validate_unique(self):
+        pass
+
+
+def normalise_header(name):
+    key = str(name or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def iter_csv(handle):
+    """Yield row dicts from a text-mode CSV file object."""
+    reader = csv.reader(handle)
+    headers = [normalise_header(h) for h in next(reader, [])]
+    for values in reader:
+        if any(values):
+            yield dict(zip(headers, values))
+
+
+def iter_xlsx(path_or_handle):
+    """Yield row dicts from the first sheet of an XLSX workbook."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path_or_handle, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = [normalise_header(h) for h in next(rows, ())]
+        for values in rows:
+            if any(v not in (None, '') for v in values):
+                yield {h: ('' if v is None else v) for h, v in zip(headers, values)}
+    finally:
+        workbook.close()
+
+
+def iter_rows(path, file_format=None):
+    """Row dicts from ``path``; the format defaults to the file extension."""
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format in ('xlsx', 'excel'):
+        yield from iter_xlsx(path)
+        return
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        yield from iter_csv(handle)
+
+
+def _form_data(form_class, row):
+    """Map a raw row onto form data, filling model defaults for missing columns."""
+    data = {}
+    for name in form_class.base_fields:
+        model_field = form_class._meta.model._meta.get_field(name)
+        kind = model_field.get_internal_type()
+        value = row.get(name)
+        if value is None or value == '':
+            value = model_field.get_default() if model_field.has_default() else ''
+        if kind == 'BooleanField':
+            value = 'true' if str(value).strip().lower() in TRUE_VALUES else 'false'
+        elif kind == 'DateField' and hasattr(value, 'date'):
+            # openpyxl returns datetimes for date cells
+            value = value.date()
+        data[name] = value.strip() if isinstance(value, str) else value
+    return data
+
+
+def _errors(form):
+    return '; '.join(f'{field}: {" ".join(messages)}' for field, messages in form.errors.items())
+
+
+class _ErrorReport:
+    """Lazily opened CSV of rejected rows plus the reason."""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+        self.writer = None
+        self.headers = None
+
+    def add(self, line, row, message):
+        if not self.path:
+            return
+        if self.writer is None:
+            self.headers = list(row)
+            self.handle = open(self.path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.handle)
+            self.writer.writerow(['line', *self.headers, 'error'])
+        self.writer.writerow([line, *(row.get(h, '') for h in self.headers), message])
+
+    def close(self):
+        if self.handle:
+            self.handle.close()
+
+
+def _run(rows, hub_id, build, model, batch_size, error_file, progress, rejects=None, prepare=None):
+    """
+    Validate and insert ``rows`` batch by batch.
+
+    ``build(row)`` returns ``(obj, None)`` or ``(None, message)``. The optional
+    ``rejects(objs)`` is called once per batch with the built objects and
+    returns ``{index: message}`` for the ones that must be skipped after all
+    (checks that need one query per batch rather than per row). The optional
+    ``prepare(objs)`` then completes the objects that will be inserted.
+    """
+    result = {'rows': 0, 'created': 0, 'errors': 0, 'error_file': None}
+    report = _ErrorReport(error_file)
+    batch = []
+
+    def flush():
+        if not batch:
+            return
+        rejected = rejects([obj for _, _, obj in batch]) if rejects else {}
+        for index, message in sorted(rejected.items()):
+            line, row, _ = batch[index]
+            result['errors'] += 1
+            report.add(line, row, message)
+        objs = [obj for index, (_, _, obj) in enumerate(batch) if index not in rejected]
+        if prepare:
+            prepare(objs)
+        with transaction.atomic():
+            model.objects.bulk_create(objs, batch_size=batch_size)
+            index_instances(objs)
+        result['created'] += len(objs)
+        batch.clear()
+        if progress:
+            progress(dict(result))
+
+    try:
+        # Line 1 is the header row
+        for line, row in enumerate(rows, start=2):
+            result['rows'] += 1
+            obj, message = build(row)
+            if obj is None:
+                result['errors'] += 1
+                report.add(line, row, message)
+                continue
+            obj.hub_id = hub_id
+            obj.search_text = build_search_text(obj)
+            batch.append((line, row, obj))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        report.close()
+    if report.writer is not None:
+        result['error_file'] = error_file
+    return result
+
+
+def _finish(hub_id):
+    metrics.reconcile_hub(hub_id)
+    fragment_cache.bump(hub_id)
+
+
+def import_rental_items(rows, hub_id, batch_size=IMPORT_BATCH_SIZE, error_file=None, progress=None):
+    """
+    Create rental items from an iterable of row dicts.
+
+    Rows whose code already exists in the hub (or earlier in the file) are
+    rejected. Returns ``{'rows', 'created', 'errors', 'error_file'}``.
+    """
+    codes = set(RentalItem.objects.filter(hub_id=hub_id).exclude(code='').values_list('code', flat=True))
+
+    def build(row):
+        form = ImportRentalItemForm(_form_data(ImportRentalItemForm, row))
+        if not form.is_valid():
+            return None, _errors(form)
+        item = form.instance
+        if item.code:
+            if item.code in codes:
+                return None, f'code: {item.code} already exists.'
+            codes.add(item.code)
+        return item, None
+
+    result = _run(rows, hub_id, build, RentalItem, batch_size, error_file, progress)
+    _finish(hub_id)
+    return result
+
+
+def import_rentals(rows, hub_id, batch_size=IMPORT_BATCH_SIZE, error_file=None, progress=None):
+    """
+    Create historical rentals from an iterable of row dicts.
+
+    The ``item`` column holds the item code. Blank references are numbered
+    from the hub's sequence, one block per batch; references already used
+    by the hub or earlier in the file are rejected. Returns the same summary
+    as :func:`import_rental_items`.
+    """
+    items = dict(RentalItem.objects.filter(hub_id=hub_id).exclude(code='').values_list('code', 'pk'))
+    touched = set()
+    seen = set()
+
+    def build(row):
+        code = str(row.get('item') or '').strip()
+        if code not in items:
+            return None, f'item: unknown item code "{code}".'
+        form = ImportRentalForm(_form_data(ImportRentalForm, row))
+        if not form.is_valid():
+            return None, _errors(form)
+        rental = form.instance
+        if rental.reference:
+            if rental.reference in seen:
+                return None, f'reference: {rental.reference} appears more than once.'
+            seen.add(rental.reference)
+        rental.item_id = items[code]
+        touched.add(rental.item_id)
+        return rental, None
+
+    def rejects(rentals):
+        taken = set(
+            Rental.objects.filter(hub_id=hub_id, reference__in=[r.reference for r in rentals if r.reference])
+            .values_list('reference', flat=True)
+        )
+        return {
+            index: f'reference: {rental.reference} already exists.'
+            for index, rental in enumerate(rentals) if rental.reference in taken
+        }
+
+    def prepare(rentals):
+        blank = [rental for rental in rentals if not rental.reference]
+        if not blank:
+            return
+        numbered = references.reserve_references(hub_id, len(blank), taken=seen)
+        for rental, reference in zip(blank, numbered):
+            rental.reference = reference
+            rental.search_text = build_search_text(rental)
+        seen.update(numbered)
+
+    result = _run(rows, hub_id, build, Rental, batch_size, error_file, progress, rejects, prepare)
+    _finish(hub_id)
+    touched = list(touched)
+    for start in range(0, len(touched), batch_size):
+        occupancy.rebuild_item_ids(touched[start:start + batch_size])
+    return result
@@ -0,0 +1,301 @@
+"""
+Opt-in request timing for the rentals views.
+
+Every URL in ``urls.py`` is wrapped by :func:`instrument_patterns`. A
+sampled request (``RENTALS_TIMING_SAMPLE_RATE``, a float between 0 and 1,
+default 0 = off) records:
+
+- ``sql``: number of queries and time spent in them (``execute_wrapper``);
+- ``render``: time spent rendering templates, excluding SQL run by lazy
+  querysets during the render. Only the rentals render paths are timed:
+  ``htmx_view`` and ``render`` as wrapped by :func:`timed_htmx_view` and
+  :func:`timed_render` in views.py, :func:`rendering` around fragment
+  renders, and lazy ``TemplateResponse`` objects. Django itself is not
+  patched;
+- ``app``: the rest (view code, decorators, middleware below the URL
+  resolver);
+- the response size.
+
+The figures are sent back as a ``Server-Timing`` header, so they show up in
+the browser's network panel, and appended to a bounded per-hub sample list
+in the cache, keyed by view name and HTMX target (``page`` for full page
+loads). The settings page shows percentiles over those samples. Requests
+that are not sampled only pay for one ``random()`` call. Async views (see
+``async_views.py``) are timed too, without the SQL breakdown.
+"""
+import asyncio
+import contextvars
+import functools
+import math
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+# Samples kept per hub, view and target; older ones are dropped.
+TIMING_SAMPLES = 500
+TIMING_TIMEOUT = 7 * 24 * 3600
+
+_current = contextvars.ContextVar('rentals_timing', default=None)
+
+
+def sample_rate():
+    return float(getattr(settings, 'RENTALS_TIMING_SAMPLE_RATE', 0) or 0)
+
+
+def _cache():
+    return caches[getattr(settings, 'RENTALS_FRAGMENT_CACHE', 'default')]
+
+
+class Sample:
+    """Timings collected while one request is being served."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.render = 0.0
+        self.render_sql = 0.0
+        self.rendering = 0
+        self._render_started = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql += elapsed
+            if self.rendering:
+                self.render_sql += elapsed
+
+
+    def begin_render(self):
+        self.rendering += 1
+        self._render_started.append(time.perf_counter())
+
+    def end_render(self):
+        if not self._render_started:
+            return
+        started = self._render_started.pop()
+        self.rendering -= 1
+        if not self.rendering:
+            self.render += time.perf_counter() - started
+
+
+@contextmanager
+def rendering():
+    """Count the enclosed block as template rendering of the sampled request, if any."""
+    sample = _current.get()
+    if sample is None:
+        yield
+        return
+    sample.begin_render()
+    try:
+        yield
+    finally:
+        sample.end_render()
+
+
+def timed_render(render):
+    """Wrap a render function (e.g. ``django.shortcuts.render``) so its calls are timed."""
+    @functools.wraps(render)
+    def wrapper(*args, **kwargs):
+        with rendering():
+            return render(*args, **kwargs)
+    return wrapper
+
+
+def timed_htmx_view(htmx_view):
+    """
+    Wrap the ``htmx_view`` decorator factory so the rendering it does is timed.
+
+    The render starts when the decorated view returns its context and ends
+    when ``htmx_view`` returns the response.
+    """
+    @functools.wraps(htmx_view)
+    def factory(*templates, **options):
+        render = htmx_view(*templates, **options)
+
+        def decorator(view):
+            @functools.wraps(view)
+            def build(request, *args, **kwargs):
+                result = view(request, *args, **kwargs)
+                sample = _current.get()
+                if sample is not None:
+                    sample.begin_render()
+                return result
+
+            rendered = render(build)
+
+            @functools.wraps(rendered)
+            def wrapper(request, *args, **kwargs):
+                try:
+                    return rendered(request, *args, **kwargs)
+                finally:
+                    sample = _current.get()
+                    if sample is not None:
+                        sample.end_render()
+            return wrapper
+        return decorator
+    return factory
+
+
+def _target(request):
+    if not request.headers.get('HX-Request'):
+        return 'page'
+    return request.headers.get('HX-Target') or 'htmx'
+
+
+def _size(response):
+    if getattr(response, 'streaming', False):
+        return 0
+    return len(response.content)
+
+
+def server_timing(timings):
+    """``Server-Timing`` header value for a recorded sample."""
+    return (
+        f'sql;dur={timings["sql_ms"]:.1f};desc="{timings["queries"]} queries", '
+        f'render;dur={timings["render_ms"]:.1f}, '
+        f'app;dur={timings["app_ms"]:.1f}, '
+        f'total;dur={timings["total_ms"]:.1f}'
+    )
+
+
+def _timings(sample, started, response):
+    total = time.perf_counter() - started
+    render = sample.render - sample.render_sql
+    return {
+        'total_ms': total * 1000,
+        'sql_ms': sample.sql * 1000,
+        'render_ms': render * 1000,
+        'app_ms': max(total - sample.sql - render, 0) * 1000,
+        'queries': sample.queries,
+        'bytes': _size(response),
+    }
+
+
+def _sampled():
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def instrument(view, name):
+    """Wrap ``view`` so a sample of its requests is timed under ``name``."""
+    if asyncio.iscoroutinefunction(view):
+        return _instrument_async(view, name)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _sampled():
+            return view(request, *args, **kwargs)
+        sample = Sample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(sample):
+                response = view(request, *args, **kwargs)
+                # Render lazy TemplateResponses here so their time is counted
+                if getattr(response, 'is_rendered', True) is False:
+                    with rendering():
+                        response.render()
+        finally:
+            _current.reset(token)
+        timings = _timings(sample, started, response)
+        response['Server-Timing'] = server_timing(timings)
+        _record_request(request, name, timings)
+        return response
+    return wrapper
+
+
+def _instrument_async(view, name):
+    """
+    :func:`instrument` for async views.
+
+    Their queries run on a thread shared with other requests, whose
+    connection cannot be wrapped per request, so SQL time is counted in
+    ``app`` and the query count is 0.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not _sampled():
+            return await view(request, *args, **kwargs)
+        sample = Sample()
+        token = _current.set(sample)
+        started = time.perf_counter()
+        try:
+            response = await view(request, *args, **kwargs)
+            if getattr(response, 'is_rendered', True) is False:
+                await sync_to_async(timed_render(response.render))()
+        finally:
+            _current.reset(token)
+        timings = _timings(sample, started, response)
+        response['Server-Timing'] = server_timing(timings)
+        await sync_to_async(_record_request)(request, name, timings)
+        return response
+    return wrapper
+
+
+def _record_request(request, name, timings):
+    record(request.session.get('hub_id'), name, _target(request), timings)
+
+
+def instrument_patterns(patterns):
+    """Instrument every named URL pattern in ``patterns`` (in place)."""
+    for pattern in patterns:
+        if getattr(pattern, 'name', None):
+            pattern.callback = instrument(pattern.callback, pattern.name)
+    return patterns
+
+
+def record(hub_id, view, target, timings):
+    """Append a sample to the hub's bounded list for ``view``/``target``."""
+    cache = _cache()
+    key = f'rentals:timing:{hub_id}:{view}:{target}'
+    samples = cache.get(key) or []
+    samples.append(tuple(round(timings[k], 2) for k in ('total_ms', 'sql_ms', 'render_ms', 'queries', 'bytes')))
+    cache.set(key, samples[-TIMING_SAMPLES:], TIMING_TIMEOUT)
+    index_key = f'rentals:timing:{hub_id}'
+    index = cache.get(index_key) or []
+    if (view, target) not in index:
+        cache.set(index_key, sorted({*index, (view, target)}), TIMING_TIMEOUT)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (0 when empty)."""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def summary(hub_id):
+    """Per view/target percentiles of the hub's recorded samples, slowest first."""
+    cache = _cache()
+    index = [tuple(entry) for entry in cache.get(f'rentals:timing:{hub_id}') or []]
+    stored = cache.get_many([f'rentals:timing:{hub_id}:{view}:{target}' for view, target in index])
+    rows = []
+    for view, target in index:
+        samples = stored.get(f'rentals:timing:{hub_id}:{view}:{target}')
+        if not samples:
+            continue
+        total, sql, render, queries, size = zip(*samples)
+        rows.append({
+            'view': view,
+            'target': target,
+            'count': len(samples),
+            'p50_ms': percentile(total, 50),
+            'p90_ms': percentile(total, 90),
+            'p99_ms': percentile(total, 99),
+            'sql_p50_ms': percentile(sql, 50),
+            'render_p50_ms': percentile(render, 50),
+            'queries_p50': percentile(queries, 50),
+            'kb_p50': round(percentile(size, 50) / 1024, 1),
+        })
+    rows.sort(key=lambda row: row['p90_ms'], reverse=True)
+    return {'enabled': sample_rate() > 0, 'sample_rate': sample_rate(), 'rows': rows}
@@ -0,0 +1,40 @@
+"""Move old soft-deleted (and optionally historical) rows into the archive table."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals import archive
+
+
+class Command(BaseCommand):
+    help = 'Archive rows soft-deleted more than --days days ago, in batches (run nightly).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=archive.ARCHIVE_AFTER_DAYS,
+                            help='Archive rows deleted more than this many days ago')
+        parser.add_argument('--history-days', type=int,
+                            help='Also archive returned/cancelled rentals that ended more than this many days ago')
+        parser.add_argument('--hub', help='Only archive this hub_id')
+        parser.add_argument('--batch-size', type=int, default=archive.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or (options['history_days'] is not None and options['history_days'] < 1):
+            raise CommandError('--days must not be negative and --history-days must be positive')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        started = time.monotonic()
+
+        def progress(totals):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {sum(totals.values())} row(s) archived so far')
+
+        totals = archive.archive(
+            older_than_days=options['days'], history_days=options['history_days'], hub_id=options['hub'],
+            batch_size=options['batch_size'], dry_run=options['dry_run'], progress=progress,
+        )
+        summary = ', '.join(f'{count} {label}' for label, count in totals.items())
+        if options['dry_run']:
+            self.stdout.write(f'Dry run: would archive {summary}')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Archived {summary} in {time.monotonic() - started:.2f}s'))
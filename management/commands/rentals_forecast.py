@@ -0,0 +1,35 @@
+"""Recompute the weekly demand forecasts per category and location."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals import forecasting
+
+
+class Command(BaseCommand):
+    help = 'Forecast demand per item category and location for the next weeks (run weekly).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub', help='Only forecast this hub_id')
+        parser.add_argument('--weeks', type=int, default=forecasting.FORECAST_WEEKS,
+                            help='Weeks to forecast, starting with the current one')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU; 1 runs in-process)')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be positive')
+        started = time.monotonic()
+
+        def progress(hub, rows):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {hub}: {rows} forecast row(s)')
+
+        try:
+            written = forecasting.run(
+                hub_id=options['hub'], weeks=options['weeks'], workers=options['workers'], progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} forecast row(s) in {time.monotonic() - started:.2f}s'
+        ))
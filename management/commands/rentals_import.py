@@ -0,0 +1,43 @@
+"""Import rental items or historical rentals from a CSV or XLSX file."""
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals import importers
+
+
+class Command(BaseCommand):
+    help = 'Bulk import rental items or rentals from a CSV/XLSX file, streaming it in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['items', 'rentals'])
+        parser.add_argument('path', help='CSV or XLSX file to import')
+        parser.add_argument('--hub', required=True, help='hub_id the rows belong to')
+        parser.add_argument('--format', choices=['csv', 'xlsx'], help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, default=importers.IMPORT_BATCH_SIZE)
+        parser.add_argument('--errors', help='Write rejected rows and their errors to this CSV file')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['path']):
+            raise CommandError(f"File not found: {options['path']}")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        started = time.monotonic()
+
+        def progress(totals):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {totals['rows']} row(s) read, {totals['created']} created so far")
+
+        run = importers.import_rental_items if options['kind'] == 'items' else importers.import_rentals
+        result = run(
+            importers.iter_rows(options['path'], options['format']), options['hub'],
+            batch_size=options['batch_size'], error_file=options['errors'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Read {result['rows']} row(s), created {result['created']} {options['kind']} "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
+        if result['errors']:
+            where = f", see {result['error_file']}" if result['error_file'] else ''
+            self.stdout.write(self.style.WARNING(f"{result['errors']} row(s) rejected{where}"))
@@ -0,0 +1,42 @@
+"""Move active rentals past their end date to the overdue status."""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rentals import overdue
+
+
+class Command(BaseCommand):
+    help = 'Mark active rentals whose end date has passed as overdue (run daily or more often).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub', help='Only sweep this hub_id')
+        parser.add_argument('--date', help='Treat this ISO date as today (default: the local date)')
+        parser.add_argument('--batch-size', type=int, default=overdue.SWEEP_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rentals that would change')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid --date: {options['date']}")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        def progress(totals):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  batch {totals['batches']}: {totals['updated']} updated so far")
+
+        result = overdue.mark_overdue(
+            today=today, hub_id=options['hub'], batch_size=options['batch_size'],
+            dry_run=options['dry_run'], progress=progress,
+        )
+        if options['dry_run']:
+            self.stdout.write(f"Dry run: {result['scanned']} rental(s) would be marked overdue")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {result['scanned']}, marked {result['updated']} rental(s) overdue "
+            f"in {result['batches']} batch(es), {result['duration']:.2f}s"
+        ))
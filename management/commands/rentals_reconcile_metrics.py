@@ -0,0 +1,24 @@
+"""Rebuild the materialised dashboard metrics from the source tables."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from rentals import metrics
+
+
+class Command(BaseCommand):
+    help = 'Recompute rentals dashboard metrics for one hub or every hub (run periodically).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub', help='Only reconcile this hub_id')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['hub']:
+            metrics.reconcile_hub(options['hub'])
+            count = 1
+        else:
+            count = metrics.reconcile_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled metrics for {count} hub(s) in {time.monotonic() - started:.2f}s'
+        ))
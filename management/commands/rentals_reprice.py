@@ -0,0 +1,25 @@
+"""Recompute the totals of open rentals from current rates and seasons."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from rentals import pricing
+
+
+class Command(BaseCommand):
+    help = 'Reprice reserved, active and overdue rentals (run after changing rates or seasons).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hub', help='Only reprice this hub_id')
+        parser.add_argument('--item', action='append', dest='items', help='Only reprice this item id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=pricing.REPRICE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = pricing.reprice_open_rentals(
+            hub_id=options['hub'], item_ids=options['items'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Repriced {result['updated']} of {result['scanned']} open rental(s) "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
@@ -0,0 +1,425 @@
+"""
+Materialised dashboard metrics.
+
+Every live RentalItem, Rental and RentalBlackout row contributes a few
+amounts to per-hub counters stored in ``RentalMetric`` (one row per
+``(hub_id, key)``). A write changes the counters by the difference between
+the row's contributions after and before it; the delta is applied with a
+single ``UPDATE ... SET value = value + CASE ...`` so concurrent writers do
+not overwrite each other. The dashboard then reads a handful of rows instead
+of aggregating the whole rentals table.
+
+A hub's counters are built in full on its first read. Until then writes
+leave them alone, so a hub never ends up with counters holding only the
+deltas of its recent writes.
+
+Signals cover ``save()``/``delete()``. Queryset ``update()`` bypasses them,
+so bulk paths wrap the update in :func:`track_bulk`. :func:`reconcile_hub`
+rebuilds a hub from scratch and is run periodically by the
+``rentals_reconcile_metrics`` command to correct any drift.
+
+Rentals moved to the archive as history (``archive(history_days=...)``)
+still count towards revenue: :func:`archived_revenue` reads their totals
+back from ``RentalArchive`` when a hub is rebuilt.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Substr, TruncMonth
+from django.utils import timezone
+
+from .models import RENTAL_STATUS, RentalArchive, RentalItem, Rental, RentalBlackout, RentalMetric
+
+# Statuses where the unit is physically out with the customer.
+OUT_STATUSES = ('active', 'overdue')
+
+ITEM_FIELDS = ('hub_id', 'is_deleted', 'is_active', 'category', 'quantity_total')
+RENTAL_FIELDS = (
+    'hub_id', 'is_deleted', 'status', 'total', 'deposit_amount', 'deposit_paid', 'deposit_returned',
+    'start_date',
+)
+STATUSES = tuple(status for status, _ in RENTAL_STATUS)
+BLACKOUT_FIELDS = ('hub_id', 'is_deleted')
+
+ZERO = Decimal('0')
+
+
+def _dec(value):
+    return Decimal(str(value)) if value not in (None, '') else ZERO
+
+
+def item_contributions(state):
+    if not state or state['is_deleted']:
+        return {}
+    contributions = {'items.total': 1}
+    if state['is_active']:
+        contributions['items.active'] = 1
+        contributions['units.total'] = state['quantity_total']
+        contributions[f"category.{state['category']}.units"] = state['quantity_total']
+    return contributions
+
+
+def rental_contributions(state):
+    if not state or state['is_deleted']:
+        return {}
+    status = state['status']
+    contributions = {'rentals.total': 1}
+    if status in STATUSES:
+        contributions[f'rentals.status.{status}'] = 1
+    if status != 'cancelled':
+        contributions['revenue'] = _dec(state['total'])
+        if state['start_date']:
+            contributions[f"revenue.month.{str(state['start_date'])[:7]}"] = _dec(state['total'])
+    if status == 'overdue':
+        contributions['overdue.value'] = _dec(state['total'])
+    if state['deposit_paid'] and not state['deposit_returned']:
+        contributions['deposits.held'] = _dec(state['deposit_amount'])
+    if status in OUT_STATUSES:
+        contributions['units.out'] = 1
+        contributions[f"category.{state['category']}.out"] = 1
+    return contributions
+
+
+def blackout_contributions(state):
+    if not state or state['is_deleted']:
+        return {}
+    return {'blackouts.total': 1}
+
+
+CONTRIBUTIONS = {
+    RentalItem: item_contributions,
+    Rental: rental_contributions,
+    RentalBlackout: blackout_contributions,
+}
+
+
+def diff(before, after):
+    """``after - before`` per key, dropping zero entries."""
+    delta = defaultdict(Decimal)
+    for key, value in after.items():
+        delta[key] += _dec(value)
+    for key, value in before.items():
+        delta[key] -= _dec(value)
+    return {key: value for key, value in delta.items() if value}
+
+
+def apply(hub_id, delta):
+    """
+    Add ``delta`` to the hub's counters in one UPDATE.
+
+    Does nothing for a hub whose counters have not been built yet; they are
+    computed in full by :func:`hub_metrics` on the first read.
+    """
+    if hub_id is None or not delta:
+        return
+    if not RentalMetric.objects.filter(hub_id=hub_id).exists():
+        return
+    RentalMetric.objects.bulk_create(
+        [RentalMetric(hub_id=hub_id, key=key) for key in delta], ignore_conflicts=True,
+    )
+    increment = Case(
+        *[When(key=key, then=Value(value)) for key, value in delta.items()],
+        default=Value(ZERO),
+        output_field=DecimalField(max_digits=16, decimal_places=2),
+    )
+    RentalMetric.objects.filter(hub_id=hub_id, key__in=list(delta)).update(value=F('value') + increment)
+
+
+# ----------------------------------------------------------------------
+# Row state snapshots
+# ----------------------------------------------------------------------
+
+def instance_state(instance):
+    """Contribution-relevant values of an in-memory instance."""
+    model = type(instance)
+    fields = {RentalItem: ITEM_FIELDS, Rental: RENTAL_FIELDS, RentalBlackout: BLACKOUT_FIELDS}[model]
+    state = {field: getattr(instance, field) for field in fields}
+    if model is Rental:
+        try:
+            state['category'] = instance.item.category if instance.item_id else ''
+        except ObjectDoesNotExist:
+            # The item is being cascade-deleted along with the rental
+            state['category'] = ''
+    return state
+
+
+def stored_states(model, pks):
+    """Contribution-relevant values of rows as currently stored, keyed by pk."""
+    fields = {RentalItem: ITEM_FIELDS, Rental: RENTAL_FIELDS, RentalBlackout: BLACKOUT_FIELDS}[model]
+    values = ['pk', *fields]
+    if model is Rental:
+        values.append('item__category')
+    states = {}
+    for row in model._base_manager.filter(pk__in=list(pks)).values(*values):
+        if model is Rental:
+            row['category'] = row.pop('item__category') or ''
+        states[row.pop('pk')] = row
+    return states
+
+
+def record_change(model, before, after):
+    """Apply the counter change between two states of one row."""
+    contributions = CONTRIBUTIONS[model]
+    hub_id = (after or before or {}).get('hub_id')
+    apply(hub_id, diff(contributions(before), contributions(after)))
+
+
+def move_category(hub_id, item_id, old, new):
+    """
+    Move an item's rentals that are out from category ``old`` to ``new``.
+
+    Rental rows are not saved when their item changes category, so the
+    ``category.<name>.out`` counters are moved here (one count query).
+    """
+    old, new = old or '', new or ''
+    if old == new:
+        return
+    out = Rental.objects.filter(item_id=item_id, status__in=OUT_STATUSES).count()
+    if out:
+        apply(hub_id, {f'category.{old}.out': -out, f'category.{new}.out': out})
+
+
+def record_changes(model, changes):
+    """Apply the counter changes of many ``(before, after)`` row states, one UPDATE per hub."""
+    contributions = CONTRIBUTIONS[model]
+    per_hub = defaultdict(lambda: defaultdict(Decimal))
+    for old, new in changes:
+        hub_id = (new or old)['hub_id']
+        for key, value in diff(contributions(old), contributions(new)).items():
+            per_hub[hub_id][key] += value
+    for hub_id, delta in per_hub.items():
+        apply(hub_id, {key: value for key, value in delta.items() if value})
+
+
+@contextmanager
+def track_bulk(model, pks):
+    """
+    Keep counters in step with a queryset ``update()`` on ``pks``.
+
+    Snapshots the rows before and after the wrapped block and applies the
+    per-hub difference, at the cost of two extra queries.
+    """
+    pks = list(pks)
+    before = stored_states(model, pks)
+    yield
+    after = stored_states(model, pks)
+    record_changes(model, [(before.get(pk), after.get(pk)) for pk in set(before) | set(after)])
+
+
+# ----------------------------------------------------------------------
+# Reconciliation
+# ----------------------------------------------------------------------
+
+def item_totals(hub_id):
+    """Every item tile of a hub in one conditional-aggregation pass."""
+    return RentalItem.objects.filter(hub_id=hub_id).aggregate(
+        total=Count('pk'),
+        active=Count('pk', filter=Q(is_active=True)),
+        available=Count('pk', filter=Q(is_active=True, is_available=True)),
+        units=Sum('quantity_total', filter=Q(is_active=True)),
+    )
+
+
+def rental_totals(hub_id, month=None):
+    """
+    Every rental tile of a hub in one conditional-aggregation pass.
+
+    Counts per status, revenue, deposits held, units out and overdue value;
+    with ``month`` (any date in it) also the revenue of rentals starting in
+    that month.
+    """
+    billed = ~Q(status='cancelled')
+    aggregates = {
+        'total': Count('pk'),
+        'revenue': Sum('total', filter=billed),
+        'deposits': Sum('deposit_amount', filter=Q(deposit_paid=True, deposit_returned=False)),
+        'out': Count('pk', filter=Q(status__in=OUT_STATUSES)),
+        'overdue_value': Sum('total', filter=Q(status='overdue')),
+        **{f'status_{status}': Count('pk', filter=Q(status=status)) for status in STATUSES},
+    }
+    if month:
+        aggregates['revenue_month'] = Sum(
+            'total', filter=billed & Q(start_date__year=month.year, start_date__month=month.month),
+        )
+    return Rental.objects.filter(hub_id=hub_id).aggregate(**aggregates)
+
+
+def archived_revenue(hub_id):
+    """
+    Revenue of the hub's rentals archived as history, as ``{'YYYY-MM': amount}``.
+
+    One grouped query over the archived rows' JSON; cancelled rentals are
+    left out as in :func:`rental_contributions`.
+    """
+    rows = (
+        RentalArchive.objects.filter(hub_id=hub_id, model='rental', reason='history')
+        .exclude(data__status='cancelled')
+        .annotate(month=Substr(KeyTextTransform('start_date', 'data'), 1, 7))
+        .values('month')
+        .annotate(revenue=Sum(Cast(KeyTextTransform('total', 'data'), DecimalField(max_digits=12, decimal_places=2))))
+        .order_by()
+    )
+    return {row['month']: row['revenue'] or ZERO for row in rows if row['revenue']}
+
+
+def compute_hub(hub_id):
+    """Recompute every counter for a hub from the source tables."""
+    values = defaultdict(Decimal)
+
+    totals = item_totals(hub_id)
+    values['items.total'] = totals['total']
+    values['items.active'] = totals['active']
+    values['units.total'] = totals['units'] or 0
+    items = RentalItem.objects.filter(hub_id=hub_id, is_active=True)
+    for row in items.values('category').annotate(units=Sum('quantity_total')).order_by():
+        values[f"category.{row['category']}.units"] = row['units']
+
+    totals = rental_totals(hub_id)
+    values['rentals.total'] = totals['total']
+    values['revenue'] = totals['revenue'] or ZERO
+    values['deposits.held'] = totals['deposits'] or ZERO
+    values['units.out'] = totals['out']
+    values['overdue.value'] = totals['overdue_value'] or ZERO
+    for status in STATUSES:
+        values[f'rentals.status.{status}'] = totals[f'status_{status}']
+    rentals = Rental.objects.filter(hub_id=hub_id)
+    months = (
+        rentals.exclude(status='cancelled').annotate(month=TruncMonth('start_date'))
+        .values('month').annotate(revenue=Sum('total')).order_by()
+    )
+    for row in months:
+        values[f"revenue.month.{row['month']:%Y-%m}"] = row['revenue'] or ZERO
+    for month, revenue in archived_revenue(hub_id).items():
+        values['revenue'] += revenue
+        values[f'revenue.month.{month}'] += revenue
+    out = rentals.filter(status__in=OUT_STATUSES).values('item__category').annotate(n=Count('pk')).order_by()
+    for row in out:
+        values[f"category.{row['item__category'] or ''}.out"] = row['n']
+
+    values['blackouts.total'] = RentalBlackout.objects.filter(hub_id=hub_id).count()
+    return {key: value for key, value in values.items() if value}
+
+
+def reconcile_hub(hub_id):
+    """Replace a hub's counters with freshly computed values."""
+    values = compute_hub(hub_id)
+    with transaction.atomic():
+        RentalMetric.objects.filter(hub_id=hub_id).delete()
+        RentalMetric.objects.bulk_create([
+            RentalMetric(hub_id=hub_id, key=key, value=value) for key, value in values.items()
+        ])
+    return values
+
+
+def hub_ids():
+    """Every hub with rentals data."""
+    ids = set(RentalItem.objects.values_list('hub_id', flat=True).distinct())
+    ids |= set(Rental.objects.values_list('hub_id', flat=True).distinct())
+    ids.discard(None)
+    return ids
+
+
+def reconcile_all():
+    """Rebuild every hub; returns the number of hubs processed."""
+    hubs = hub_ids()
+    for hub_id in hubs:
+        reconcile_hub(hub_id)
+    return len(hubs)
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+def hub_metrics(hub_id):
+    """Raw counters for a hub, building them on first access."""
+    values = dict(RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value'))
+    if not values:
+        values = reconcile_hub(hub_id)
+    return defaultdict(Decimal, values)
+
+
+def _pct(part, whole):
+    return round(Decimal(part) * 100 / Decimal(whole), 1) if whole else ZERO
+
+
+async def ahub_metrics(hub_id):
+    """Async :func:`hub_metrics` for the ASGI views."""
+    values = {key: value async for key, value in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value')}
+    if not values:
+        values = await sync_to_async(reconcile_hub)(hub_id)
+    return defaultdict(Decimal, values)
+
+
+def dashboard_metrics(hub_id):
+    """Dashboard tiles derived from the stored counters."""
+    return _dashboard_tiles(hub_metrics(hub_id), timezone.localdate())
+
+
+async def adashboard_metrics(hub_id):
+    """Async :func:`dashboard_metrics`."""
+    return _dashboard_tiles(await ahub_metrics(hub_id), timezone.localdate())
+
+
+def _dashboard_tiles(values, today):
+    categories = {}
+    for key, value in values.items():
+        if key.startswith('category.'):
+            name, _, kind = key[len('category.'):].rpartition('.')
+            categories.setdefault(name, {'name': name, 'units': 0, 'out': 0})[kind] = int(value)
+    category_rows = sorted(categories.values(), key=lambda c: (-c['out'], c['name']))
+    for row in category_rows:
+        row['occupancy'] = _pct(row['out'], row['units'])
+
+    return {
+        'total_rental_items': int(values['items.total']),
+        'active_rental_items': int(values['items.active']),
+        'total_rentals': int(values['rentals.total']),
+        'status_counts': {status: int(values[f'rentals.status.{status}']) for status in STATUSES},
+        'overdue_count': int(values['rentals.status.overdue']),
+        'overdue_value': values['overdue.value'],
+        'revenue': values['revenue'],
+        'revenue_month': values[f'revenue.month.{today:%Y-%m}'],
+        'deposits_held': values['deposits.held'],
+        'units_total': int(values['units.total']),
+        'units_out': int(values['units.out']),
+        'utilisation': _pct(values['units.out'], values['units.total']),
+        'categories': category_rows,
+    }
+
+
+def dashboard_summary(hub_id, today=None):
+    """
+    The dashboard figures computed live from the source tables.
+
+    Three queries: :func:`rental_totals`, :func:`item_totals` and
+    :func:`archived_revenue`. The dashboard page reads the stored counters
+    instead; this is for callers that need figures exact at this moment,
+    such as the assistant.
+    """
+    today = today or timezone.localdate()
+    rentals = rental_totals(hub_id, month=today)
+    items = item_totals(hub_id)
+    archived = archived_revenue(hub_id)
+    units_total = items['units'] or 0
+    return {
+        'total_rental_items': items['total'],
+        'active_rental_items': items['active'],
+        'available_rental_items': items['available'],
+        'total_rentals': rentals['total'],
+        'status_counts': {status: rentals[f'status_{status}'] for status in STATUSES},
+        'overdue_count': rentals['status_overdue'],
+        'overdue_value': rentals['overdue_value'] or ZERO,
+        'revenue': (rentals['revenue'] or ZERO) + sum(archived.values(), ZERO),
+        'revenue_month': (rentals['revenue_month'] or ZERO) + archived.get(f'{today:%Y-%m}', ZERO),
+        'deposits_held': rentals['deposits'] or ZERO,
+        'units_total': units_total,
+        'units_out': rentals['out'],
+        'utilisation': _pct(rentals['out'], units_total),
+    }
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rentalitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'code'], name='rentals_item_hub_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'reference'], name='rentals_hub_ref_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'start_date'], name='rentals_hub_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['item', 'status', 'start_date', 'end_date'], name='rentals_item_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalblackout',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['item', 'start_date', 'end_date'], name='rentals_blackout_item_idx'),
+        ),
+    ]
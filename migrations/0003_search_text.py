@@ -0,0 +1,110 @@
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = {
+    'RentalItem': ('name', 'code', 'description'),
+    'Rental': ('reference', 'customer_name', 'notes'),
+}
+
+PG_INDEXES = [
+    ('rentals_rentalitem', 'rentals_item_search_fts_idx', "USING GIN (to_tsvector('simple', search_text))"),
+    ('rentals_rental', 'rentals_search_fts_idx', "USING GIN (to_tsvector('simple', search_text))"),
+]
+
+PG_TRIGRAM_INDEXES = [
+    ('rentals_rentalitem', 'rentals_item_search_trgm_idx', 'USING GIN (search_text gin_trgm_ops)'),
+    ('rentals_rental', 'rentals_search_trgm_idx', 'USING GIN (search_text gin_trgm_ops)'),
+]
+
+FTS_TABLE = 'rentals_search_fts'
+
+BATCH_SIZE = 2000
+
+
+def backfill_search_text(apps, schema_editor):
+    fts = schema_editor.connection.vendor == 'sqlite' and FTS_TABLE in schema_editor.connection.introspection.table_names()
+    for model_name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model('rentals', model_name)
+        batch = []
+        for obj in model.objects.only('pk', *fields).iterator(chunk_size=BATCH_SIZE):
+            obj.search_text = ' '.join(str(getattr(obj, f) or '') for f in fields).lower().strip()
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                _flush(model, batch, fts, schema_editor)
+                batch = []
+        _flush(model, batch, fts, schema_editor)
+
+
+def _flush(model, batch, fts, schema_editor):
+    if not batch:
+        return
+    model.objects.bulk_update(batch, ['search_text'])
+    if fts:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (kind, obj_id, body) VALUES (%s, %s, %s)',
+                [(model._meta.model_name, obj.pk.hex, obj.search_text) for obj in batch],
+            )
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for table, name, using in PG_INDEXES:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {using}')
+        # pg_trgm may need elevated privileges. Without the trigram indexes
+        # search.py drops the infix ILIKE branch instead of scanning the table.
+        try:
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                for table, name, using in PG_TRIGRAM_INDEXES:
+                    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {using}')
+        except DatabaseError as exc:
+            logger.warning(
+                'rentals: pg_trgm is unavailable (%s); searches will match word prefixes only. '
+                'Run CREATE EXTENSION pg_trgm as a superuser and re-run this migration to enable infix matches.',
+                exc,
+            )
+    elif connection.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                    f"USING fts5(kind UNINDEXED, obj_id UNINDEXED, body, tokenize='unicode61')"
+                )
+        except DatabaseError as exc:
+            logger.warning('rentals: FTS5 is unavailable (%s); search falls back to LIKE scans.', exc)
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for _, name, _ in PG_INDEXES + PG_TRIGRAM_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalitem',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='rental',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0003_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField(db_index=True)),
+                ('key', models.CharField(max_length=150)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rentals_metric',
+                'constraints': [models.UniqueConstraint(fields=('hub_id', 'key'), name='rentals_metric_hub_key_uniq')],
+            },
+        ),
+    ]
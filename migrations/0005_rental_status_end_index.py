@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0004_rentalmetric'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['status', 'end_date'], name='rentals_status_end_idx'),
+        ),
+    ]
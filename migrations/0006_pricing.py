@@ -0,0 +1,46 @@
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0005_rental_status_end_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rentalitem',
+            name='weekly_rate',
+            field=models.DecimalField(decimal_places=2, default='0', max_digits=10, verbose_name='Weekly Rate'),
+        ),
+        migrations.AddField(
+            model_name='rentalitem',
+            name='monthly_rate',
+            field=models.DecimalField(decimal_places=2, default='0', max_digits=10, verbose_name='Monthly Rate'),
+        ),
+        migrations.CreateModel(
+            name='SeasonalRate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Name')),
+                ('start_date', models.DateField(verbose_name='Start Date')),
+                ('end_date', models.DateField(verbose_name='End Date')),
+                ('multiplier', models.DecimalField(decimal_places=3, default='1', max_digits=5, verbose_name='Multiplier')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='seasonal_rates', to='rentals.rentalitem', verbose_name='Item')),
+            ],
+            options={
+                'db_table': 'rentals_seasonal_rate',
+                'abstract': False,
+                'indexes': [models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'start_date', 'end_date'], name='rentals_season_hub_idx')],
+            },
+        ),
+    ]
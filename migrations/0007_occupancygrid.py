@@ -0,0 +1,26 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0006_pricing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyGrid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, null=True)),
+                ('origin', models.DateField()),
+                ('counts', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_grid', to='rentals.rentalitem')),
+            ],
+            options={
+                'db_table': 'rentals_occupancy_grid',
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+import re
+
+from django.db import migrations, models
+
+NUMBERED = re.compile(r'^R-(\d+)$')
+BATCH_SIZE = 2000
+
+
+def backfill_references(apps, schema_editor):
+    """
+    Make live references unique per hub before the constraint is added.
+
+    Blank references get the next ``R-<n>`` number of their hub; repeated
+    ones keep the oldest row as is and suffix the rest (``-2``, ``-3``...).
+    Each hub's counter starts after its highest ``R-<n>`` reference.
+    """
+    Rental = apps.get_model('rentals', 'Rental')
+    RentalSequence = apps.get_model('rentals', 'RentalSequence')
+
+    highest = {}
+    for hub_id, reference in Rental.objects.filter(reference__startswith='R-').values_list('hub_id', 'reference').iterator():
+        match = NUMBERED.match(reference)
+        if match:
+            highest[hub_id] = max(highest.get(hub_id, 0), int(match.group(1)))
+
+    changed = []
+    current_hub, used = object(), set()
+    rows = (
+        Rental.objects.filter(is_deleted=False)
+        .order_by('hub_id', 'created_at', 'id')
+        .values_list('pk', 'hub_id', 'reference')
+        .iterator()
+    )
+    for pk, hub_id, reference in rows:
+        if hub_id != current_hub:
+            current_hub, used = hub_id, set()
+        if not reference:
+            highest[hub_id] = highest.get(hub_id, 0) + 1
+            reference = f'R-{highest[hub_id]:06d}'
+            changed.append(Rental(pk=pk, reference=reference))
+        elif reference in used:
+            suffix = 2
+            while f'{reference[:44]}-{suffix}' in used:
+                suffix += 1
+            reference = f'{reference[:44]}-{suffix}'
+            changed.append(Rental(pk=pk, reference=reference))
+        used.add(reference)
+        if len(changed) >= BATCH_SIZE:
+            Rental.objects.bulk_update(changed, ['reference'])
+            changed = []
+    Rental.objects.bulk_update(changed, ['reference'])
+
+    RentalSequence.objects.bulk_create(
+        [RentalSequence(hub_id=hub_id, next_value=number + 1) for hub_id, number in highest.items() if hub_id],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0007_occupancygrid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField(unique=True)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'rentals_sequence',
+            },
+        ),
+        migrations.AlterField(
+            model_name='rental',
+            name='reference',
+            field=models.CharField(blank=True, max_length=50, verbose_name='Reference'),
+        ),
+        migrations.RunPython(backfill_references, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='rental',
+            name='rentals_hub_ref_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='rental',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('hub_id', 'reference'), name='rentals_hub_ref_uniq'),
+        ),
+    ]
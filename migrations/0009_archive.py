@@ -0,0 +1,44 @@
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0008_rental_reference'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rentalitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['hub_id', 'name'], name='rentals_item_hub_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalitem',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='rentals_item_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='rentals_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalblackout',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='rentals_blackout_deleted_idx'),
+        ),
+        migrations.CreateModel(
+            name='RentalArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField(blank=True, null=True)),
+                ('model', models.CharField(max_length=30)),
+                ('object_id', models.UUIDField()),
+                ('reason', models.CharField(max_length=20)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'db_table': 'rentals_archive',
+                'indexes': [models.Index(fields=['hub_id', 'model', 'object_id'], name='rentals_archive_object_idx')],
+            },
+        ),
+    ]
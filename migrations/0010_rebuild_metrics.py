@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def drop_metrics(apps, schema_editor):
+    """
+    Drop the stored counters so they are rebuilt with the new keys.
+
+    ``overdue.value`` and ``revenue.month.<YYYY-MM>`` did not exist before;
+    incremental updates would start them from zero. Each hub's counters
+    are recomputed on its next dashboard load.
+    """
+    apps.get_model('rentals', 'RentalMetric').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_metrics, migrations.RunPython.noop),
+    ]
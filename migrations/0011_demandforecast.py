@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0010_rebuild_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField()),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('week_start', models.DateField()),
+                ('expected_units', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('generated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'rentals_forecast',
+                'ordering': ['category', 'location', 'week_start'],
+                'constraints': [models.UniqueConstraint(fields=('hub_id', 'category', 'location', 'week_start'), name='rentals_forecast_uniq')],
+            },
+        ),
+    ]
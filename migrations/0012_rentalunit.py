@@ -0,0 +1,48 @@
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0011_demandforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalUnit',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('hub_id', models.UUIDField(blank=True, db_index=True, editable=False, help_text='Hub this record belongs to (for multi-tenancy)', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.UUIDField(blank=True, help_text='UUID of the user who created this record', null=True)),
+                ('updated_by', models.UUIDField(blank=True, help_text='UUID of the user who last updated this record', null=True)),
+                ('is_deleted', models.BooleanField(db_index=True, default=False, help_text='Soft delete flag - record is hidden but not removed')),
+                ('deleted_at', models.DateTimeField(blank=True, help_text='Timestamp when record was soft deleted', null=True)),
+                ('serial', models.CharField(max_length=100, verbose_name='Serial')),
+                ('condition', models.CharField(choices=[('new', 'New'), ('good', 'Good'), ('fair', 'Fair'), ('damaged', 'Damaged'), ('repair', 'In Repair')], default='good', max_length=20, verbose_name='Condition')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Is Active')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='units', to='rentals.rentalitem', verbose_name='Item')),
+            ],
+            options={
+                'db_table': 'rentals_unit',
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('item', 'serial'), name='rentals_unit_serial_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RentalAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hub_id', models.UUIDField(blank=True, null=True)),
+                ('rental', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='allocation', to='rentals.rental')),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='rentals.rentalunit')),
+            ],
+            options={
+                'db_table': 'rentals_allocation',
+            },
+        ),
+    ]
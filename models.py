@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -11,26 +12,42 @@ RENTAL_STATUS = [
     ('cancelled', _('Cancelled')),
 ]
 
+# Partial-index condition: list, detail and availability queries only touch live rows.
+LIVE = models.Q(is_deleted=False)
+# The archival job only scans soft-deleted rows (see archive.py).
+DELETED = models.Q(is_deleted=True)
+
 class RentalItem(HubBaseModel):
     name = models.CharField(max_length=255, verbose_name=_('Name'))
     code = models.CharField(max_length=50, blank=True, verbose_name=_('Code'))
     description = models.TextField(blank=True, verbose_name=_('Description'))
     daily_rate = models.DecimalField(max_digits=10, decimal_places=2, default='0', verbose_name=_('Daily Rate'))
+    # Optional tier prices for a full week / 30 days (0 = not offered, see pricing.py)
+    weekly_rate = models.DecimalField(max_digits=10, decimal_places=2, default='0', verbose_name=_('Weekly Rate'))
+    monthly_rate = models.DecimalField(max_digits=10, decimal_places=2, default='0', verbose_name=_('Monthly Rate'))
     is_available = models.BooleanField(default=True, verbose_name=_('Is Available'))
     is_active = models.BooleanField(default=True, verbose_name=_('Is Active'))
     category = models.CharField(max_length=100, blank=True, verbose_name=_('Category'))
     location = models.CharField(max_length=255, blank=True, verbose_name=_('Location'))
     quantity_total = models.PositiveIntegerField(default=1, verbose_name=_('Total Quantity'))
+    # Denormalised text for full-text search, refreshed on save (see search.py)
+    search_text = models.TextField(blank=True, default='', editable=False)
 
     class Meta(HubBaseModel.Meta):
         db_table = 'rentals_rentalitem'
+        indexes = [
+            models.Index(fields=['hub_id', 'code'], name='rentals_item_hub_code_idx', condition=LIVE),
+            models.Index(fields=['hub_id', 'name'], name='rentals_item_hub_name_idx', condition=LIVE),
+            models.Index(fields=['deleted_at'], name='rentals_item_deleted_idx', condition=DELETED),
+        ]
 
     def __str__(self):
         return self.name
 
 
 class Rental(HubBaseModel):
-    reference = models.CharField(max_length=50, verbose_name=_('Reference'))
+    # Filled from the hub's RentalSequence when left blank (see references.py)
+    reference = models.CharField(max_length=50, blank=True, verbose_name=_('Reference'))
     item = models.ForeignKey('RentalItem', on_delete=models.CASCADE)
     customer_name = models.CharField(max_length=255, verbose_name=_('Customer Name'))
     status = models.CharField(max_length=20, default='reserved', choices=RENTAL_STATUS, verbose_name=_('Status'))
@@ -50,9 +67,25 @@ class Rental(HubBaseModel):
     condition_out = models.TextField(blank=True, verbose_name=_('Condition at Checkout'))
     condition_in = models.TextField(blank=True, verbose_name=_('Condition at Return'))
     notes = models.TextField(blank=True, verbose_name=_('Notes'))
+    # Denormalised text for full-text search, refreshed on save (see search.py)
+    search_text = models.TextField(blank=True, default='', editable=False)
 
     class Meta(HubBaseModel.Meta):
         db_table = 'rentals_rental'
+        indexes = [
+            models.Index(fields=['hub_id', 'start_date'], name='rentals_hub_start_idx', condition=LIVE),
+            models.Index(
+                fields=['item', 'status', 'start_date', 'end_date'],
+                name='rentals_item_status_idx', condition=LIVE,
+            ),
+            # Overdue sweep: status = 'active' AND end_date < today
+            models.Index(fields=['status', 'end_date'], name='rentals_status_end_idx', condition=LIVE),
+            models.Index(fields=['deleted_at'], name='rentals_deleted_idx', condition=DELETED),
+        ]
+        constraints = [
+            # Also serves reference lookups (replaces rentals_hub_ref_idx)
+            models.UniqueConstraint(fields=['hub_id', 'reference'], name='rentals_hub_ref_uniq', condition=LIVE),
+        ]
 
     def __str__(self):
         return self.reference
@@ -67,7 +100,185 @@ class RentalBlackout(HubBaseModel):
 
     class Meta(HubBaseModel.Meta):
         db_table = 'rentals_blackout'
+        indexes = [
+            models.Index(
+                fields=['item', 'start_date', 'end_date'],
+                name='rentals_blackout_item_idx', condition=LIVE,
+            ),
+            models.Index(fields=['deleted_at'], name='rentals_blackout_deleted_idx', condition=DELETED),
+        ]
 
     def __str__(self):
         return f'{self.item.name}: {self.start_date} - {self.end_date}'
 
+
+
+class SeasonalRate(HubBaseModel):
+    """Price multiplier for a date range, for one item or (without item) every item of the hub."""
+    item = models.ForeignKey(
+        'RentalItem', on_delete=models.CASCADE, null=True, blank=True,
+        related_name='seasonal_rates', verbose_name=_('Item'),
+    )
+    name = models.CharField(max_length=100, blank=True, verbose_name=_('Name'))
+    start_date = models.DateField(verbose_name=_('Start Date'))
+    end_date = models.DateField(verbose_name=_('End Date'))
+    multiplier = models.DecimalField(max_digits=5, decimal_places=3, default='1', verbose_name=_('Multiplier'))
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'rentals_seasonal_rate'
+        indexes = [
+            models.Index(fields=['hub_id', 'start_date', 'end_date'], name='rentals_season_hub_idx', condition=LIVE),
+        ]
+
+    def __str__(self):
+        return f'{self.name or self.multiplier}: {self.start_date} - {self.end_date}'
+
+
+UNIT_CONDITION = [
+    ('new', _('New')),
+    ('good', _('Good')),
+    ('fair', _('Fair')),
+    ('damaged', _('Damaged')),
+    ('repair', _('In Repair')),
+]
+
+
+class RentalUnit(HubBaseModel):
+    """One physical unit of an item; rentals are assigned units by allocation.py."""
+    item = models.ForeignKey('RentalItem', on_delete=models.CASCADE, related_name='units', verbose_name=_('Item'))
+    serial = models.CharField(max_length=100, verbose_name=_('Serial'))
+    condition = models.CharField(max_length=20, choices=UNIT_CONDITION, default='good', verbose_name=_('Condition'))
+    notes = models.TextField(blank=True, verbose_name=_('Notes'))
+    # Retired or in-repair units are not allocated
+    is_active = models.BooleanField(default=True, verbose_name=_('Is Active'))
+
+    class Meta(HubBaseModel.Meta):
+        db_table = 'rentals_unit'
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'serial'], condition=LIVE, name='rentals_unit_serial_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.item} #{self.serial}'
+
+
+class RentalAllocation(models.Model):
+    """The unit a live rental takes for its dates (see allocation.py)."""
+    hub_id = models.UUIDField(null=True, blank=True)
+    rental = models.OneToOneField('Rental', on_delete=models.CASCADE, related_name='allocation')
+    unit = models.ForeignKey('RentalUnit', on_delete=models.CASCADE, related_name='allocations')
+
+    class Meta:
+        db_table = 'rentals_allocation'
+
+    def __str__(self):
+        return f'{self.rental} -> {self.unit}'
+
+
+class OccupancyGrid(models.Model):
+    """
+    Units in use per day for one item, packed as uint16 (see occupancy.py).
+
+    Rebuilt from the rentals and blackouts of the item whenever they change.
+    """
+    item = models.OneToOneField('RentalItem', on_delete=models.CASCADE, related_name='occupancy_grid')
+    hub_id = models.UUIDField(null=True, blank=True, db_index=True)
+    origin = models.DateField()
+    counts = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rentals_occupancy_grid'
+
+    def __str__(self):
+        return f'{self.item_id} from {self.origin}'
+
+
+class RentalSequence(models.Model):
+    """
+    Next free rental reference number of a hub (see references.py).
+
+    Workers reserve numbers in blocks, so this row is written once per block.
+    """
+    hub_id = models.UUIDField(unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'rentals_sequence'
+
+    def __str__(self):
+        return f'{self.hub_id}: {self.next_value}'
+
+
+class RentalMetric(models.Model):
+    """
+    Materialised per-hub dashboard counter (see metrics.py).
+
+    Kept up to date incrementally by signals and bulk actions, and rebuilt by
+    the ``rentals_reconcile_metrics`` command.
+    """
+    hub_id = models.UUIDField(db_index=True)
+    key = models.CharField(max_length=150)
+    value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rentals_metric'
+        constraints = [
+            models.UniqueConstraint(fields=['hub_id', 'key'], name='rentals_metric_hub_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.key}={self.value}'
+
+
+class RentalArchive(models.Model):
+    """
+    A row moved out of the working tables by the archival job (see archive.py).
+
+    ``data`` holds the row's column values as they were when it was archived.
+    """
+    hub_id = models.UUIDField(null=True, blank=True)
+    model = models.CharField(max_length=30)
+    object_id = models.UUIDField()
+    reason = models.CharField(max_length=20)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        db_table = 'rentals_archive'
+        indexes = [
+            models.Index(fields=['hub_id', 'model', 'object_id'], name='rentals_archive_object_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} ({self.reason})'
+
+
+class DemandForecast(models.Model):
+    """
+    Expected weekly demand of a category at a location (see forecasting.py).
+
+    ``expected_units`` is the average number of units out per day of the
+    week; ``capacity`` the active units of the category and location when
+    the forecast was made. Rewritten per hub by ``rentals_forecast``.
+    """
+    hub_id = models.UUIDField()
+    category = models.CharField(max_length=100, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    week_start = models.DateField()
+    expected_units = models.DecimalField(max_digits=10, decimal_places=2)
+    capacity = models.PositiveIntegerField(default=0)
+    generated_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'rentals_forecast'
+        ordering = ['category', 'location', 'week_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hub_id', 'category', 'location', 'week_start'], name='rentals_forecast_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.category}/{self.location} {self.week_start}: {self.expected_units} of {self.capacity}'
@@ -18,6 +18,8 @@ NAVIGATION = [
     {'label': _('Dashboard'), 'icon': 'speedometer-outline', 'id': 'dashboard'},
 {'label': _('Items'), 'icon': 'cube-outline', 'id': 'items'},
 {'label': _('Rentals'), 'icon': 'key-outline', 'id': 'rentals'},
+{'label': _('Calendar'), 'icon': 'calendar-outline', 'id': 'calendar'},
+{'label': _('Analytics'), 'icon': 'stats-chart-outline', 'id': 'analytics'},
 {'label': _('Settings'), 'icon': 'settings-outline', 'id': 'settings'},
 ]
 
@@ -0,0 +1,214 @@
+"""
+Keyset (cursor) pagination for the rentals datatables.
+
+OFFSET paging gets linearly slower the deeper the page, because the database
+still walks every skipped row. Keyset paging instead remembers the sort value
+and primary key of the last row shown and asks for rows strictly after it, so
+every page costs the same index range scan. Cursors are opaque URL-safe
+tokens; totals come from a short-lived cache instead of a ``COUNT(*)`` per
+request.
+"""
+import base64
+import datetime
+import hashlib
+import json
+import uuid
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+# Rows per chunk when the datatable streams "all" rows via infinite scroll.
+KEYSET_CHUNK_SIZE = 200
+
+# Above this many rows the datatable switches from page numbers to cursors.
+KEYSET_THRESHOLD = 10_000
+
+COUNT_CACHE_TIMEOUT = 60
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """Pack a list of sort values into an opaque URL-safe token."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of :func:`encode_cursor`; returns ``None`` for malformed tokens."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    return values
+
+
+def _sort_model_field(model, path):
+    field = None
+    for part in path.split('__'):
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            # An annotation: its values are used as they come
+            return None
+        model = field.related_model
+    return field
+
+
+def _clean_cursor(model, sort_field, values):
+    """
+    Cursor values converted for ``sort_field`` and the primary key.
+
+    Returns ``None`` when they do not fit the fields (a forged or stale
+    cursor), so the caller falls back to the first page.
+    """
+    if values is None:
+        return None
+    value, pk = values
+    try:
+        field = _sort_model_field(model, sort_field)
+        if field is not None and value is not None:
+            value = field.to_python(value)
+        pk = model._meta.pk.to_python(pk)
+    except (ValidationError, ValueError, TypeError):
+        return None
+    if pk is None:
+        return None
+    return value, pk
+
+
+def _resolve(obj, path):
+    if isinstance(obj, dict):
+        # values() rows carry the primary key as ``id``
+        return obj['id' if path == 'pk' else path]
+    for part in path.split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def cached_count(qs, timeout=COUNT_CACHE_TIMEOUT, namespace=''):
+    """
+    Row count of ``qs``, cached for ``timeout`` seconds.
+
+    The key is derived from the compiled SQL, so each hub/search combination
+    gets its own entry. ``namespace`` lets callers fold a generation counter
+    into the key to drop stale counts early.
+    """
+    return cache.get_or_set(_count_key(qs, namespace), qs.count, timeout)
+
+
+async def acached_count(qs, timeout=COUNT_CACHE_TIMEOUT, namespace=''):
+    """Async :func:`cached_count`."""
+    key = _count_key(qs, namespace)
+    total = await cache.aget(key)
+    if total is None:
+        total = await qs.acount()
+        await cache.aset(key, total, timeout)
+    return total
+
+
+def _count_key(qs, namespace):
+    digest = hashlib.md5(str(qs.query).encode(), usedforsecurity=False).hexdigest()
+    return f'rentals:count:{namespace}:{digest}'
+
+
+class KeysetPage:
+    """
+    A page of rows fetched by cursor.
+
+    Mirrors the parts of ``django.core.paginator.Page`` the datatable templates
+    use, plus the cursors for the neighbouring pages. ``scroll`` marks pages
+    that are streamed as infinite-scroll chunks rather than navigated.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, *, per_page, count, has_next, has_previous,
+                 next_cursor=None, prev_cursor=None, scroll=False):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.count = count
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.scroll = scroll
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage {len(self.object_list)} rows>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+def keyset_page(qs, sort_field, *, descending=False, after=None, before=None,
+                per_page=KEYSET_CHUNK_SIZE, count=None, scroll=False):
+    """
+    Fetch one page of ``qs`` ordered by ``(sort_field, pk)``.
+
+    ``after``/``before`` are cursors returned on a previous page; without
+    either, or when a cursor's values do not fit the sort field and primary
+    key, the first page is returned. Only ``per_page + 1`` rows are read,
+    the extra row telling whether another page exists in that direction.
+    ``qs`` may be a ``values()`` queryset as long as it includes ``id`` and
+    ``sort_field``.
+    """
+    op = 'lt' if descending else 'gt'
+    rev = 'gt' if descending else 'lt'
+    prefix = '-' if descending else ''
+    flipped = '' if descending else '-'
+
+    after_values = _clean_cursor(qs.model, sort_field, decode_cursor(after))
+    before_values = _clean_cursor(qs.model, sort_field, decode_cursor(before)) if after_values is None else None
+
+    if before_values is not None:
+        value, pk = before_values
+        qs = qs.filter(Q(**{f'{sort_field}__{rev}': value}) | Q(**{sort_field: value, f'pk__{rev}': pk}))
+        rows = list(qs.order_by(f'{flipped}{sort_field}', f'{flipped}pk')[:per_page + 1])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+    else:
+        if after_values is not None:
+            value, pk = after_values
+            qs = qs.filter(Q(**{f'{sort_field}__{op}': value}) | Q(**{sort_field: value, f'pk__{op}': pk}))
+        rows = list(qs.order_by(f'{prefix}{sort_field}', f'{prefix}pk')[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = after_values is not None
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor([_resolve(rows[-1], sort_field), _resolve(rows[-1], 'pk')])
+    if rows and has_previous:
+        prev_cursor = encode_cursor([_resolve(rows[0], sort_field), _resolve(rows[0], 'pk')])
+    return KeysetPage(
+        rows, per_page=per_page, count=count, has_next=has_next, has_previous=has_previous,
+        next_cursor=next_cursor, prev_cursor=prev_cursor, scroll=scroll,
+    )
@@ -0,0 +1,164 @@
+"""
+Per-hub rental reference numbers (``R-000001``, ``R-000002``...).
+
+Each hub has one ``RentalSequence`` counter row. A worker never takes a
+single number from it: it reserves a block of ``REFERENCE_BLOCK_SIZE``
+numbers with one short ``SELECT ... FOR UPDATE`` and hands them out from
+memory, so the counter row is touched once per block instead of once per
+rental and new references never need a ``MAX(reference)`` scan.
+
+Blocks are reserved in their own short transaction. When the caller is
+already inside one (``save_rental`` always is), the reservation runs on a
+separate connection in a helper thread and commits at once, so the counter
+row is never locked for the length of someone else's booking and the block
+is cached immediately. On backends without row locks (SQLite) the database
+serialises writers anyway and the block is reserved in the caller's
+transaction, cached once it commits.
+
+Bulk writers (the importer) call :func:`reserve_references` instead: one
+block sized to the batch, checked against the hub's references with one
+query.
+
+Numbers are unique but not gapless: a block reserved by a worker that exits
+early, or by a transaction that rolls back, is simply skipped. Numbers that
+a user already typed as a reference are skipped too.
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections, transaction
+
+from .models import Rental, RentalSequence
+
+REFERENCE_BLOCK_SIZE = 50
+REFERENCE_PREFIX = 'R-'
+REFERENCE_DIGITS = 6
+
+_NUMBERED = re.compile(rf'^{re.escape(REFERENCE_PREFIX)}(\d+)$')
+
+# hub_id -> [next number, last number of the reserved block]
+_blocks = {}
+_lock = threading.Lock()
+
+
+def format_reference(number):
+    return f'{REFERENCE_PREFIX}{number:0{REFERENCE_DIGITS}d}'
+
+
+def highest_number(hub_id):
+    """Largest ``R-<n>`` number already used by the hub (one-off scan when a counter is created)."""
+    highest = 0
+    references = Rental.all_objects.filter(
+        hub_id=hub_id, reference__startswith=REFERENCE_PREFIX,
+    ).values_list('reference', flat=True).iterator()
+    for reference in references:
+        match = _NUMBERED.match(reference)
+        if match:
+            highest = max(highest, int(match.group(1)))
+    return highest
+
+
+def reserve_block(hub_id, size=REFERENCE_BLOCK_SIZE, highest=None):
+    """
+    Take ``size`` numbers from the hub's counter; returns ``(first, last)``.
+
+    ``highest`` is the hub's largest used number when the caller already
+    knows it; it is only needed to start a new counter.
+    """
+    with transaction.atomic():
+        sequence = RentalSequence.objects.select_for_update().filter(hub_id=hub_id).first()
+        if sequence is None:
+            if highest is None:
+                highest = highest_number(hub_id)
+            sequence, _ = RentalSequence.objects.get_or_create(hub_id=hub_id, defaults={'next_value': highest + 1})
+            sequence = RentalSequence.objects.select_for_update().get(pk=sequence.pk)
+        first = sequence.next_value
+        sequence.next_value = first + size
+        sequence.save(update_fields=['next_value'])
+    return first, first + size - 1
+
+
+def _reserve_in_own_transaction(hub_id, size=REFERENCE_BLOCK_SIZE):
+    # The helper thread opens its own connection, so it cannot see rows the
+    # caller has not committed yet: a new counter starts from the caller's view.
+    highest = None
+    if not RentalSequence.objects.filter(hub_id=hub_id).exists():
+        highest = highest_number(hub_id)
+
+    def work():
+        try:
+            return reserve_block(hub_id, size, highest=highest)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(work).result()
+
+
+def _take(hub_id):
+    with _lock:
+        block = _blocks.get(hub_id)
+        if block and block[0] <= block[1]:
+            number = block[0]
+            block[0] += 1
+            return number
+    return None
+
+
+def _next_number(hub_id):
+    number = _take(hub_id)
+    if number is not None:
+        return number
+    if connection.in_atomic_block and connection.features.has_select_for_update:
+        first, last = _reserve_in_own_transaction(hub_id)
+        with _lock:
+            _blocks[hub_id] = [first + 1, last]
+        return first
+    first, last = reserve_block(hub_id)
+
+    def keep():
+        with _lock:
+            _blocks[hub_id] = [first + 1, last]
+
+    # Runs immediately outside a transaction; dropped if the caller rolls back
+    transaction.on_commit(keep)
+    return first
+
+
+def next_reference(hub_id):
+    """Next free reference for ``hub_id``, skipping numbers already typed by hand."""
+    while True:
+        reference = format_reference(_next_number(hub_id))
+        if not Rental.all_objects.filter(hub_id=hub_id, reference=reference).exists():
+            return reference
+
+
+def reserve_references(hub_id, count, taken=()):
+    """
+    ``count`` new references for a bulk write, from blocks reserved for it.
+
+    Numbers already used by the hub or listed in ``taken`` (e.g. typed in
+    the same batch) are skipped, with one query per block. The blocks are
+    reserved in their own transaction as in :func:`next_reference`.
+    """
+    taken = set(taken)
+    found = []
+    while len(found) < count:
+        size = count - len(found)
+        if connection.in_atomic_block and connection.features.has_select_for_update:
+            first, last = _reserve_in_own_transaction(hub_id, size)
+        else:
+            first, last = reserve_block(hub_id, size)
+        candidates = [format_reference(number) for number in range(first, last + 1)]
+        taken |= set(
+            Rental.all_objects.filter(hub_id=hub_id, reference__in=candidates).values_list('reference', flat=True)
+        )
+        found += [reference for reference in candidates if reference not in taken]
+    return found
+
+
+def reset():
+    """Forget the cached blocks (tests, or after restoring a database)."""
+    with _lock:
+        _blocks.clear()
@@ -0,0 +1,187 @@
+"""
+Full-text search for rentals and rental items.
+
+Each searchable model keeps a denormalised ``search_text`` column, refreshed
+on every save. How it is queried depends on the database:
+
+* PostgreSQL: a GIN index on ``to_tsvector('simple', search_text)`` answers
+  ranked prefix queries (``term:*``), and a ``gin_trgm_ops`` index on the same
+  column serves the infix ``ILIKE`` fallback. When the trigram index could
+  not be created (no ``pg_trgm``) the ``ILIKE`` branch is left out, since
+  without the index it would scan the whole table on every search.
+* SQLite: an FTS5 virtual table (``rentals_search_fts``) mirrors the column
+  and is kept in sync by the save/delete signals.
+* Anything else falls back to ``icontains`` on ``search_text``.
+
+Every backend matches each query token as a prefix, so results narrow as the
+user types.
+"""
+import logging
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import RENTAL_STATUS
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'rentals_search_fts'
+
+# Created by migration 0003 when pg_trgm is available.
+TRIGRAM_INDEXES = {
+    'rentalitem': 'rentals_item_search_trgm_idx',
+    'rental': 'rentals_search_trgm_idx',
+}
+
+SEARCH_FIELDS = {
+    'rentalitem': ('name', 'code', 'description'),
+    'rental': ('reference', 'customer_name', 'notes'),
+}
+
+MAX_TOKENS = 8
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Per-alias cache of whether the FTS5 table exists.
+_fts_tables = {}
+
+# Per-alias cache of the trigram indexes present.
+_trigram_indexes = {}
+
+
+def build_search_text(instance):
+    """Lower-cased text indexed for ``instance``."""
+    fields = SEARCH_FIELDS[instance._meta.model_name]
+    return ' '.join(str(getattr(instance, f) or '') for f in fields).lower().strip()
+
+
+def tokenize(query):
+    return _TOKEN.findall(query.lower())[:MAX_TOKENS]
+
+
+def _fts_ready(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[connection.alias]
+
+
+def _trigram_ready(connection, model_name):
+    if connection.alias not in _trigram_indexes:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)', [list(TRIGRAM_INDEXES.values())],
+            )
+            found = {row[0] for row in cursor.fetchall()}
+        if len(found) < len(TRIGRAM_INDEXES):
+            logger.warning('rentals: trigram search indexes are missing; infix search matches are disabled.')
+        _trigram_indexes[connection.alias] = found
+    return TRIGRAM_INDEXES[model_name] in _trigram_indexes[connection.alias]
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _match_and_rank(qs, tokens, query):
+    connection = connections[qs.db]
+    qn = connection.ops.quote_name
+    table = qn(qs.model._meta.db_table)
+    column = f'{table}.{qn("search_text")}'
+
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        vector = f"to_tsvector('simple', {column})"
+        if _trigram_ready(connection, qs.model._meta.model_name):
+            match = RawSQL(
+                f"({vector} @@ to_tsquery('simple', %s) OR {column} ILIKE %s)",
+                (tsquery, f'%{_like_escape(query.lower())}%'),
+                output_field=BooleanField(),
+            )
+        else:
+            match = RawSQL(f"{vector} @@ to_tsquery('simple', %s)", (tsquery,), output_field=BooleanField())
+        rank = RawSQL(f"ts_rank({vector}, to_tsquery('simple', %s))", (tsquery,), output_field=FloatField())
+        return match, rank
+
+    if _fts_ready(connection):
+        fts_query = ' '.join(f'"{token}"*' for token in tokens)
+        kind = qs.model._meta.model_name
+        pk = f'{table}.{qn(qs.model._meta.pk.column)}'
+        match = RawSQL(
+            f'{pk} IN (SELECT obj_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND kind = %s)',
+            (fts_query, kind),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND kind = %s AND obj_id = {pk})',
+            (fts_query, kind),
+            output_field=FloatField(),
+        )
+        return match, rank
+
+    match = Q()
+    for token in tokens:
+        match &= Q(search_text__icontains=token)
+    return match, Value(0.0, output_field=FloatField())
+
+
+def search(qs, query, extra=None):
+    """
+    Filter ``qs`` to rows matching ``query`` and annotate ``search_rank``.
+
+    ``extra`` is an optional ``Q`` OR-ed with the text match (used for exact
+    status matches on rentals). Higher ranks are better matches.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return qs.annotate(search_rank=Value(0.0, output_field=FloatField()))
+    match, rank = _match_and_rank(qs, tokens, query)
+    condition = Q(match) | extra if extra is not None else match
+    return qs.filter(condition).annotate(search_rank=rank)
+
+
+def search_rental_items(qs, query):
+    """Ranked search over name, code and description."""
+    return search(qs, query)
+
+
+def search_rentals(qs, query):
+    """Ranked search over reference, customer name and notes, plus exact status."""
+    needle = query.strip().lower()
+    statuses = [key for key, label in RENTAL_STATUS if needle in (key, str(label).lower())]
+    return search(qs, query, extra=Q(status__in=statuses) if statuses else None)
+
+
+def index_instances(instances):
+    """Refresh the FTS5 mirror for ``instances`` (no-op on other backends)."""
+    instances = list(instances)
+    if not instances:
+        return
+    connection = connections[instances[0]._state.db or 'default']
+    if not _fts_ready(connection):
+        return
+    unindex_instances(instances)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (kind, obj_id, body) VALUES (%s, %s, %s)',
+            [(i._meta.model_name, i.pk.hex, i.search_text or build_search_text(i)) for i in instances],
+        )
+
+
+def unindex_instances(instances):
+    """Drop ``instances`` from the FTS5 mirror (no-op on other backends)."""
+    instances = list(instances)
+    if not instances:
+        return
+    connection = connections[instances[0]._state.db or 'default']
+    if not _fts_ready(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE obj_id = %s',
+            [(i.pk.hex,) for i in instances],
+        )
@@ -0,0 +1,102 @@
+"""
+Signal handlers for the Rentals module.
+
+Connected from ``RentalsConfig.ready()``. Queryset ``update()``/``bulk_create``
+calls bypass these handlers; code paths that use them refresh the derived
+data explicitly.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import fragment_cache, metrics, occupancy, references, search
+from .models import RentalItem, Rental, RentalBlackout
+
+
+# Connected before refresh_search_text so the reference is indexed
+@receiver(pre_save, sender=Rental)
+def assign_reference(sender, instance, **kwargs):
+    if not instance.reference:
+        instance.reference = references.next_reference(instance.hub_id)
+
+
+@receiver(pre_save, sender=RentalItem)
+@receiver(pre_save, sender=Rental)
+def refresh_search_text(sender, instance, **kwargs):
+    instance.search_text = search.build_search_text(instance)
+
+
+@receiver(post_save, sender=RentalItem)
+@receiver(post_save, sender=Rental)
+def index_search_text(sender, instance, **kwargs):
+    search.index_instances([instance])
+
+
+@receiver(post_delete, sender=RentalItem)
+@receiver(post_delete, sender=Rental)
+def unindex_search_text(sender, instance, **kwargs):
+    search.unindex_instances([instance])
+
+
+@receiver(pre_save, sender=RentalItem)
+@receiver(pre_save, sender=Rental)
+@receiver(pre_save, sender=RentalBlackout)
+def snapshot_metrics(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._metrics_before = None
+    else:
+        instance._metrics_before = metrics.stored_states(sender, [instance.pk]).get(instance.pk)
+
+
+@receiver(post_save, sender=RentalItem)
+@receiver(post_save, sender=Rental)
+@receiver(post_save, sender=RentalBlackout)
+def update_metrics(sender, instance, **kwargs):
+    before = getattr(instance, '_metrics_before', None)
+    metrics.record_change(sender, before, metrics.instance_state(instance))
+    if sender is RentalItem and before:
+        metrics.move_category(instance.hub_id, instance.pk, before['category'], instance.category)
+
+
+@receiver(post_delete, sender=RentalItem)
+@receiver(post_delete, sender=Rental)
+@receiver(post_delete, sender=RentalBlackout)
+def remove_metrics(sender, instance, **kwargs):
+    metrics.record_change(sender, metrics.instance_state(instance), None)
+
+
+@receiver(post_save, sender=RentalItem)
+@receiver(post_save, sender=Rental)
+@receiver(post_save, sender=RentalBlackout)
+@receiver(post_delete, sender=RentalItem)
+@receiver(post_delete, sender=Rental)
+@receiver(post_delete, sender=RentalBlackout)
+def invalidate_fragments(sender, instance, **kwargs):
+    fragment_cache.bump(instance.hub_id)
+
+
+@receiver(pre_save, sender=Rental)
+@receiver(pre_save, sender=RentalBlackout)
+def snapshot_grid_item(sender, instance, **kwargs):
+    # Moving a booking to another item changes both items' grids
+    instance._grid_item_before = None
+    if not instance._state.adding:
+        instance._grid_item_before = (
+            sender._base_manager.filter(pk=instance.pk).values_list('item_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Rental)
+@receiver(post_save, sender=RentalBlackout)
+def rebuild_occupancy(sender, instance, **kwargs):
+    item_ids = {instance.item_id, getattr(instance, '_grid_item_before', None)}
+    item_ids.discard(None)
+    occupancy.rebuild_item_ids(item_ids)
+
+
+@receiver(post_delete, sender=Rental)
+@receiver(post_delete, sender=RentalBlackout)
+def rebuild_occupancy_on_delete(sender, instance, origin=None, **kwargs):
+    # When the item itself is being deleted its grid goes with it
+    if isinstance(origin, RentalItem) or getattr(origin, 'model', None) is RentalItem:
+        return
+    occupancy.rebuild_item_ids([instance.item_id])
@@ -0,0 +1,198 @@
+"""
+Fixtures for the rentals benchmark suite.
+
+Benchmarks seed large tables and are skipped unless ``RENTALS_BENCHMARKS=1``
+is set. ``RENTALS_BENCHMARK_SCALE`` picks the data set (``10k``, ``100k`` or
+``1M`` rentals, default ``1M``); ``RENTALS_BENCHMARK_ROWS`` overrides the
+row count directly.
+
+The ``measure`` fixture runs a hot path once with query capture and
+``tracemalloc``, then times it with pytest-benchmark, and compares query
+count, median wall time and peak Python heap with ``baseline.json`` (keyed
+by scale and test id). Query counts must not grow; time and memory may
+exceed the baseline by ``RENTALS_BENCHMARK_TOLERANCE`` (default 0.5, i.e.
++50%) to absorb machine noise. A benchmark with no baseline entry for the
+scale only warns, so new benchmarks and scales can land before their
+numbers are recorded. Run with ``RENTALS_BENCHMARK_UPDATE=1`` to write the
+measured values back as the new baseline (and commit ``baseline.json``).
+"""
+import datetime
+import json
+import os
+import tracemalloc
+import uuid
+import warnings
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rentals import fragment_cache, occupancy
+from rentals.models import RentalItem, Rental, RentalBlackout
+from rentals.search import build_search_text, index_instances
+
+if not os.environ.get('RENTALS_BENCHMARKS'):
+    collect_ignore_glob = ['test_*.py']
+
+STATUSES = ['reserved', 'active', 'returned', 'overdue', 'cancelled']
+EPOCH = datetime.date(2020, 1, 1)
+BATCH_SIZE = 10_000
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+SCALE = os.environ.get('RENTALS_BENCHMARK_SCALE', '1M')
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+TOLERANCE = float(os.environ.get('RENTALS_BENCHMARK_TOLERANCE', '0.5'))
+UPDATE_BASELINE = bool(os.environ.get('RENTALS_BENCHMARK_UPDATE'))
+
+_measured = {}
+
+
+def seed(rentals=1_000_000, hubs=20, items_per_hub=250, blackouts_per_item=2):
+    """
+    Insert a deterministic data set spread over ``hubs`` hubs.
+
+    Returns ``(hub_ids, item_ids)``. One in twenty rentals is soft-deleted so
+    partial indexes are exercised against realistic data.
+    """
+    hub_ids = [uuid.UUID(int=h + 1) for h in range(hubs)]
+    items = [
+        RentalItem(
+            hub_id=hub_ids[h], name=f'Item {h}-{n}', code=f'IT-{h:03d}-{n:05d}',
+            daily_rate=Decimal(5 + n % 50), category=f'Category {n % 12}',
+            location=f'Location {n % 4}', quantity_total=1 + n % 5,
+        )
+        for h in range(hubs) for n in range(items_per_hub)
+    ]
+    for item in items:
+        item.search_text = build_search_text(item)
+    RentalItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+    index_instances(items)
+
+    blackouts = [
+        RentalBlackout(
+            hub_id=item.hub_id, item=item,
+            start_date=EPOCH + datetime.timedelta(days=(n * 97 + b * 211) % 2000),
+            end_date=EPOCH + datetime.timedelta(days=(n * 97 + b * 211) % 2000 + 3),
+            reason='Maintenance',
+        )
+        for n, item in enumerate(items) for b in range(blackouts_per_item)
+    ]
+    RentalBlackout.objects.bulk_create(blackouts, batch_size=BATCH_SIZE)
+
+    batch = []
+    for n in range(rentals):
+        item = items[(n * 7919) % len(items)]
+        start = EPOCH + datetime.timedelta(days=n % 2000)
+        rental = Rental(
+            hub_id=item.hub_id, item=item, reference=f'R-{n:08d}',
+            customer_name=f'Customer {n % 5000}', status=STATUSES[n % len(STATUSES)],
+            start_date=start, end_date=start + datetime.timedelta(days=n % 14),
+            total=Decimal(n % 500), is_deleted=(n % 20 == 0),
+        )
+        rental.search_text = build_search_text(rental)
+        batch.append(rental)
+        if len(batch) >= BATCH_SIZE:
+            Rental.objects.bulk_create(batch)
+            index_instances(batch)
+            batch = []
+    if batch:
+        Rental.objects.bulk_create(batch)
+        index_instances(batch)
+    occupancy.rebuild(items)
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for table in ('rentals_rentalitem', 'rentals_rental', 'rentals_blackout'):
+                cursor.execute(f'ANALYZE {table}')
+    return hub_ids, [item.pk for item in items]
+
+
+@pytest.fixture(scope='session')
+def seeded(django_db_setup, django_db_blocker):
+    """Seed the benchmark data set once per session."""
+    rows = int(os.environ.get('RENTALS_BENCHMARK_ROWS', SCALES[SCALE]))
+    with django_db_blocker.unblock():
+        return seed(rentals=rows)
+
+
+@pytest.fixture
+def hub_id(seeded):
+    """Point the shared client fixtures at the first seeded hub."""
+    return seeded[0][0]
+
+
+def _load_baseline():
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text())
+    return {}
+
+
+def _check(name, observed, baseline):
+    if UPDATE_BASELINE:
+        return
+    if baseline is None:
+        warnings.warn(f'{name}: no baseline recorded; run with RENTALS_BENCHMARK_UPDATE=1 and commit baseline.json')
+        return
+    if observed['queries'] > baseline['queries']:
+        pytest.fail(f"{name}: {observed['queries']} queries, baseline {baseline['queries']}")
+    for metric in ('median_s', 'peak_bytes'):
+        if observed.get(metric) is None or not baseline.get(metric):
+            continue
+        limit = baseline[metric] * (1 + TOLERANCE)
+        if observed[metric] > limit:
+            pytest.fail(f'{name}: {metric} {observed[metric]} exceeds baseline {baseline[metric]} (+{TOLERANCE:.0%})')
+
+
+@pytest.fixture
+def measure(request, benchmark, seeded):
+    """
+    Measure ``fn`` and compare it with the stored baseline.
+
+    ``setup`` (optional) runs before every call outside the measurement, for
+    example to reset rows a bulk action changed. The hub's fragment cache
+    is bumped before each call so cached list fragments do not hide the
+    queries being measured.
+    """
+    def run(fn, setup=None, rounds=5):
+        hub = seeded[0][0]
+
+        def prepare():
+            fragment_cache.bump(hub)
+            if setup:
+                setup()
+
+        # One warm-up call so one-off work (grid rebuilds, lazy imports) is not measured
+        prepare()
+        fn()
+        prepare()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        benchmark.pedantic(fn, setup=prepare, rounds=rounds, iterations=1, warmup_rounds=1)
+        stats = getattr(benchmark, 'stats', None)
+        observed = {
+            'queries': len(queries.captured_queries),
+            'median_s': round(stats.stats.median, 6) if stats else None,
+            'peak_bytes': peak,
+        }
+        benchmark.extra_info.update(observed)
+
+        name = f'{SCALE}:{request.node.nodeid.split("::", 1)[1]}'
+        _measured[name] = observed
+        _check(name, observed, _load_baseline().get(name))
+        return observed
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if UPDATE_BASELINE and _measured:
+        baseline = _load_baseline()
+        baseline.update(_measured)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
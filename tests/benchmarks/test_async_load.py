@@ -0,0 +1,96 @@
+"""
+Throughput of the sync and async read views under concurrent load.
+
+Each round fires ``RENTALS_BENCHMARK_CONCURRENCY`` requests (default 32) at
+one page. The sync views are served by a pool of
+``RENTALS_BENCHMARK_WORKERS`` threads (default 8), like a threaded WSGI
+server; the async views by one event loop, like an ASGI server. Both modes
+of a page share a pytest-benchmark group, so the report puts them side by
+side.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from apps.accounts.models import LocalUser
+from apps.configuration.models import StoreConfig
+
+pytestmark = pytest.mark.django_db
+
+CONCURRENCY = int(os.environ.get('RENTALS_BENCHMARK_CONCURRENCY', '32'))
+WORKERS = int(os.environ.get('RENTALS_BENCHMARK_WORKERS', '8'))
+
+
+@pytest.fixture(scope='session')
+def session_cookies(seeded, django_db_blocker):
+    """A committed login session, so request threads with their own connection see it."""
+    hub = seeded[0][0]
+    with django_db_blocker.unblock():
+        user = LocalUser.objects.create(
+            hub_id=hub, name='Load User', email='load@test.com', role='admin',
+            pin_hash=make_password('1234'), is_active=True,
+        )
+        config = StoreConfig.get_solo()
+        config.business_name = 'Load Store'
+        config.is_configured = True
+        config.save()
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session.update({
+            'local_user_id': str(user.id), 'user_name': user.name, 'user_email': user.email,
+            'user_role': user.role, 'hub_id': str(hub), 'store_config_checked': True,
+        })
+        session.create()
+    return {settings.SESSION_COOKIE_NAME: session.session_key}
+
+
+@pytest.fixture(params=['sync', 'async'])
+def mode(request):
+    if request.param == 'async':
+        request.getfixturevalue('async_views')
+    return request.param
+
+
+def _sync_burst(url, cookies):
+    def get(_):
+        client = Client()
+        client.cookies.load(cookies)
+        try:
+            return client.get(url).status_code
+        finally:
+            connections.close_all()
+
+    def burst():
+        with ThreadPoolExecutor(WORKERS) as pool:
+            assert set(pool.map(get, range(CONCURRENCY))) == {200}
+    return burst
+
+
+def _async_burst(url, cookies):
+    client = AsyncClient()
+    client.cookies.load(cookies)
+
+    async def burst():
+        responses = await asyncio.gather(*(client.get(url) for _ in range(CONCURRENCY)))
+        assert {response.status_code for response in responses} == {200}
+    return async_to_sync(burst)
+
+
+@pytest.mark.parametrize('page', ['dashboard', 'rentals_list', 'rental_items_list', 'rental_item_detail'])
+def test_throughput(benchmark, measure, seeded, session_cookies, mode, page):
+    """Test a burst of concurrent requests to one page."""
+    args = [seeded[1][0]] if page == 'rental_item_detail' else []
+    url = reverse(f'rentals:{page}', args=args)
+    benchmark.group = f'load:{page}'
+    burst = _async_burst if mode == 'async' else _sync_burst
+    observed = measure(burst(url, session_cookies), rounds=3)
+    if observed['median_s']:
+        benchmark.extra_info['requests_per_s'] = round(CONCURRENCY / observed['median_s'], 1)
@@ -0,0 +1,67 @@
+"""Memory ceiling and time-to-first-byte of the streaming exports."""
+import resource
+import time
+import tracemalloc
+
+import pytest
+
+from rentals.exports import stream_csv, stream_excel
+from rentals.models import Rental
+
+pytestmark = pytest.mark.django_db
+
+FIELDS = ['reference', 'item__name', 'status', 'total', 'customer_name', 'start_date']
+HEADERS = ['Reference', 'RentalItem', 'Status', 'Total', 'Customer Name', 'Start Date']
+
+# Python heap allowed for an export, independent of the row count.
+MEMORY_CEILING = 64 * 1024 * 1024
+TTFB_CEILING = 1.0
+
+
+def _export_qs(hub_ids, hubs):
+    return Rental.objects.filter(hub_id__in=hub_ids[:hubs], is_deleted=False).order_by('reference')
+
+
+# Two of the twenty seeded hubs hold ~10% of the rows (100k of 1M).
+@pytest.mark.parametrize('hubs', [2, 20], ids=['100k', '1M'])
+def test_csv_export(seeded, hubs, record_property):
+    """Test CSV export starts immediately and stays under the memory ceiling."""
+    hub_ids, _ = seeded
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = stream_csv(_export_qs(hub_ids, hubs), FIELDS, HEADERS, 'rentals.csv')
+    content = iter(response.streaming_content)
+    next(content)
+    ttfb = time.perf_counter() - started
+    rows = sum(chunk.count(b'\n') for chunk in content)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    record_property('rows', rows)
+    record_property('ttfb_s', round(ttfb, 4))
+    record_property('elapsed_s', round(elapsed, 2))
+    record_property('peak_heap_bytes', peak)
+    record_property('peak_rss_growth_kb', rss_growth)
+    assert ttfb < TTFB_CEILING
+    assert peak < MEMORY_CEILING
+
+
+@pytest.mark.parametrize('hubs', [2, 20], ids=['100k', '1M'])
+def test_excel_export(seeded, hubs, record_property):
+    """Test the write-only workbook keeps memory flat."""
+    hub_ids, _ = seeded
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = stream_excel(_export_qs(hub_ids, hubs), FIELDS, HEADERS, 'rentals.xlsx')
+    size = sum(len(chunk) for chunk in response.streaming_content)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    record_property('bytes', size)
+    record_property('elapsed_s', round(elapsed, 2))
+    record_property('peak_heap_bytes', peak)
+    assert peak < MEMORY_CEILING
@@ -0,0 +1,147 @@
+"""Query count, wall time and peak memory of the module's hot paths against the baseline."""
+import datetime
+import random
+
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+
+from rentals.ai_tools import FindAvailableItems, ListRentalItems, ListRentals
+from rentals.allocation import UnitSchedule, place
+from rentals.bulk_actions import run_rental_action
+from rentals.models import Rental
+from rentals.views import RENTAL_SORT_FIELDS
+
+pytestmark = pytest.mark.django_db
+
+WINDOW = (datetime.date(2024, 6, 1), datetime.date(2024, 6, 14))
+
+
+def _get(client, name, *args, **params):
+    url = reverse(f'rentals:{name}', args=args)
+
+    def call():
+        response = client.get(url, params)
+        assert response.status_code == 200
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+    return call
+
+
+def _tool_request(hub_id):
+    request = RequestFactory().get('/')
+    request.session = {'hub_id': str(hub_id)}
+    return request
+
+
+class TestViews:
+    """Full-page and datatable requests for the first seeded hub."""
+
+    def test_dashboard(self, auth_client, measure):
+        """Test the dashboard."""
+        measure(_get(auth_client, 'dashboard'))
+
+    def test_rentals_list(self, auth_client, measure):
+        """Test the first page of the rentals list."""
+        measure(_get(auth_client, 'rentals_list'))
+
+    @pytest.mark.parametrize('sort', sorted(RENTAL_SORT_FIELDS))
+    @pytest.mark.parametrize('direction', ['asc', 'desc'])
+    def test_rentals_sorted(self, auth_client, measure, sort, direction):
+        """Test every rentals sort key in both directions."""
+        measure(_get(auth_client, 'rentals_list', sort=sort, dir=direction))
+
+    def test_rentals_search(self, auth_client, measure):
+        """Test a ranked search from the search box."""
+        measure(_get(auth_client, 'rentals_list', q='customer 42', rank=1))
+
+    def test_rental_items_list(self, auth_client, measure):
+        """Test the first page of the items list."""
+        measure(_get(auth_client, 'rental_items_list'))
+
+    def test_rental_items_search(self, auth_client, measure):
+        """Test an item search."""
+        measure(_get(auth_client, 'rental_items_list', q='category 3'))
+
+    def test_rental_item_detail(self, auth_client, seeded, measure):
+        """Test an item detail page."""
+        _, item_ids = seeded
+        measure(_get(auth_client, 'rental_item_detail', item_ids[0]))
+
+    def test_rentals_export(self, auth_client, measure):
+        """Test a full CSV export of the hub's rentals."""
+        measure(_get(auth_client, 'rentals_list', export='csv'), rounds=1)
+
+
+class TestBulkActions:
+    """Set-based bulk actions on a page of rentals."""
+
+    def test_deposit_paid(self, seeded, measure):
+        """Test marking 200 deposits paid."""
+        hub_id = seeded[0][0]
+        ids = list(Rental.objects.filter(hub_id=hub_id).order_by('pk').values_list('pk', flat=True)[:200])
+
+        def reset():
+            Rental.objects.filter(pk__in=ids).update(deposit_paid=False)
+
+        measure(lambda: run_rental_action(hub_id, ids, 'deposit_paid'), setup=reset)
+
+    def test_mark_returned(self, seeded, measure):
+        """Test returning 200 active rentals (occupancy and metrics refresh included)."""
+        hub_id = seeded[0][0]
+        ids = list(
+            Rental.objects.filter(hub_id=hub_id, status='active').order_by('pk').values_list('pk', flat=True)[:200]
+        )
+
+        def reset():
+            Rental.objects.filter(pk__in=ids).update(status='active')
+
+        measure(lambda: run_rental_action(hub_id, ids, 'mark_returned'), setup=reset)
+
+
+class TestAssistantTools:
+    """execute() of the AI tools."""
+
+    def test_list_rentals_page(self, seeded, measure):
+        """Test one page of rentals."""
+        request = _tool_request(seeded[0][0])
+        measure(lambda: ListRentals().execute({'limit': 50}, request))
+
+    def test_list_rentals_summary(self, seeded, measure):
+        """Test revenue per month."""
+        request = _tool_request(seeded[0][0])
+        measure(lambda: ListRentals().execute({'group_by': 'month'}, request))
+
+    def test_list_rental_items_summary(self, seeded, measure):
+        """Test items per category."""
+        request = _tool_request(seeded[0][0])
+        measure(lambda: ListRentalItems().execute({'group_by': 'category'}, request))
+
+    def test_find_available_items(self, seeded, measure):
+        """Test an availability search over two weeks."""
+        request = _tool_request(seeded[0][0])
+        start, end = WINDOW
+        args = {'start_date': start.isoformat(), 'end_date': end.isoformat(), 'quantity': 2}
+        measure(lambda: FindAvailableItems().execute(args, request))
+
+
+class TestAllocation:
+    """Unit allocation without the database."""
+
+    def test_reallocate_quarter(self, measure):
+        """Test best-fit placement of a quarter of bookings over 40 units."""
+        rng = random.Random(7)
+        bookings = []
+        for _ in range(40):
+            day = 0
+            while day < 92:
+                length = rng.randint(1, 7)
+                bookings.append((len(bookings), day, day + length - 1))
+                day += length + rng.randint(0, 2)
+
+        def run():
+            placed, unplaced = place([UnitSchedule(unit) for unit in range(40)], bookings)
+            assert not unplaced
+        measure(run)
@@ -0,0 +1,78 @@
+"""Verify the hot query shapes are served by the composite indexes."""
+import datetime
+
+import pytest
+from django.db import connection
+
+from rentals.availability import BLOCKING_STATUSES
+from rentals.models import RentalItem, Rental, RentalBlackout
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(connection.vendor != 'postgresql', reason='EXPLAIN plans are PostgreSQL specific'),
+]
+
+WINDOW = (datetime.date(2022, 3, 1), datetime.date(2022, 3, 31))
+
+
+def _plan(qs):
+    return qs.explain()
+
+
+class TestListIndexes:
+    """List views filter by hub and live rows, then sort."""
+
+    def test_rentals_by_reference(self, seeded):
+        """Test the default rentals sort uses the hub/reference unique index."""
+        hub_ids, _ = seeded
+        qs = Rental.objects.filter(hub_id=hub_ids[0], is_deleted=False).order_by('reference')[:12]
+        assert 'rentals_hub_ref_uniq' in _plan(qs)
+
+    def test_rentals_by_start_date(self, seeded):
+        """Test sorting rentals by start date uses the hub/start index."""
+        hub_ids, _ = seeded
+        qs = Rental.objects.filter(hub_id=hub_ids[0], is_deleted=False).order_by('-start_date')[:12]
+        assert 'rentals_hub_start_idx' in _plan(qs)
+
+    def test_items_by_code(self, seeded):
+        """Test the default items sort uses the hub/code index."""
+        hub_ids, _ = seeded
+        qs = RentalItem.objects.filter(hub_id=hub_ids[0], is_deleted=False).order_by('code')[:12]
+        assert 'rentals_item_hub_code_idx' in _plan(qs)
+
+
+class TestDetailIndexes:
+    """Item detail shows open rentals and blackouts for one item."""
+
+    def test_open_rentals(self, seeded):
+        """Test the open rentals panel uses the item/status index."""
+        _, item_ids = seeded
+        qs = Rental.objects.filter(
+            item_id=item_ids[0], is_deleted=False, status__in=['active', 'reserved'],
+        ).order_by('-start_date')[:10]
+        assert 'rentals_item_status_idx' in _plan(qs)
+
+    def test_blackouts(self, seeded):
+        """Test the blackouts panel uses the blackout item index."""
+        _, item_ids = seeded
+        qs = RentalBlackout.objects.filter(item_id=item_ids[0], is_deleted=False).order_by('-start_date')
+        assert 'rentals_blackout_item_idx' in _plan(qs)
+
+
+class TestOverlapIndexes:
+    """Availability looks up intervals overlapping a window."""
+
+    def test_overlap_query(self, seeded):
+        """Test both halves of the availability union are index scans."""
+        _, item_ids = seeded
+        start, end = WINDOW
+        rentals = Rental.objects.filter(
+            item_id__in=item_ids[:200], is_deleted=False, status__in=BLOCKING_STATUSES,
+            start_date__lte=end, end_date__gte=start,
+        ).order_by().values_list('item_id', 'start_date', 'end_date')
+        blackouts = RentalBlackout.objects.filter(
+            item_id__in=item_ids[:200], is_deleted=False, start_date__lte=end, end_date__gte=start,
+        ).order_by().values_list('item_id', 'start_date', 'end_date')
+        plan = _plan(rentals.union(blackouts, all=True))
+        assert 'rentals_item_status_idx' in plan
+        assert 'rentals_blackout_item_idx' in plan
@@ -1,12 +1,15 @@
 """Pytest fixtures for rentals module tests."""
+import importlib
 import uuid
 import pytest
 from decimal import Decimal
+from django.urls import clear_url_caches
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password
 
 from apps.accounts.models import LocalUser
 from apps.configuration.models import HubConfig, StoreConfig
+from rentals import urls as rentals_urls
 from rentals.models import RentalItem, Rental
 
 
@@ -91,3 +94,15 @@ def rental(db, hub_id):
         end_date=timezone.now().date(),
     )
 
+
+
+@pytest.fixture
+def async_views(settings):
+    """Route the read views to their async variants (RENTALS_ASYNC_VIEWS)."""
+    settings.RENTALS_ASYNC_VIEWS = True
+    importlib.reload(rentals_urls)
+    clear_url_caches()
+    yield
+    del settings.RENTALS_ASYNC_VIEWS
+    importlib.reload(rentals_urls)
+    clear_url_caches()
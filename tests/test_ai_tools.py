@@ -0,0 +1,97 @@
+"""Tests for the rentals AI tools."""
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.test import RequestFactory
+
+from rentals.ai_tools import FindAvailableItems, GetRentalsSummary, ListRentalItems, ListRentals, UpdateRental
+from rentals.models import RentalItem, Rental
+
+
+DAY = datetime.date(2025, 6, 1)
+
+
+@pytest.fixture
+def request_for(hub_id):
+    def build(hub=hub_id):
+        request = RequestFactory().get('/')
+        request.session = {'hub_id': str(hub)}
+        return request
+    return build
+
+
+@pytest.fixture
+def item(hub_id):
+    return RentalItem.objects.create(hub_id=hub_id, name='Paddle board', code='PB', category='water', daily_rate=Decimal('20'))
+
+
+def _rentals(item, count, status='returned'):
+    return [
+        Rental.objects.create(
+            hub_id=item.hub_id, item=item, customer_name='C', status=status,
+            start_date=DAY + datetime.timedelta(days=n), end_date=DAY + datetime.timedelta(days=n),
+            total=Decimal('20'),
+        )
+        for n in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestListTools:
+    """Hub scoping, paging and summaries."""
+
+    def test_other_hubs_are_invisible(self, item, request_for):
+        """Test items and rentals of another hub are not listed or editable."""
+        rental = _rentals(item, 1)[0]
+        other = request_for(uuid.uuid4())
+        assert ListRentalItems().execute({}, other)['items'] == []
+        assert ListRentals().execute({}, other)['rentals'] == []
+        assert 'error' in UpdateRental().execute({'rental_id': str(rental.pk), 'notes': 'x'}, other)
+
+    def test_cursor_pages_through_rentals(self, item, request_for):
+        """Test pages follow each other newest first without gaps or repeats."""
+        created = _rentals(item, 5)
+        seen, cursor = [], None
+        while True:
+            args = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            result = ListRentals().execute(args, request_for())
+            seen += [row['reference'] for row in result['rentals']]
+            cursor = result['next_cursor']
+            if not cursor:
+                break
+        assert seen == [r.reference for r in reversed(created)]
+        assert result['rentals'][0]['item_name'] == 'Paddle board'
+
+    def test_group_by_status(self, item, request_for):
+        """Test the summary mode returns counts and revenue per status."""
+        _rentals(item, 3)
+        _rentals(item, 1, status='cancelled')
+        groups = ListRentals().execute({'group_by': 'status'}, request_for())['groups']
+        assert (groups[0]['group'], groups[0]['count']) == ('returned', 3)
+        assert Decimal(groups[0]['revenue']) == Decimal('60')
+        assert {g['group'] for g in groups} == {'returned', 'cancelled'}
+
+    def test_unknown_group_by_is_a_tool_error(self, item, request_for):
+        """Test a group_by outside the enum returns an error instead of raising."""
+        _rentals(item, 1)
+        assert 'error' in ListRentals().execute({'group_by': 'customer'}, request_for())
+        assert 'error' in ListRentalItems().execute({'group_by': 'foo'}, request_for())
+
+    def test_find_available_items(self, item, request_for):
+        """Test the availability tool lists free items and validates dates."""
+        result = FindAvailableItems().execute({'start_date': '2025-06-01', 'end_date': '2025-06-03'}, request_for())
+        assert [(row['code'], row['free_units']) for row in result['items']] == [('PB', 1)]
+        bad = FindAvailableItems().execute({'start_date': '2025-06-03', 'end_date': '2025-06-01'}, request_for())
+        assert 'error' in bad
+
+    def test_rentals_summary(self, item, request_for):
+        """Test the overview tool returns the live dashboard figures."""
+        _rentals(item, 2)
+        _rentals(item, 1, status='overdue')
+        result = GetRentalsSummary().execute({}, request_for())
+        assert result['total_rentals'] == 3
+        assert result['status_counts']['overdue'] == 1
+        assert Decimal(result['overdue_value']) == Decimal('20')
+        assert GetRentalsSummary().execute({}, request_for(uuid.uuid4()))['total_rentals'] == 0
@@ -0,0 +1,120 @@
+"""Tests for the assignment of physical units to rentals."""
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from rentals import allocation
+from rentals.allocation import FAR, UnitSchedule, place
+from rentals.booking import save_rental
+from rentals.bulk_actions import run_rental_action
+from rentals.models import RentalAllocation, RentalItem, RentalUnit, Rental
+
+DAY = datetime.date(2025, 6, 2)
+
+
+def _day(n):
+    return DAY + datetime.timedelta(days=n)
+
+
+def _rental(item, start, end, status='reserved'):
+    return Rental(
+        hub_id=item.hub_id, item=item, customer_name='C',
+        status=status, start_date=_day(start), end_date=_day(end),
+    )
+
+
+def _unit_of(rental):
+    return RentalAllocation.objects.get(rental=rental).unit.serial
+
+
+class TestPlace:
+    """Best fit on in-memory schedules."""
+
+    def test_slack(self):
+        """Test free days on both sides and overlaps."""
+        schedule = UnitSchedule('A', [(10, 12), (20, 25)])
+        assert schedule.slack(0, 5) == FAR + 4
+        assert schedule.slack(14, 17) == 1 + 2
+        assert schedule.slack(13, 19) == 0
+        assert schedule.slack(12, 14) is None
+        assert schedule.slack(5, 30) is None
+
+    def test_best_fit(self):
+        """Test a booking fills the tightest gap and a long one takes the empty unit."""
+        busy, empty = UnitSchedule('A', [(0, 4), (10, 14)]), UnitSchedule('B')
+        placed, unplaced = place([busy, empty], [('gap', 5, 9), ('long', 3, 30), ('late', 16, 18)])
+        assert placed['gap'] is busy
+        assert placed['late'] is busy
+        assert placed['long'] is empty
+        assert unplaced == []
+
+    def test_unplaced(self):
+        """Test a booking that overlaps every unit is returned."""
+        placed, unplaced = place([UnitSchedule('A', [(0, 9)])], [('x', 5, 6)])
+        assert placed == {}
+        assert unplaced == ['x']
+
+
+@pytest.mark.django_db
+class TestAllocate:
+    """Allocations stored for rentals."""
+
+    @pytest.fixture
+    def item(self, hub_id):
+        item = RentalItem.objects.create(hub_id=hub_id, name='Kayak', quantity_total=2, daily_rate=Decimal('20'))
+        for serial in ('K1', 'K2'):
+            RentalUnit.objects.create(hub_id=hub_id, item=item, serial=serial)
+        return item
+
+    def test_save_rental_packs_units(self, item):
+        """Test bookings that do not overlap share the first unit."""
+        rentals = [save_rental(_rental(item, *days)) for days in ((0, 4), (10, 14), (5, 9))]
+        assert [_unit_of(rental) for rental in rentals] == ['K1', 'K1', 'K1']
+        overlapping = save_rental(_rental(item, 2, 3))
+        assert _unit_of(overlapping) == 'K2'
+
+    def test_edit_and_cancel(self, item):
+        """Test a rental keeps its unit when moved and releases it when cancelled."""
+        rental = save_rental(_rental(item, 0, 4))
+        save_rental(_rental(item, 6, 8))
+        rental.end_date = _day(5)
+        save_rental(rental)
+        assert _unit_of(rental) == 'K1'
+        rental.status = 'cancelled'
+        save_rental(rental)
+        assert not RentalAllocation.objects.filter(rental=rental).exists()
+
+    def test_bulk_extend_moves_off_a_taken_unit(self, item):
+        """Test an extension that now overlaps the next booking on its unit moves to a free unit."""
+        rental = save_rental(_rental(item, 0, 4))
+        following = save_rental(_rental(item, 6, 8))
+        other = save_rental(_rental(item, 20, 21))
+        assert {_unit_of(rental), _unit_of(following)} == {'K1'}
+        run_rental_action(item.hub_id, [rental.pk, other.pk], 'extend', days='3')
+        assert _unit_of(following) == 'K1'
+        assert _unit_of(rental) == 'K2'
+        # Still fits where it was
+        assert _unit_of(other) == 'K1'
+
+    def test_item_without_units(self, hub_id):
+        """Test items with no units recorded are not allocated."""
+        item = RentalItem.objects.create(hub_id=hub_id, name='Tent', quantity_total=3, daily_rate=Decimal('5'))
+        save_rental(_rental(item, 0, 1))
+        assert not RentalAllocation.objects.exists()
+
+    def test_batch_and_unplaced(self, item):
+        """Test a batch is placed in one pass and the overflow is returned."""
+        RentalUnit.objects.filter(serial='K2').update(is_active=False)
+        first, second = _rental(item, 0, 3), _rental(item, 1, 2)
+        first.save()
+        second.save()
+        assert allocation.allocate(item.pk, [first, second]) == [second]
+        assert _unit_of(first) == 'K1'
+
+    def test_reallocate_after_retiring_a_unit(self, item):
+        """Test reservations move off a retired unit."""
+        rental = save_rental(_rental(item, 0, 4))
+        RentalUnit.objects.filter(serial='K1').update(is_active=False)
+        assert allocation.reallocate(item.pk, _day(0), _day(30)) == []
+        assert _unit_of(rental) == 'K2'
@@ -0,0 +1,124 @@
+"""Tests for the utilisation and revenue analytics."""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from rentals import analytics, fragment_cache
+from rentals.models import RentalItem, Rental, RentalBlackout
+
+START = datetime.date(2025, 3, 1)
+END = datetime.date(2025, 3, 10)
+
+
+def _day(n):
+    return START + datetime.timedelta(days=n)
+
+
+@pytest.fixture
+def history(hub_id):
+    drills = RentalItem.objects.create(
+        hub_id=hub_id, name='Drill', code='D1', category='Tools', location='North',
+        quantity_total=2, daily_rate=Decimal('10'),
+    )
+    saws = RentalItem.objects.create(
+        hub_id=hub_id, name='Saw', code='S1', category='Tools', location='South',
+        quantity_total=1, daily_rate=Decimal('10'),
+    )
+    # 3 days inside the period
+    Rental.objects.create(
+        hub_id=hub_id, item=drills, customer_name='A', status='returned',
+        start_date=_day(0), end_date=_day(2), total=Decimal('30'),
+    )
+    # Starts 2 days before the period: 2 of its 4 days (and half its total) count
+    Rental.objects.create(
+        hub_id=hub_id, item=drills, customer_name='B', status='returned',
+        start_date=_day(-2), end_date=_day(1), total=Decimal('40'),
+    )
+    Rental.objects.create(
+        hub_id=hub_id, item=saws, customer_name='C', status='cancelled',
+        start_date=_day(0), end_date=_day(9), total=Decimal('100'),
+    )
+    # Overlapping blackouts count once: days 4..7
+    RentalBlackout.objects.create(hub_id=hub_id, item=drills, start_date=_day(4), end_date=_day(6))
+    RentalBlackout.objects.create(hub_id=hub_id, item=drills, start_date=_day(5), end_date=_day(7))
+    return drills, saws
+
+
+@pytest.mark.django_db
+class TestReport:
+    """Figures per item, category and location."""
+
+    def test_per_item(self, hub_id, history):
+        """Test blackouts, partial overlaps and cancelled rentals."""
+        rows = {row['label']: row for row in analytics.compute(hub_id, START, END)['rows']}
+        drill = rows['D1 Drill']
+        assert drill['unit_days'] == 20
+        assert drill['blocked_days'] == 8
+        assert drill['available_days'] == 12
+        assert drill['rented_days'] == 5
+        assert drill['idle_days'] == 7
+        assert drill['utilisation'] == Decimal('41.7')
+        assert drill['revenue'] == Decimal('50.00')
+        assert drill['revenue_per_unit'] == Decimal('25.00')
+        assert rows['S1 Saw']['rented_days'] == 0
+
+    def test_grouped(self, hub_id, history):
+        """Test category and location roll-ups."""
+        category = analytics.compute(hub_id, START, END, 'category')
+        assert [(row['label'], row['units'], row['available_days']) for row in category['rows']] == [('Tools', 3, 22)]
+        locations = {row['label'] for row in analytics.compute(hub_id, START, END, 'location')['rows']}
+        assert locations == {'North', 'South'}
+        assert category['totals']['rented_days'] == 5
+
+    def test_queries_do_not_grow_with_rentals(self, hub_id, history, django_assert_num_queries):
+        """Test rentals are summed in the database, so more rentals add no queries."""
+        drills, _ = history
+        Rental.objects.bulk_create([
+            Rental(
+                hub_id=hub_id, item=drills, reference=f'X-{n}', customer_name='D', status='returned',
+                start_date=_day(n % 10), end_date=_day(n % 10), total=Decimal('7'),
+            )
+            for n in range(200)
+        ])
+        with django_assert_num_queries(4):
+            rows = {row['label']: row for row in analytics.compute(hub_id, START, END)['rows']}
+        assert rows['D1 Drill']['rented_days'] == 205
+        assert rows['D1 Drill']['revenue'] == Decimal('1450.00')
+
+    def test_cached_until_next_write(self, hub_id, history, django_assert_num_queries):
+        """Test a repeated report runs no queries and a write drops it."""
+        analytics.report(hub_id, START, END)
+        with django_assert_num_queries(0):
+            analytics.report(hub_id, START, END)
+        fragment_cache.bump(hub_id)
+        with django_assert_num_queries(4):
+            analytics.report(hub_id, START, END)
+
+    def test_unknown_group(self, hub_id):
+        """Test an unknown grouping is rejected."""
+        with pytest.raises(ValueError):
+            analytics.compute(hub_id, START, END, 'colour')
+
+
+@pytest.mark.django_db
+class TestAnalyticsView:
+    """Analytics page."""
+
+    def test_page_loads(self, auth_client, hub_id, history):
+        """Test the report page renders."""
+        response = auth_client.get(reverse('rentals:analytics'), {'start': START, 'end': END, 'group': 'category'})
+        assert response.status_code == 200
+        assert response.context['totals']['units'] == 3
+
+    def test_csv_export(self, auth_client, hub_id, history):
+        """Test the CSV export has a header and one line per group."""
+        response = auth_client.get(reverse('rentals:analytics'), {'start': START, 'end': END, 'export': 'csv'})
+        lines = response.content.decode().splitlines()
+        assert lines[0].startswith('item,units,')
+        assert len(lines) == 3
+
+    def test_requires_auth(self, client):
+        """Test the page requires authentication."""
+        assert client.get(reverse('rentals:analytics')).status_code == 302
@@ -0,0 +1,89 @@
+"""Tests for the archival job."""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from rentals import metrics
+from rentals.archive import archive
+from rentals.models import OccupancyGrid, RentalArchive, RentalItem, Rental, RentalBlackout, RentalMetric
+
+
+TODAY = timezone.localdate()
+LONG_AGO = timezone.now() - datetime.timedelta(days=90)
+
+
+@pytest.fixture
+def item(hub_id):
+    return RentalItem.objects.create(hub_id=hub_id, name='Scaffold', daily_rate=Decimal('15'), quantity_total=3)
+
+
+def _rental(item, status='returned', end=TODAY, **extra):
+    return Rental.objects.create(
+        hub_id=item.hub_id, item=item, customer_name='C', status=status,
+        start_date=end, end_date=end, total=Decimal('15'), **extra,
+    )
+
+
+def _soft_delete(obj, when=LONG_AGO):
+    type(obj).all_objects.filter(pk=obj.pk).update(is_deleted=True, deleted_at=when)
+
+
+@pytest.mark.django_db
+class TestArchive:
+    """Moving rows out of the working tables."""
+
+    def test_moves_only_old_deleted_rows(self, hub_id, item):
+        """Test rows deleted before the cutoff are archived and recent ones stay."""
+        old, recent, live = _rental(item), _rental(item), _rental(item)
+        _soft_delete(old)
+        _soft_delete(recent, when=timezone.now())
+        totals = archive(older_than_days=30, batch_size=1)
+        assert totals['rental'] == 1
+        assert not Rental.all_objects.filter(pk=old.pk).exists()
+        assert Rental.all_objects.filter(pk__in=[recent.pk, live.pk]).count() == 2
+        archived = RentalArchive.objects.get(object_id=old.pk)
+        assert (archived.model, archived.reason, archived.data['reference']) == ('rental', 'deleted', old.reference)
+
+    def test_deleted_item_takes_its_rows(self, hub_id, item):
+        """Test an old deleted item is archived with its rentals, blackouts and grid."""
+        rental = _rental(item, status='reserved')
+        RentalBlackout.objects.create(hub_id=hub_id, item=item, start_date=TODAY, end_date=TODAY)
+        assert OccupancyGrid.objects.filter(item=item).exists()
+        _soft_delete(item)
+        totals = archive()
+        assert (totals['rentalitem'], totals['rental'], totals['blackout']) == (1, 1, 1)
+        assert not RentalItem.all_objects.filter(pk=item.pk).exists()
+        assert not Rental.all_objects.filter(pk=rental.pk).exists()
+        assert not OccupancyGrid.objects.filter(item_id=item.pk).exists()
+
+    def test_history_and_metrics(self, hub_id, item):
+        """Test finished rentals past the horizon are archived and counters follow."""
+        old = _rental(item, end=TODAY - datetime.timedelta(days=400))
+        _rental(item, end=TODAY - datetime.timedelta(days=400), status='active')
+        archive(history_days=365)
+        assert not Rental.objects.filter(pk=old.pk).exists()
+        assert Rental.objects.filter(hub_id=hub_id).count() == 1
+        stored = {k: v for k, v in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value') if v}
+        assert stored == metrics.compute_hub(hub_id)
+
+    def test_history_keeps_revenue(self, hub_id, item):
+        """Test revenue of rentals archived as history stays in the counters and the live summary."""
+        old = TODAY - datetime.timedelta(days=400)
+        _rental(item, end=old)
+        _rental(item, end=old, status='cancelled')
+        _rental(item)
+        metrics.hub_metrics(hub_id)
+        archive(history_days=365)
+        stored = dict(RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value'))
+        assert stored['revenue'] == Decimal('30')
+        assert stored[f'revenue.month.{old:%Y-%m}'] == Decimal('15')
+        assert metrics.dashboard_summary(hub_id)['revenue'] == Decimal('30')
+
+    def test_dry_run_changes_nothing(self, item):
+        """Test a dry run only counts."""
+        rental = _rental(item)
+        _soft_delete(rental)
+        assert archive(dry_run=True)['rental'] == 1
+        assert Rental.all_objects.filter(pk=rental.pk).exists()
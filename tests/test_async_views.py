@@ -0,0 +1,132 @@
+"""Tests for the async variants of the read views."""
+import asyncio
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.urls import resolve, reverse
+
+from rentals import instrumentation, views
+from rentals.models import RentalItem, Rental, RentalBlackout
+
+pytestmark = [pytest.mark.django_db, pytest.mark.usefixtures('async_views')]
+
+
+def _seed(hub_id, count):
+    today = datetime.date(2025, 1, 15)
+    item = RentalItem.objects.create(hub_id=hub_id, name='Async Item', code='ASY-001', daily_rate=Decimal('10.00'))
+    for n in range(count):
+        Rental.objects.create(
+            hub_id=hub_id, item=item, customer_name=f'Customer {n:02d}',
+            status='reserved', start_date=today, end_date=today,
+        )
+    return item
+
+
+class TestRouting:
+    """The setting swaps the read views only."""
+
+    def test_async_views_routed(self):
+        """Test the list, detail and dashboard URLs resolve to coroutine views."""
+        for name in ('dashboard', 'rentals_list', 'rental_items_list'):
+            assert asyncio.iscoroutinefunction(resolve(reverse(f'rentals:{name}')).func)
+        assert not asyncio.iscoroutinefunction(resolve(reverse('rentals:rental_add')).func)
+
+
+class TestAsyncPages:
+    """Same responses as the sync views."""
+
+    def test_dashboard(self, auth_client, hub_id):
+        """Test the dashboard renders with the stored metrics."""
+        _seed(hub_id, 3)
+        response = auth_client.get(reverse('rentals:dashboard'))
+        assert response.status_code == 200
+        assert response.context['total_rentals'] == 3
+
+    def test_requires_auth(self, client):
+        """Test anonymous requests are redirected before any query."""
+        assert client.get(reverse('rentals:rentals_list')).status_code == 302
+
+    def test_rentals_list(self, auth_client, hub_id):
+        """Test the page holds the rows the sync view would show."""
+        _seed(hub_id, 15)
+        url = reverse('rentals:rentals_list')
+        response = auth_client.get(url, {'sort': 'customer_name', 'per_page': 12})
+        page = response.context['page_obj']
+        assert page.paginator.count == 15
+        assert [r.customer_name for r in page.object_list] == [f'Customer {n:02d}' for n in range(12)]
+
+    def test_page_out_of_range(self, auth_client, hub_id):
+        """Test a page past the end falls back to the last page."""
+        _seed(hub_id, 15)
+        response = auth_client.get(reverse('rentals:rentals_list'), {'page': 9, 'per_page': 12})
+        page = response.context['page_obj']
+        assert page.number == 2
+        assert len(page.object_list) == 3
+
+    def test_keyset_mode(self, auth_client, hub_id):
+        """Test cursor pages still work."""
+        _seed(hub_id, 15)
+        response = auth_client.get(reverse('rentals:rentals_list'), {'mode': 'keyset', 'per_page': 12})
+        assert response.status_code == 200
+        assert len(response.context['page_obj'].object_list) == 12
+
+    def test_items_search(self, auth_client, hub_id, rental_item):
+        """Test the items list search."""
+        _seed(hub_id, 1)
+        response = auth_client.get(reverse('rentals:rental_items_list'), {'q': 'Async'})
+        assert [item.code for item in response.context['page_obj'].object_list] == ['ASY-001']
+
+    def test_item_detail(self, auth_client, hub_id):
+        """Test the detail page gathers blackouts and open rentals."""
+        item = _seed(hub_id, 2)
+        RentalBlackout.objects.create(
+            hub_id=hub_id, item=item, start_date=datetime.date(2025, 2, 1), end_date=datetime.date(2025, 2, 3),
+        )
+        response = auth_client.get(reverse('rentals:rental_item_detail', args=[item.pk]))
+        assert response.status_code == 200
+        assert len(response.context['blackouts']) == 1
+        assert len(response.context['active_rentals']) == 2
+
+    def test_item_detail_other_hub(self, auth_client):
+        """Test items of another hub are not found."""
+        item = _seed(uuid.uuid4(), 0)
+        response = auth_client.get(reverse('rentals:rental_item_detail', args=[item.pk]))
+        assert response.status_code == 404
+
+
+class TestHandOff:
+    """Exports and datatable fragments go to the sync views."""
+
+    def test_export_streams(self, auth_client, hub_id):
+        """Test a CSV export is streamed by the sync view."""
+        _seed(hub_id, 3)
+        response = auth_client.get(reverse('rentals:rentals_list'), {'export': 'csv'})
+        assert response.streaming
+        assert b''.join(response.streaming_content).count(b'\n') == 4
+
+    def test_datatable_fragment(self, auth_client, hub_id):
+        """Test datatable refreshes are served from the fragment cache path."""
+        _seed(hub_id, 3)
+        response = auth_client.get(
+            reverse('rentals:rentals_list'), HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body',
+        )
+        assert response.status_code == 200
+        assert b'Customer 02' in response.content
+
+    def test_sync_views_unchanged(self):
+        """Test the sync views stay importable for WSGI deployments."""
+        assert not asyncio.iscoroutinefunction(views.rentals_list)
+
+
+class TestInstrumentation:
+    """Sampled timing of async views."""
+
+    def test_server_timing(self, settings, auth_client, hub_id):
+        """Test a sampled async request gets a header and a recorded sample."""
+        settings.RENTALS_TIMING_SAMPLE_RATE = 1
+        response = auth_client.get(reverse('rentals:dashboard'))
+        assert 'total;dur=' in response['Server-Timing']
+        views_recorded = {row['view'] for row in instrumentation.summary(hub_id)['rows']}
+        assert 'dashboard' in views_recorded
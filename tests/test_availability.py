@@ -0,0 +1,120 @@
+"""Tests for the rentals availability engine."""
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from rentals.availability import (
+    item_availability, items_availability, peak_usage, usage_segments,
+)
+from rentals.models import RentalItem, Rental, RentalBlackout
+
+
+D = datetime.date
+
+
+def _item(hub_id, name='Scaffold', quantity=3):
+    return RentalItem.objects.create(
+        hub_id=hub_id, name=name, daily_rate=Decimal('10.00'), quantity_total=quantity,
+    )
+
+
+def _rent(hub_id, item, start, end, status='reserved', **kwargs):
+    return Rental.objects.create(
+        hub_id=hub_id, item=item, reference=f'R-{start}-{end}-{status}',
+        customer_name='Customer', status=status, start_date=start, end_date=end, **kwargs,
+    )
+
+
+class TestSweep:
+    """Pure sweep-line tests (no database)."""
+
+    def test_no_intervals(self):
+        """Test an empty window has no usage."""
+        assert peak_usage([], D(2025, 1, 1), D(2025, 1, 31)) == 0
+
+    def test_overlapping_intervals_stack(self):
+        """Test overlapping intervals add up at their intersection."""
+        intervals = [
+            (D(2025, 1, 1), D(2025, 1, 10), 1),
+            (D(2025, 1, 5), D(2025, 1, 15), 1),
+            (D(2025, 1, 8), D(2025, 1, 9), 2),
+        ]
+        assert peak_usage(intervals, D(2025, 1, 1), D(2025, 1, 31)) == 4
+
+    def test_back_to_back_do_not_overlap(self):
+        """Test a booking ending the day before another starts."""
+        intervals = [
+            (D(2025, 1, 1), D(2025, 1, 4), 1),
+            (D(2025, 1, 5), D(2025, 1, 9), 1),
+        ]
+        assert peak_usage(intervals, D(2025, 1, 1), D(2025, 1, 31)) == 1
+
+    def test_intervals_outside_window_are_ignored(self):
+        """Test clipping to the requested window."""
+        intervals = [
+            (D(2025, 1, 1), D(2025, 1, 10), 1),
+            (D(2025, 1, 5), D(2025, 1, 15), 1),
+        ]
+        assert peak_usage(intervals, D(2025, 1, 11), D(2025, 1, 20)) == 1
+
+    def test_segments_cover_window(self):
+        """Test usage segments span the whole window and merge equal runs."""
+        intervals = [(D(2025, 1, 3), D(2025, 1, 4), 1), (D(2025, 1, 5), D(2025, 1, 6), 1)]
+        assert usage_segments(intervals, D(2025, 1, 1), D(2025, 1, 8)) == [
+            (D(2025, 1, 1), D(2025, 1, 2), 0),
+            (D(2025, 1, 3), D(2025, 1, 6), 1),
+            (D(2025, 1, 7), D(2025, 1, 8), 0),
+        ]
+
+
+@pytest.mark.django_db
+class TestItemAvailability:
+    """Availability queries against the database."""
+
+    def test_all_units_free(self, hub_id):
+        """Test an item without bookings is fully available."""
+        item = _item(hub_id)
+        assert item_availability(item, '2025-01-01', '2025-01-31') == 3
+
+    def test_blocking_rentals_reduce_availability(self, hub_id):
+        """Test reserved, active and overdue rentals hold units."""
+        item = _item(hub_id)
+        _rent(hub_id, item, D(2025, 1, 1), D(2025, 1, 10), status='reserved')
+        _rent(hub_id, item, D(2025, 1, 5), D(2025, 1, 20), status='active')
+        _rent(hub_id, item, D(2025, 1, 1), D(2025, 1, 31), status='returned')
+        _rent(hub_id, item, D(2025, 1, 1), D(2025, 1, 31), status='cancelled')
+        assert item_availability(item, D(2025, 1, 1), D(2025, 1, 31)) == 1
+        assert item_availability(item, D(2025, 1, 11), D(2025, 1, 31)) == 2
+
+    def test_deleted_rentals_are_ignored(self, hub_id):
+        """Test soft-deleted rentals do not hold units."""
+        item = _item(hub_id, quantity=1)
+        _rent(hub_id, item, D(2025, 1, 1), D(2025, 1, 10), is_deleted=True)
+        assert item_availability(item, D(2025, 1, 1), D(2025, 1, 10)) == 1
+
+    def test_blackout_blocks_every_unit(self, hub_id):
+        """Test a blackout makes the item unavailable."""
+        item = _item(hub_id)
+        RentalBlackout.objects.create(hub_id=hub_id, item=item, start_date=D(2025, 1, 10), end_date=D(2025, 1, 12))
+        assert item_availability(item, D(2025, 1, 1), D(2025, 1, 31)) == 0
+        assert item_availability(item, D(2025, 1, 13), D(2025, 1, 31)) == 3
+
+    def test_exclude_rental(self, hub_id):
+        """Test excluding the booking being edited."""
+        item = _item(hub_id, quantity=1)
+        rental = _rent(hub_id, item, D(2025, 1, 1), D(2025, 1, 10))
+        assert item_availability(item, D(2025, 1, 1), D(2025, 1, 10)) == 0
+        assert item_availability(item, D(2025, 1, 1), D(2025, 1, 10), exclude_rental_ids=[rental.pk]) == 1
+
+    def test_batch_uses_one_query(self, hub_id, django_assert_num_queries):
+        """Test the batch API resolves many items in a single query."""
+        items = [_item(hub_id, name=f'Item {n}', quantity=2) for n in range(20)]
+        _rent(hub_id, items[0], D(2025, 1, 1), D(2025, 1, 10))
+        _rent(hub_id, items[1], D(2025, 1, 1), D(2025, 1, 10))
+        _rent(hub_id, items[1], D(2025, 1, 5), D(2025, 1, 10))
+        with django_assert_num_queries(1):
+            result = items_availability(items, D(2025, 1, 1), D(2025, 1, 31))
+        assert result[items[0].pk] == 1
+        assert result[items[1].pk] == 0
+        assert result[items[2].pk] == 2
@@ -0,0 +1,184 @@
+"""Tests for capacity-checked booking writes."""
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from rentals import booking
+from rentals.booking import BookingConflict, BookingError, save_blackout, save_rental
+from rentals.models import RentalItem, Rental, RentalBlackout
+
+
+DAY = datetime.date(2025, 6, 2)
+
+
+def _rental(item, start=DAY, end=DAY, status='reserved'):
+    return Rental(
+        hub_id=item.hub_id, item=item, customer_name='C',
+        status=status, start_date=start, end_date=end,
+    )
+
+
+@pytest.fixture
+def item(hub_id):
+    return RentalItem.objects.create(hub_id=hub_id, name='Kayak', quantity_total=2, daily_rate=Decimal('20'))
+
+
+@pytest.mark.django_db
+class TestSaveRental:
+    """Capacity validation for rentals."""
+
+    def test_rejects_when_full(self, item):
+        """Test a booking beyond quantity_total is refused."""
+        save_rental(_rental(item))
+        save_rental(_rental(item))
+        with pytest.raises(BookingConflict):
+            save_rental(_rental(item))
+        assert Rental.objects.filter(item=item).count() == 2
+
+    def test_back_to_back_is_allowed(self, item):
+        """Test a booking starting the day after another ends fits."""
+        item.quantity_total = 1
+        item.save()
+        save_rental(_rental(item))
+        save_rental(_rental(item, DAY + datetime.timedelta(days=1), DAY + datetime.timedelta(days=2)))
+
+    def test_edit_does_not_conflict_with_itself(self, item):
+        """Test re-saving a booking ignores its own previous dates."""
+        item.quantity_total = 1
+        item.save()
+        rental = save_rental(_rental(item))
+        rental.end_date = DAY + datetime.timedelta(days=3)
+        save_rental(rental)
+
+    def test_non_blocking_status_skips_check(self, item):
+        """Test cancelled rentals never need capacity."""
+        save_rental(_rental(item))
+        save_rental(_rental(item))
+        save_rental(_rental(item, status='cancelled'))
+
+    def test_invalid_dates(self, item):
+        """Test reversed dates are rejected."""
+        with pytest.raises(BookingError):
+            save_rental(_rental(item, DAY, DAY - datetime.timedelta(days=1)))
+
+    def test_reference_taken_after_the_check_is_a_booking_error(self, item, monkeypatch):
+        """Test a reference taken by a concurrent save surfaces as BookingError, not IntegrityError."""
+        first = _rental(item)
+        first.reference = 'A-1'
+        save_rental(first)
+        # The first check misses the row, as it would for a save committed just after it
+        answers = iter([False, True])
+        monkeypatch.setattr(booking, '_reference_taken', lambda rental: next(answers))
+        second = _rental(item)
+        second.reference = 'A-1'
+        with pytest.raises(BookingError):
+            save_rental(second)
+        assert Rental.objects.filter(reference='A-1').count() == 1
+
+    def test_blackout_blocks_bookings(self, hub_id, item):
+        """Test a blackout takes every unit."""
+        RentalBlackout.objects.create(hub_id=hub_id, item=item, start_date=DAY, end_date=DAY)
+        with pytest.raises(BookingConflict):
+            save_rental(_rental(item))
+
+
+@pytest.mark.django_db
+class TestRepriceOnSave:
+    """Totals recomputed by save_rental(reprice=True)."""
+
+    def test_new_and_moved_rentals_are_priced(self, item):
+        """Test a new rental is priced and a date change reprices it."""
+        rental = save_rental(_rental(item), reprice=True)
+        assert rental.total == Decimal('20.00')
+        rental.end_date = DAY + datetime.timedelta(days=1)
+        save_rental(rental, reprice=True)
+        assert rental.total == Decimal('40.00')
+
+    def test_finished_rental_keeps_its_total(self, item):
+        """Test editing a returned rental does not charge it at today's rates."""
+        rental = save_rental(_rental(item), reprice=True)
+        rental.status = 'returned'
+        save_rental(rental, reprice=True)
+        item.daily_rate = Decimal('99')
+        item.save()
+        rental.notes = 'typo fixed'
+        rental.end_date = DAY + datetime.timedelta(days=1)
+        save_rental(rental, reprice=True)
+        assert rental.total == Decimal('20.00')
+
+    def test_unchanged_dates_keep_the_total(self, item):
+        """Test an edit that keeps item and dates does not reprice."""
+        rental = save_rental(_rental(item), reprice=True)
+        item.daily_rate = Decimal('99')
+        item.save()
+        rental.customer_name = 'D'
+        save_rental(rental, reprice=True)
+        assert rental.total == Decimal('20.00')
+
+    def test_bad_input_is_a_booking_error(self, auth_client, hub_id, item):
+        """Test a malformed date or a deleted item is reported on the form."""
+        rental = save_rental(_rental(item), reprice=True)
+        url = reverse('rentals:rental_edit', args=[rental.pk])
+        response = auth_client.post(url, {'customer_name': 'C', 'start_date': '2025-13-45', 'end_date': '2025-06-02'})
+        assert response.status_code == 200
+        assert response.context['error']
+        gone = RentalItem.objects.create(hub_id=hub_id, name='Gone', daily_rate=Decimal('1'), is_deleted=True)
+        with pytest.raises(BookingError):
+            save_rental(_rental(gone), reprice=True)
+
+
+@pytest.mark.django_db
+class TestSaveBlackout:
+    """Blackouts must not cover existing bookings."""
+
+    def test_rejects_over_booking(self, hub_id, item):
+        """Test a blackout over a reserved rental is refused."""
+        save_rental(_rental(item))
+        with pytest.raises(BookingConflict):
+            save_blackout(RentalBlackout(hub_id=hub_id, item=item, start_date=DAY, end_date=DAY))
+
+    def test_view_shows_error(self, auth_client, hub_id, item):
+        """Test the blackout view reports the conflict instead of saving."""
+        save_rental(_rental(item))
+        response = auth_client.post(
+            reverse('rentals:blackout_add', args=[item.pk]),
+            {'start_date': DAY.isoformat(), 'end_date': DAY.isoformat()},
+        )
+        assert response.status_code == 200
+        assert 'fully booked' in response.content.decode()
+        assert not RentalBlackout.objects.filter(item=item).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='needs row-level locks')
+class TestConcurrentBookings:
+    """Parallel bookings are serialised per item."""
+
+    def test_no_overbooking(self, hub_id):
+        """Test parallel bookings never exceed quantity_total and finish promptly."""
+        item = RentalItem.objects.create(hub_id=hub_id, name='Bike', quantity_total=3, daily_rate=Decimal('5'))
+        other = RentalItem.objects.create(hub_id=hub_id, name='Helmet', quantity_total=40, daily_rate=Decimal('1'))
+
+        def book(target_id):
+            try:
+                save_rental(_rental(RentalItem.objects.get(pk=target_id)))
+                return True
+            except BookingConflict:
+                return False
+            finally:
+                connection.close()
+
+        targets = [item.pk] * 20 + [other.pk] * 20
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(book, targets))
+        elapsed = time.monotonic() - started
+
+        assert Rental.objects.filter(item=item).count() == 3
+        assert Rental.objects.filter(item=other).count() == 20
+        assert elapsed < 10
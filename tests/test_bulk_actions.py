@@ -0,0 +1,95 @@
+"""Tests for the rentals bulk actions."""
+import datetime
+import json
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from rentals import metrics
+from rentals.booking import BookingConflict
+from rentals.bulk_actions import BulkActionError, run_rental_action
+from rentals.models import RentalItem, Rental, RentalMetric
+
+
+DAY = datetime.date(2025, 8, 4)
+
+
+@pytest.fixture
+def item(hub_id):
+    item = RentalItem.objects.create(hub_id=hub_id, name='Canoe', quantity_total=2, daily_rate=Decimal('10'))
+    # Build the counters so the actions below update them incrementally
+    metrics.hub_metrics(hub_id)
+    return item
+
+
+def _rental(item, status='active', start=DAY, end=DAY, **extra):
+    return Rental.objects.create(
+        hub_id=item.hub_id, item=item, customer_name='C',
+        status=status, start_date=start, end_date=end, **extra,
+    )
+
+
+@pytest.mark.django_db
+class TestRunRentalAction:
+    """Set-based bulk transitions."""
+
+    def test_mark_returned_only_touches_eligible_rows(self, hub_id, item):
+        """Test reserved rentals are left alone by mark_returned."""
+        active = _rental(item, 'active')
+        reserved = _rental(item, 'reserved')
+        changed = run_rental_action(hub_id, [str(active.pk), str(reserved.pk)], 'mark_returned')
+        assert changed == [active.pk]
+        assert Rental.objects.get(pk=active.pk).status == 'returned'
+        assert Rental.objects.get(pk=reserved.pk).status == 'reserved'
+
+    def test_deposit_flags(self, hub_id, item):
+        """Test deposits are marked paid and then returned."""
+        rental = _rental(item, deposit_amount=Decimal('50'))
+        run_rental_action(hub_id, [rental.pk], 'deposit_paid')
+        run_rental_action(hub_id, [rental.pk], 'deposit_returned')
+        rental.refresh_from_db()
+        assert rental.deposit_paid and rental.deposit_returned
+
+    def test_extend_reprices_and_keeps_metrics(self, hub_id, item):
+        """Test extending moves end_date, reprices and keeps counters consistent."""
+        rental = _rental(item)
+        run_rental_action(hub_id, [rental.pk], 'extend', days='2')
+        rental.refresh_from_db()
+        assert rental.end_date == DAY + datetime.timedelta(days=2)
+        assert rental.total == Decimal('30.00')
+        stored = {k: v for k, v in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value') if v}
+        assert stored == metrics.compute_hub(hub_id)
+
+    def test_extend_checks_capacity_for_the_batch(self, hub_id, item):
+        """Test an extension that would overbook rolls back the whole batch."""
+        first = _rental(item)
+        second = _rental(item)
+        _rental(item, 'reserved', start=DAY + datetime.timedelta(days=1), end=DAY + datetime.timedelta(days=1))
+        with pytest.raises(BookingConflict):
+            run_rental_action(hub_id, [first.pk, second.pk], 'extend', days=1)
+        assert set(Rental.objects.filter(pk__in=[first.pk, second.pk]).values_list('end_date', flat=True)) == {DAY}
+
+    def test_rejects_unknown_action(self, hub_id):
+        """Test unknown actions raise."""
+        with pytest.raises(BulkActionError):
+            run_rental_action(hub_id, [], 'explode')
+
+
+@pytest.mark.django_db
+class TestBulkActionView:
+    """Bulk action responses."""
+
+    def test_returns_changed_rows_out_of_band(self, auth_client, item):
+        """Test only changed rows are rendered, with the count in HX-Trigger."""
+        active = _rental(item, 'active')
+        _rental(item, 'reserved')
+        response = auth_client.post(
+            reverse('rentals:rentals_bulk_action'), {'ids': str(active.pk), 'action': 'mark_returned'},
+        )
+        assert response.status_code == 200
+        assert response['HX-Reswap'] == 'none'
+        assert json.loads(response['HX-Trigger'])['rentalsBulkAction']['count'] == 1
+        content = response.content.decode()
+        assert f'rental-row-{active.pk}' in content
+        assert content.count('datatable-tr') == 1
@@ -0,0 +1,101 @@
+"""Tests for the weekly demand forecasts."""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from rentals import forecasting
+from rentals.models import DemandForecast, RentalItem, Rental
+
+TODAY = datetime.date(2025, 6, 18)  # a Wednesday
+WEEK_START = datetime.date(2025, 6, 16)
+
+
+class TestFit:
+    """The seasonal model."""
+
+    def test_flat_level(self):
+        """Test a short history forecasts its recent mean."""
+        assert forecasting.fit([0, 0, 2, 2, 2, 2], horizon=2) == [2, 2]
+
+    def test_seasonal_bump(self):
+        """Test a peak seen a year earlier raises the same weeks."""
+        values = [1.0] * 104
+        values[52] = 5.0  # week 0 of the forecast, one year back
+        forecast = forecasting.fit(values, horizon=2)
+        assert forecast[0] == pytest.approx(1 + forecasting.SEASONAL_WEIGHT * 4)
+        assert forecast[1] == pytest.approx(1)
+
+    def test_never_negative(self):
+        """Test forecasts are clamped at zero."""
+        values = [0.0] * 104
+        values[48:52] = [10.0] * 4
+        assert min(forecasting.fit(values, horizon=4)) >= 0
+
+    def test_matrix_matches_single_series(self):
+        """Test fitting a chunk at once gives the same rows as fitting each series."""
+        flat, bumped = [1.0] * 104, [1.0] * 104
+        bumped[52] = 5.0
+        matrix = forecasting.fit_matrix([flat, bumped], horizon=3)
+        assert matrix.shape == (2, 3)
+        assert matrix.tolist() == [forecasting.fit(flat, 3), forecasting.fit(bumped, 3)]
+
+
+@pytest.mark.django_db
+class TestRun:
+    """History loading, storage and reading."""
+
+    @pytest.fixture
+    def scaffolds(self, hub_id):
+        item = RentalItem.objects.create(
+            hub_id=hub_id, name='Scaffold', category='Access', location='Yard',
+            quantity_total=4, daily_rate=Decimal('10'),
+        )
+        # Two units out every day of the four weeks before WEEK_START
+        for _ in range(2):
+            Rental.objects.create(
+                hub_id=hub_id, item=item, customer_name='C', status='returned',
+                start_date=WEEK_START - datetime.timedelta(weeks=4), end_date=WEEK_START - datetime.timedelta(days=1),
+            )
+        RentalItem.objects.create(hub_id=hub_id, name='Idle', category='Tools', quantity_total=3, daily_rate=Decimal('1'))
+        return item
+
+    def test_weekly_series(self, hub_id, scaffolds):
+        """Test a rental spreads its days over the weeks it covers."""
+        first_week = WEEK_START - datetime.timedelta(weeks=4)
+        series = forecasting.weekly_series(hub_id, first_week, weeks=5)
+        assert series[('Access', 'Yard')].tolist() == [2, 2, 2, 2, 0]
+
+    def test_run_stores_forecasts(self, hub_id, scaffolds):
+        """Test each category/location gets one row per week with its capacity."""
+        written = forecasting.run(hub_id, weeks=3, workers=1, today=TODAY)
+        assert written == 6
+        access = DemandForecast.objects.filter(hub_id=hub_id, category='Access').order_by('week_start')
+        assert [row.week_start for row in access] == [WEEK_START + datetime.timedelta(weeks=n) for n in range(3)]
+        assert {(row.expected_units, row.capacity) for row in access} == {(Decimal('2.00'), 4)}
+        assert set(DemandForecast.objects.filter(category='Tools').values_list('expected_units', flat=True)) == {0}
+        # Re-running replaces the rows instead of adding to them
+        assert forecasting.run(hub_id, weeks=3, workers=1, today=TODAY) == 6
+        assert DemandForecast.objects.filter(hub_id=hub_id).count() == 6
+
+    def test_pressure(self, hub_id, scaffolds, monkeypatch):
+        """Test the dashboard summary ranks by load and skips idle categories."""
+        forecasting.run(hub_id, weeks=2, workers=1, today=TODAY)
+        monkeypatch.setattr(forecasting.timezone, 'localdate', lambda: TODAY)
+        [row] = forecasting.pressure(hub_id)
+        assert (row['category'], row['load']) == ('Access', Decimal('50.0'))
+
+    def test_command_and_dashboard(self, auth_client, hub_id, scaffolds):
+        """Test the command runs and the dashboard shows the forecast."""
+        call_command('rentals_forecast', hub=str(hub_id), weeks=2, workers=1)
+        assert DemandForecast.objects.filter(hub_id=hub_id).exists()
+        response = auth_client.get(reverse('rentals:dashboard'))
+        assert response.status_code == 200
+        assert 'forecast' in response.context
+
+    def test_invalid_horizon(self, hub_id):
+        """Test horizons beyond a season are rejected."""
+        with pytest.raises(ValueError):
+            forecasting.run(hub_id, weeks=53, workers=1)
@@ -0,0 +1,96 @@
+"""Tests for the per-hub list fragment cache."""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rentals import fragment_cache
+from rentals.models import RentalItem
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rentals-tests'},
+    }
+    from django.core.cache import caches
+    caches['default'].clear()
+
+
+def _list(client, **params):
+    return client.get(
+        reverse('rentals:rental_items_list'), params,
+        HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body',
+    )
+
+
+class TestFragmentCache:
+    """Fragment keys and counters."""
+
+    def test_render_runs_once(self, hub_id):
+        """Test a second lookup is served without rendering."""
+        calls = []
+        render = lambda: calls.append(1) or '<tr></tr>'
+        assert fragment_cache.get_or_render(hub_id, 'list', {'q': 'a'}, render) == '<tr></tr>'
+        assert fragment_cache.get_or_render(hub_id, 'list', {'q': 'a'}, render) == '<tr></tr>'
+        assert len(calls) == 1
+        assert fragment_cache.stats(hub_id)['hits'] == 1
+        assert fragment_cache.stats(hub_id)['misses'] == 1
+
+    def test_params_are_part_of_the_key(self, hub_id):
+        """Test different query parameters get different entries."""
+        assert fragment_cache.fragment_key(hub_id, 'list', {'q': 'a'}) != \
+            fragment_cache.fragment_key(hub_id, 'list', {'q': 'b'})
+
+    def test_bump_is_per_hub(self, hub_id):
+        """Test bumping one hub leaves other hubs' keys intact."""
+        other = 'other-hub'
+        own_key = fragment_cache.fragment_key(hub_id, 'list', {})
+        other_key = fragment_cache.fragment_key(other, 'list', {})
+        fragment_cache.bump(hub_id)
+        assert fragment_cache.fragment_key(hub_id, 'list', {}) != own_key
+        assert fragment_cache.fragment_key(other, 'list', {}) == other_key
+
+
+    @pytest.mark.django_db
+    def test_bump_is_repeated_on_commit(self, hub_id, django_capture_on_commit_callbacks):
+        """Test a bump inside a transaction invalidates again once it commits."""
+        before = fragment_cache.generation(hub_id)
+        with django_capture_on_commit_callbacks(execute=True):
+            fragment_cache.bump(hub_id)
+            # Cached by a reader that still sees the uncommitted state
+            stale_key = fragment_cache.fragment_key(hub_id, 'list', {})
+        assert fragment_cache.generation(hub_id) == before + 2
+        assert fragment_cache.fragment_key(hub_id, 'list', {}) != stale_key
+
+
+@pytest.mark.django_db
+class TestListCaching:
+    """Datatable fragments served through the cache."""
+
+    def test_repeat_request_is_a_hit(self, auth_client, hub_id):
+        """Test an unchanged list is not re-queried."""
+        RentalItem.objects.create(hub_id=hub_id, name='Drill', code='D-1')
+        first = _list(auth_client)
+        with CaptureQueriesContext(connection) as ctx:
+            second = _list(auth_client)
+        assert second.content == first.content
+        assert not [q for q in ctx.captured_queries if 'rentals_rentalitem' in q['sql']]
+        assert fragment_cache.stats(hub_id)['hits'] == 1
+
+    def test_save_invalidates(self, auth_client, hub_id):
+        """Test saving a row drops the hub's cached fragments."""
+        item = RentalItem.objects.create(hub_id=hub_id, name='Drill', code='D-1')
+        _list(auth_client)
+        item.name = 'Hammer'
+        item.save()
+        content = _list(auth_client).content.decode()
+        assert 'Hammer' in content
+        assert fragment_cache.stats(hub_id)['hits'] == 0
+
+    def test_bulk_action_invalidates(self, auth_client, hub_id):
+        """Test queryset updates from bulk actions drop the cache too."""
+        item = RentalItem.objects.create(hub_id=hub_id, name='Drill', code='D-1')
+        _list(auth_client)
+        auth_client.post(reverse('rentals:rental_items_bulk_action'), {'ids': str(item.pk), 'action': 'delete'})
+        assert 'Drill' not in _list(auth_client).content.decode()
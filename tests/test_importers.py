@@ -0,0 +1,92 @@
+"""Tests for the bulk CSV import pipeline."""
+import csv
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rentals.importers import import_rental_items, import_rentals, iter_rows
+from rentals.models import RentalItem, Rental
+
+
+def _write(path, rows):
+    with open(path, 'w', newline='') as handle:
+        csv.writer(handle).writerows(rows)
+    return str(path)
+
+
+@pytest.mark.django_db
+class TestImportRentalItems:
+    """Item imports."""
+
+    def test_creates_items_in_batches(self, hub_id, tmp_path):
+        """Test rows are created across several batches with export-style headers."""
+        path = _write(tmp_path / 'items.csv', [
+            ['Name', 'Code', 'Daily Rate', 'Quantity Total'],
+            *[[f'Kayak {n}', f'K{n}', '25', '2'] for n in range(5)],
+        ])
+        seen = []
+        result = import_rental_items(iter_rows(path), hub_id, batch_size=2, progress=seen.append)
+        assert result['created'] == 5 and result['errors'] == 0
+        assert len(seen) == 3
+        item = RentalItem.objects.get(hub_id=hub_id, code='K3')
+        assert item.daily_rate == Decimal('25') and item.quantity_total == 2
+        assert 'kayak 3' in item.search_text
+
+    def test_rejected_rows_go_to_error_file(self, hub_id, rental_item, tmp_path):
+        """Test invalid and duplicate rows are skipped and reported."""
+        path = _write(tmp_path / 'items.csv', [
+            ['name', 'code', 'daily_rate'],
+            ['Bike', 'B1', 'abc'],
+            ['Other', rental_item.code, '10'],
+            ['Tent', 'T1', '15'],
+        ])
+        errors = str(tmp_path / 'errors.csv')
+        result = import_rental_items(iter_rows(path), hub_id, error_file=errors)
+        assert result['created'] == 1 and result['errors'] == 2
+        with open(errors) as handle:
+            lines = list(csv.reader(handle))
+        assert [line[0] for line in lines[1:]] == ['2', '3']
+        assert 'daily_rate' in lines[1][-1]
+
+
+@pytest.mark.django_db
+class TestImportRentals:
+    """Rental history imports."""
+
+    def test_resolves_item_codes(self, hub_id, rental_item, tmp_path):
+        """Test rentals are linked by item code and unknown codes are rejected."""
+        path = _write(tmp_path / 'rentals.csv', [
+            ['reference', 'item', 'customer_name', 'status', 'start_date', 'end_date', 'total'],
+            ['H-1', rental_item.code, 'Ana', 'returned', '2024-05-01', '2024-05-03', '150'],
+            ['H-2', 'NOPE', 'Luis', 'returned', '2024-05-01', '2024-05-03', '150'],
+        ])
+        result = import_rentals(iter_rows(path), hub_id)
+        assert result['created'] == 1 and result['errors'] == 1
+        rental = Rental.objects.get(hub_id=hub_id, reference='H-1')
+        assert rental.item_id == rental_item.pk
+        assert rental.total == Decimal('150')
+
+    def test_blank_references_use_one_block_per_batch(self, hub_id, rental_item, tmp_path):
+        """Test blank references are numbered without a query per row and skip typed numbers."""
+        def rows(count, typed=None):
+            return [
+                ['reference', 'item', 'customer_name', 'status', 'start_date', 'end_date', 'total'],
+                *([[typed, rental_item.code, 'Ana', 'returned', '2024-05-01', '2024-05-01', '10']] if typed else []),
+                *[['', rental_item.code, 'Ana', 'returned', '2024-05-01', '2024-05-01', '10'] for _ in range(count)],
+            ]
+
+        import_rentals(iter_rows(_write(tmp_path / 'first.csv', rows(2, typed='R-000002'))), hub_id)
+        assert set(Rental.objects.filter(hub_id=hub_id).values_list('reference', flat=True)) == {
+            'R-000001', 'R-000002', 'R-000003',
+        }
+        counts = []
+        for count in (5, 40):
+            with CaptureQueriesContext(connection) as queries:
+                result = import_rentals(iter_rows(_write(tmp_path / f'{count}.csv', rows(count))), hub_id)
+            assert result['created'] == count
+            counts.append(len(queries.captured_queries))
+        assert counts[0] == counts[1]
+        references = list(Rental.objects.filter(hub_id=hub_id).values_list('reference', flat=True))
+        assert len(references) == len(set(references)) == 48
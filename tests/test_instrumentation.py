@@ -0,0 +1,65 @@
+"""Tests for the sampled request timing."""
+import pytest
+from django.urls import reverse
+
+from rentals import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rentals-timing-tests'},
+    }
+    from django.core.cache import caches
+    caches['default'].clear()
+
+
+class TestPercentile:
+    """Nearest-rank percentiles."""
+
+    def test_percentiles(self):
+        """Test p50/p90 pick the expected samples."""
+        values = list(range(1, 11))
+        assert instrumentation.percentile(values, 50) == 5
+        assert instrumentation.percentile(values, 90) == 9
+        assert instrumentation.percentile([], 99) == 0
+
+
+@pytest.mark.django_db
+class TestInstrumentedViews:
+    """Server-Timing headers and per-target aggregation."""
+
+    def test_off_by_default(self, auth_client):
+        """Test requests are not timed without a sample rate."""
+        response = auth_client.get(reverse('rentals:rentals_list'))
+        assert 'Server-Timing' not in response
+
+    def test_records_by_view_and_target(self, settings, auth_client, hub_id, rental):
+        """Test sampled requests get a header and are grouped by HTMX target."""
+        settings.RENTALS_TIMING_SAMPLE_RATE = 1
+        url = reverse('rentals:rentals_list')
+        response = auth_client.get(url)
+        assert 'sql;dur=' in response['Server-Timing']
+        auth_client.get(url, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        rows = {(row['view'], row['target']): row for row in instrumentation.summary(hub_id)['rows']}
+        assert set(rows) == {('rentals_list', 'page'), ('rentals_list', 'datatable-body')}
+        assert rows[('rentals_list', 'page')]['queries_p50'] > 0
+        assert rows[('rentals_list', 'page')]['kb_p50'] > 0
+
+    def test_render_timed_without_patching_django(self, settings, auth_client, hub_id):
+        """Test page renders are timed through the rentals wrappers, not a global patch."""
+        from django.template.backends.django import Template
+
+        settings.RENTALS_TIMING_SAMPLE_RATE = 1
+        auth_client.get(reverse('rentals:dashboard'))
+        rows = {row['view']: row for row in instrumentation.summary(hub_id)['rows']}
+        assert rows['dashboard']['render_p50_ms'] > 0
+        assert not hasattr(Template.render, '_rentals_timed')
+
+    def test_settings_page_lists_timings(self, settings, auth_client):
+        """Test the settings page renders the timing table."""
+        settings.RENTALS_TIMING_SAMPLE_RATE = 1
+        auth_client.get(reverse('rentals:dashboard'))
+        response = auth_client.get(reverse('rentals:settings'))
+        assert response.status_code == 200
+        assert 'dashboard' in response.content.decode()
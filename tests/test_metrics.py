@@ -0,0 +1,132 @@
+"""Tests for the materialised dashboard metrics."""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rentals import metrics
+from rentals.models import RentalItem, Rental, RentalBlackout, RentalMetric
+
+
+TODAY = datetime.date(2025, 1, 15)
+
+
+def _stored(hub_id):
+    return {k: v for k, v in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value') if v}
+
+
+@pytest.fixture
+def populated(hub_id):
+    tools = RentalItem.objects.create(
+        hub_id=hub_id, name='Drill', category='Tools', quantity_total=4, daily_rate=Decimal('5'),
+    )
+    lifts = RentalItem.objects.create(
+        hub_id=hub_id, name='Lift', category='Access', quantity_total=2, daily_rate=Decimal('50'),
+    )
+    # Build the counters so the writes below are applied incrementally
+    metrics.hub_metrics(hub_id)
+    rentals = [
+        Rental.objects.create(
+            hub_id=hub_id, item=tools, reference='R-1', customer_name='A', status='active',
+            start_date=TODAY, end_date=TODAY, total=Decimal('15'),
+            deposit_amount=Decimal('100'), deposit_paid=True,
+        ),
+        Rental.objects.create(
+            hub_id=hub_id, item=lifts, reference='R-2', customer_name='B', status='overdue',
+            start_date=TODAY, end_date=TODAY, total=Decimal('150'),
+        ),
+        Rental.objects.create(
+            hub_id=hub_id, item=lifts, reference='R-3', customer_name='C', status='cancelled',
+            start_date=TODAY, end_date=TODAY, total=Decimal('99'),
+        ),
+    ]
+    RentalBlackout.objects.create(hub_id=hub_id, item=tools, start_date=TODAY, end_date=TODAY)
+    return tools, lifts, rentals
+
+
+@pytest.mark.django_db
+class TestMetrics:
+    """Incremental counters must match a full recomputation."""
+
+    def test_incremental_matches_reconcile(self, hub_id, populated):
+        """Test signal-driven updates equal the recomputed values."""
+        assert _stored(hub_id) == metrics.compute_hub(hub_id)
+
+    def test_edit_moves_counts(self, hub_id, populated):
+        """Test a status change moves the row between counters."""
+        _, _, rentals = populated
+        rentals[1].status = 'returned'
+        rentals[1].save()
+        stored = _stored(hub_id)
+        assert 'rentals.status.overdue' not in stored
+        assert stored['rentals.status.returned'] == 1
+        assert stored == metrics.compute_hub(hub_id)
+
+    def test_bulk_update_is_tracked(self, hub_id, populated):
+        """Test queryset updates inside track_bulk keep counters in step."""
+        _, _, rentals = populated
+        ids = [r.pk for r in rentals]
+        with metrics.track_bulk(Rental, ids):
+            Rental.objects.filter(pk__in=ids).update(is_deleted=True)
+        assert _stored(hub_id) == metrics.compute_hub(hub_id)
+
+    def test_dashboard_tiles(self, hub_id, populated):
+        """Test the dashboard figures derived from the counters."""
+        data = metrics.dashboard_metrics(hub_id)
+        assert data['total_rental_items'] == 2
+        assert data['total_rentals'] == 3
+        assert data['overdue_count'] == 1
+        assert data['revenue'] == Decimal('165')
+        assert data['deposits_held'] == Decimal('100')
+        assert data['units_out'] == 2
+        assert data['utilisation'] == Decimal('33.3')
+        access = next(c for c in data['categories'] if c['name'] == 'Access')
+        assert access['occupancy'] == Decimal('50.0')
+
+    def test_month_and_overdue_counters(self, hub_id, populated):
+        """Test revenue per start month and overdue value are counted."""
+        stored = _stored(hub_id)
+        assert stored['revenue.month.2025-01'] == Decimal('165')
+        assert stored['overdue.value'] == Decimal('150')
+
+    def test_live_summary_in_three_queries(self, hub_id, populated):
+        """Test the live summary agrees with the counters in one pass per table."""
+        with CaptureQueriesContext(connection) as queries:
+            summary = metrics.dashboard_summary(hub_id, today=TODAY)
+        assert len(queries.captured_queries) == 3
+        tiles = metrics.dashboard_metrics(hub_id)
+        for key in ('total_rentals', 'status_counts', 'revenue', 'deposits_held', 'overdue_value', 'units_out'):
+            assert summary[key] == tiles[key]
+        assert summary['revenue_month'] == Decimal('165')
+        assert summary['available_rental_items'] == 2
+        assert summary['utilisation'] == Decimal('33.3')
+
+    def test_reconcile_repairs_drift(self, hub_id, populated):
+        """Test reconciliation overwrites corrupted counters."""
+        RentalMetric.objects.filter(hub_id=hub_id, key='rentals.total').update(value=999)
+        metrics.reconcile_hub(hub_id)
+        assert _stored(hub_id)['rentals.total'] == 3
+
+    def test_writes_before_first_read(self, hub_id):
+        """Test writes to a hub without counters leave them to the first read."""
+        item = RentalItem.objects.create(hub_id=hub_id, name='Saw', quantity_total=1, daily_rate=Decimal('5'))
+        Rental.objects.create(
+            hub_id=hub_id, item=item, reference='R-9', customer_name='A', status='active',
+            start_date=TODAY, end_date=TODAY, total=Decimal('10'),
+        )
+        assert not RentalMetric.objects.filter(hub_id=hub_id).exists()
+        assert metrics.hub_metrics(hub_id)['rentals.total'] == 1
+        assert _stored(hub_id) == metrics.compute_hub(hub_id)
+
+    def test_category_change_moves_out_counts(self, hub_id, populated):
+        """Test renaming an item's category moves its rentals that are out."""
+        tools, _, _ = populated
+        tools.category = 'Power Tools'
+        tools.save()
+        stored = _stored(hub_id)
+        assert 'category.Tools.out' not in stored
+        assert stored['category.Power Tools.out'] == 1
+        assert stored == metrics.compute_hub(hub_id)
+
@@ -0,0 +1,107 @@
+"""Tests for the occupancy grid and availability calendar."""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from rentals import occupancy, views
+from rentals.models import RentalItem, Rental, RentalBlackout, OccupancyGrid
+
+
+ORIGIN = datetime.date(2025, 1, 1)
+
+
+def _day(n):
+    return ORIGIN + datetime.timedelta(days=n)
+
+
+class TestDayCounts:
+    """Grid construction without the database."""
+
+    def test_counts_and_blackouts(self):
+        """Test overlapping bookings add up and blackout days are marked."""
+        counts = occupancy.day_counts(
+            [(_day(1), _day(3), 1), (_day(2), _day(2), 1), (_day(5), _day(5), -1)], ORIGIN, days=7,
+        )
+        assert counts == [0, 1, 2, 1, 0, occupancy.BLOCKED, 0]
+
+    def test_pack_roundtrip(self):
+        """Test counts survive packing to bytes."""
+        assert list(occupancy.unpack(occupancy.pack([0, 3, occupancy.BLOCKED]))) == [0, 3, occupancy.BLOCKED]
+
+
+@pytest.mark.django_db
+class TestOccupancyGrid:
+    """Grid maintenance and the calendar view."""
+
+    @pytest.fixture
+    def item(self, hub_id):
+        return RentalItem.objects.create(hub_id=hub_id, name='Van', quantity_total=2, daily_rate=Decimal('80'))
+
+    def test_rebuilt_on_save_and_delete(self, hub_id, item):
+        """Test the grid follows rental writes."""
+        today = datetime.date.today()
+        rental = Rental.objects.create(
+            hub_id=hub_id, item=item, reference='R-1', customer_name='C',
+            status='reserved', start_date=today, end_date=today,
+        )
+        _, rows = occupancy.hub_occupancy(hub_id, today, 2)
+        assert rows[item.pk] == [1, 0]
+        rental.delete()
+        _, rows = occupancy.hub_occupancy(hub_id, today, 2)
+        assert rows[item.pk] == [0, 0]
+
+    def test_blackout_marks_days(self, hub_id, item):
+        """Test blackout days read back as blocked."""
+        today = datetime.date.today()
+        RentalBlackout.objects.create(hub_id=hub_id, item=item, start_date=today, end_date=today)
+        _, rows = occupancy.hub_occupancy(hub_id, today, 1)
+        assert rows[item.pk] == [occupancy.BLOCKED]
+
+    def test_window_outside_grid_is_not_stored(self, hub_id, item):
+        """Test a far-future window is computed without moving the stored grid."""
+        far = datetime.date.today() + datetime.timedelta(days=occupancy.GRID_DAYS * 2)
+        Rental.objects.create(
+            hub_id=hub_id, item=item, reference='R-1', customer_name='C',
+            status='reserved', start_date=far, end_date=far,
+        )
+        _, rows = occupancy.hub_occupancy(hub_id, far, 14)
+        assert rows[item.pk] == [1] + [0] * 13
+        assert OccupancyGrid.objects.get(item=item).origin == occupancy.default_origin()
+
+    def test_find_available_ranks_and_excludes(self, hub_id, item, django_assert_num_queries):
+        """Test free units, blackouts and ranking come from one query once grids exist."""
+        today = datetime.date.today()
+        bikes = RentalItem.objects.create(hub_id=hub_id, name='Bike', category='Bikes', quantity_total=5)
+        closed = RentalItem.objects.create(hub_id=hub_id, name='Boat', quantity_total=3)
+        Rental.objects.create(
+            hub_id=hub_id, item=item, reference='R-1', customer_name='C',
+            status='active', start_date=today, end_date=today,
+        )
+        Rental.objects.create(
+            hub_id=hub_id, item=bikes, reference='R-2', customer_name='C',
+            status='reserved', start_date=today, end_date=today,
+        )
+        RentalBlackout.objects.create(hub_id=hub_id, item=closed, start_date=today, end_date=today)
+        with django_assert_num_queries(1):
+            candidates, total_free = occupancy.find_available(hub_id, today, today, quantity=2)
+        assert [(c['name'], c['free_units'], c['fits']) for c in candidates] == [('Bike', 4, True), ('Van', 1, False)]
+        assert total_free == 5
+        candidates, _ = occupancy.find_available(hub_id, today, today, category='bikes')
+        assert [c['name'] for c in candidates] == ['Bike']
+
+    def test_calendar_view(self, auth_client, item):
+        """Test the calendar page and a lazily loaded chunk render."""
+        url = reverse('rentals:calendar')
+        assert auth_client.get(url).status_code == 200
+        response = auth_client.get(url, {'chunk': 1, 'start': '2025-03-01', 'days': 7})
+        assert response.status_code == 200
+        assert len(response.context['dates']) == 7
+        assert 'start=2025-03-08' in response.content.decode()
+
+    def test_calendar_clamps_start(self, auth_client, item):
+        """Test an extreme start date is clamped instead of overflowing."""
+        response = auth_client.get(reverse('rentals:calendar'), {'chunk': 1, 'start': '9999-12-31', 'days': 7})
+        assert response.status_code == 200
+        assert response.context['start'] == datetime.date.today() + views.CALENDAR_MAX_OFFSET
@@ -0,0 +1,80 @@
+"""Tests for the overdue sweeper."""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+
+from rentals import metrics, overdue
+from rentals.models import RentalItem, Rental, RentalMetric
+
+
+TODAY = datetime.date(2025, 3, 10)
+
+
+@pytest.fixture
+def rentals(hub_id):
+    item = RentalItem.objects.create(hub_id=hub_id, name='Drill', daily_rate=Decimal('5'))
+    # Build the counters so the sweep updates them incrementally
+    metrics.hub_metrics(hub_id)
+    rows = {}
+    for ref, status, end in (
+        ('late-1', 'active', TODAY - datetime.timedelta(days=3)),
+        ('late-2', 'active', TODAY - datetime.timedelta(days=1)),
+        ('due-today', 'active', TODAY),
+        ('reserved', 'reserved', TODAY - datetime.timedelta(days=5)),
+    ):
+        rows[ref] = Rental.objects.create(
+            hub_id=hub_id, item=item, reference=ref, customer_name='C', status=status,
+            start_date=TODAY - datetime.timedelta(days=10), end_date=end,
+        )
+    return rows
+
+
+def _statuses():
+    return dict(Rental.objects.values_list('reference', 'status'))
+
+
+@pytest.mark.django_db
+class TestMarkOverdue:
+    """Overdue sweep behaviour."""
+
+    def test_marks_only_past_active(self, rentals):
+        """Test only active rentals that ended before today change."""
+        result = overdue.mark_overdue(today=TODAY, batch_size=1)
+        assert result['updated'] == 2
+        assert result['batches'] == 2
+        assert _statuses() == {
+            'late-1': 'overdue', 'late-2': 'overdue', 'due-today': 'active', 'reserved': 'reserved',
+        }
+
+    def test_is_idempotent(self, rentals):
+        """Test a second run changes nothing."""
+        overdue.mark_overdue(today=TODAY)
+        assert overdue.mark_overdue(today=TODAY)['updated'] == 0
+
+    def test_dry_run_writes_nothing(self, rentals):
+        """Test dry run only counts."""
+        result = overdue.mark_overdue(today=TODAY, dry_run=True)
+        assert result['scanned'] == 2
+        assert _statuses()['late-1'] == 'active'
+
+    def test_keeps_metrics_in_step(self, hub_id, rentals):
+        """Test the dashboard counters match a recomputation after the sweep."""
+        overdue.mark_overdue(today=TODAY)
+        stored = {k: v for k, v in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value') if v}
+        assert stored == metrics.compute_hub(hub_id)
+
+    def test_moves_overdue_value(self, hub_id, rentals):
+        """Test swept rentals count towards the overdue value tile."""
+        Rental.objects.filter(reference__startswith='late').update(total=Decimal('40'))
+        metrics.reconcile_hub(hub_id)
+        overdue.mark_overdue(today=TODAY)
+        stored = {k: v for k, v in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value') if v}
+        assert stored['overdue.value'] == Decimal('80')
+        assert stored == metrics.compute_hub(hub_id)
+
+    def test_command(self, rentals, capsys):
+        """Test the management command runs the sweep."""
+        call_command('rentals_mark_overdue', date=TODAY.isoformat())
+        assert 'marked 2 rental(s) overdue' in capsys.readouterr().out
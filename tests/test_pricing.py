@@ -0,0 +1,97 @@
+"""Tests for the rental pricing engine."""
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from rentals import metrics, pricing
+from rentals.models import RentalItem, Rental, RentalMetric, SeasonalRate
+
+
+D = Decimal
+START = datetime.date(2025, 7, 1)
+
+
+def _day(n):
+    return START + datetime.timedelta(days=n)
+
+
+class TestBasePrice:
+    """Tier arithmetic without the database."""
+
+    def test_daily_only(self):
+        """Test days are charged inclusively at the daily rate."""
+        assert pricing.rental_days(START, START) == 1
+        assert pricing.base_price(3, D('10')) == D('30')
+
+    def test_weekly_tier(self):
+        """Test full weeks use the weekly rate and the remainder the daily one."""
+        assert pricing.base_price(9, D('10'), D('50')) == D('70')
+
+    def test_remainder_capped_at_next_tier(self):
+        """Test six days never cost more than a week."""
+        assert pricing.base_price(6, D('10'), D('50')) == D('50')
+
+    def test_monthly_tier(self):
+        """Test 30-day blocks use the monthly rate."""
+        assert pricing.base_price(31, D('10'), D('50'), D('150')) == D('160')
+
+    def test_seasonal_factor(self):
+        """Test the highest multiplier applies to covered days only."""
+        seasons = [(_day(0), _day(1), D('2')), (_day(1), _day(1), D('3'))]
+        assert pricing.seasonal_factor(_day(0), _day(3), seasons) == D('7') / 4
+
+
+@pytest.mark.django_db
+class TestRepricing:
+    """Quotes and bulk repricing against the database."""
+
+    @pytest.fixture
+    def item(self, hub_id):
+        item = RentalItem.objects.create(hub_id=hub_id, name='Tent', daily_rate=D('10'), quantity_total=50)
+        # Build the counters so repricing updates them incrementally
+        metrics.hub_metrics(hub_id)
+        return item
+
+    def _rental(self, item, days, status='reserved'):
+        return Rental.objects.create(
+            hub_id=item.hub_id, item=item, customer_name='C', status=status,
+            start_date=START, end_date=_day(days - 1), total=D('0'),
+        )
+
+    def test_quote_with_hub_season(self, hub_id, item):
+        """Test a hub-wide season applies to the item."""
+        SeasonalRate.objects.create(hub_id=hub_id, start_date=START, end_date=START, multiplier=D('1.5'))
+        assert pricing.quote(item, START, _day(1)) == D('25.00')
+
+    def test_reprice_updates_open_rentals_only(self, hub_id, item):
+        """Test a rate change reprices open rentals and keeps revenue counters right."""
+        open_rentals = [self._rental(item, 2) for _ in range(3)]
+        returned = self._rental(item, 2, status='returned')
+        item.daily_rate = D('20')
+        item.save()
+
+        result = pricing.reprice_open_rentals(hub_id=hub_id, batch_size=2)
+
+        assert result['updated'] == 3
+        assert {r.total for r in Rental.objects.filter(pk__in=[r.pk for r in open_rentals])} == {D('40.00')}
+        returned.refresh_from_db()
+        assert returned.total == D('0')
+        stored = {k: v for k, v in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value') if v}
+        assert stored == metrics.compute_hub(hub_id)
+
+    def test_reprice_keeps_month_and_overdue_counters(self, hub_id, item):
+        """Test repricing moves monthly revenue and overdue value with the totals."""
+        self._rental(item, 3, status='overdue')
+        self._rental(item, 2)
+        pricing.reprice_open_rentals(hub_id=hub_id)
+        stored = {k: v for k, v in RentalMetric.objects.filter(hub_id=hub_id).values_list('key', 'value') if v}
+        assert stored['overdue.value'] == D('30.00')
+        assert stored[f'revenue.month.{START:%Y-%m}'] == D('50.00')
+        assert stored == metrics.compute_hub(hub_id)
+
+    def test_reprice_is_a_noop_when_current(self, hub_id, item):
+        """Test a second run writes nothing."""
+        self._rental(item, 2)
+        pricing.reprice_open_rentals(hub_id=hub_id)
+        assert pricing.reprice_open_rentals(hub_id=hub_id)['updated'] == 0
@@ -0,0 +1,68 @@
+"""Tests for generated rental references."""
+import datetime
+
+import pytest
+from django.db import connection, transaction
+
+from rentals import references
+from rentals.booking import BookingError, save_rental
+from rentals.models import RentalItem, Rental, RentalSequence
+
+
+DAY = datetime.date(2025, 6, 2)
+
+
+@pytest.fixture
+def item(hub_id):
+    return RentalItem.objects.create(hub_id=hub_id, name='Trailer', quantity_total=10)
+
+
+def _rental(item, **extra):
+    return Rental(hub_id=item.hub_id, item=item, customer_name='C', start_date=DAY, end_date=DAY, **extra)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReferenceBlocks:
+    """Block caching across committed and rolled-back transactions."""
+
+    def test_numbers_come_from_one_block(self, hub_id, item):
+        """Test consecutive rentals are numbered from a single counter update."""
+        created = [save_rental(_rental(item)) for _ in range(3)]
+        assert [r.reference for r in created] == ['R-000001', 'R-000002', 'R-000003']
+        assert RentalSequence.objects.get(hub_id=hub_id).next_value == 1 + references.REFERENCE_BLOCK_SIZE
+
+    def test_rolled_back_reference_is_not_duplicated(self, hub_id):
+        """Test a rollback never leads to the same block being handed out twice."""
+        try:
+            with transaction.atomic():
+                references.next_reference(hub_id)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        # With row locks the block was committed on its own and R-000001 is
+        # skipped; otherwise the counter rolled back with the caller.
+        first = 2 if connection.features.has_select_for_update else 1
+        assert references.next_reference(hub_id) == references.format_reference(first)
+        assert references.next_reference(hub_id) == references.format_reference(first + 1)
+
+
+@pytest.mark.django_db
+class TestReferences:
+    """Reference generation and uniqueness."""
+
+    def test_counter_starts_after_existing_numbers(self, hub_id, item):
+        """Test a new counter skips references already used by the hub."""
+        save_rental(_rental(item, reference='R-000041'))
+        assert references.next_reference(hub_id) == 'R-000042'
+
+    def test_typed_numbers_are_skipped(self, hub_id, item):
+        """Test a generated reference never collides with one typed by hand."""
+        assert save_rental(_rental(item)).reference == 'R-000001'
+        save_rental(_rental(item, reference='R-000002'))
+        assert save_rental(_rental(item)).reference == 'R-000003'
+
+    def test_duplicate_reference_is_rejected(self, item):
+        """Test a typed reference already in use is refused."""
+        save_rental(_rental(item, reference='A-1'))
+        with pytest.raises(BookingError):
+            save_rental(_rental(item, reference='A-1'))
@@ -0,0 +1,80 @@
+"""Tests for rentals full-text search."""
+import datetime
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from rentals.models import RentalItem, Rental
+from rentals.search import build_search_text, search_rental_items, search_rentals, tokenize
+
+
+def test_tokenize():
+    """Test queries are split into lower-cased word tokens."""
+    assert tokenize('  Scaffold-Tower 3m ') == ['scaffold', 'tower', '3m']
+
+
+def test_build_search_text():
+    """Test the indexed text joins the searchable fields."""
+    item = RentalItem(name='Scaffold Tower', code='SC-01', description='')
+    assert build_search_text(item) == 'scaffold tower sc-01'
+
+
+@pytest.mark.django_db
+class TestSearch:
+    """Search against the database backend in use."""
+
+    @pytest.fixture
+    def items(self, hub_id):
+        return [
+            RentalItem.objects.create(hub_id=hub_id, name='Scaffold Tower', code='SC-01', daily_rate=Decimal('30')),
+            RentalItem.objects.create(hub_id=hub_id, name='Concrete Mixer', code='MX-02', daily_rate=Decimal('25')),
+            RentalItem.objects.create(
+                hub_id=hub_id, name='Pressure Washer', code='PW-03', description='Petrol scaffold cleaner',
+                daily_rate=Decimal('20'),
+            ),
+        ]
+
+    def test_search_text_saved(self, items):
+        """Test saving refreshes the search column."""
+        items[0].name = 'Aluminium Tower'
+        items[0].save()
+        items[0].refresh_from_db()
+        assert items[0].search_text.startswith('aluminium tower')
+
+    def test_prefix_match(self, hub_id, items):
+        """Test partial words match as the user types."""
+        qs = search_rental_items(RentalItem.objects.filter(hub_id=hub_id), 'scaf')
+        assert {i.name for i in qs} == {'Scaffold Tower', 'Pressure Washer'}
+
+    def test_all_tokens_required(self, hub_id, items):
+        """Test multi-word queries narrow the results."""
+        qs = search_rental_items(RentalItem.objects.filter(hub_id=hub_id), 'scaf tow')
+        assert [i.name for i in qs] == ['Scaffold Tower']
+
+    def test_ranked_search_keeps_numbered_pages(self, auth_client, hub_id, items):
+        """Test relevance ordering is not replaced by cursor paging."""
+        params = {'q': 'scaf', 'rank': '1', 'mode': 'keyset', 'per_page': '0'}
+        response = auth_client.get(reverse('rentals:rental_items_list'), params)
+        page_obj = response.context['page_obj']
+        assert not getattr(page_obj, 'is_keyset', False)
+        assert {i.name for i in page_obj} == {'Scaffold Tower', 'Pressure Washer'}
+
+    def test_no_match(self, hub_id, items):
+        """Test unrelated queries return nothing."""
+        assert not search_rental_items(RentalItem.objects.filter(hub_id=hub_id), 'forklift').exists()
+
+    def test_rentals_match_status(self, hub_id, items):
+        """Test a status keyword matches rentals in that status."""
+        today = datetime.date(2025, 1, 1)
+        Rental.objects.create(
+            hub_id=hub_id, item=items[0], reference='R-1', customer_name='Acme Builders',
+            status='overdue', start_date=today, end_date=today,
+        )
+        Rental.objects.create(
+            hub_id=hub_id, item=items[1], reference='R-2', customer_name='Jane Doe',
+            status='active', start_date=today, end_date=today,
+        )
+        qs = Rental.objects.filter(hub_id=hub_id)
+        assert [r.reference for r in search_rentals(qs, 'acme')] == ['R-1']
+        assert [r.reference for r in search_rentals(qs, 'overdue')] == ['R-1']
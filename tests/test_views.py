@@ -1,7 +1,25 @@
 """Tests for rentals views."""
+import datetime
+from decimal import Decimal
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from rentals.models import RentalItem, Rental
+
+
+def _seed_rentals(hub_id, count):
+    """Create ``count`` rentals, each on its own item."""
+    today = datetime.date(2025, 1, 15)
+    for n in range(count):
+        item = RentalItem.objects.create(hub_id=hub_id, name=f'Item {n:03d}', daily_rate=Decimal('10.00'))
+        Rental.objects.create(
+            hub_id=hub_id, item=item, reference=f'R-{n:03d}', customer_name='Customer',
+            status='reserved', start_date=today, end_date=today,
+        )
+
 
 @pytest.mark.django_db
 class TestDashboard:
@@ -105,6 +123,18 @@ class TestRentalItemViews:
         response = auth_client.post(url, data)
         assert response.status_code == 200
 
+    def test_edit_reprices_only_on_rate_change(self, auth_client, rental_item, monkeypatch):
+        """Test equal rates written differently do not reprice, and a real change does."""
+        from rentals import views
+        calls = []
+        monkeypatch.setattr(views, 'reprice_open_rentals', lambda **kwargs: calls.append(kwargs))
+        url = reverse('rentals:rental_item_edit', args=[rental_item.pk])
+        data = {'name': 'Test Name', 'daily_rate': '10', 'weekly_rate': '0', 'monthly_rate': ''}
+        auth_client.post(url, data)
+        assert calls == []
+        auth_client.post(url, {**data, 'daily_rate': '12.50'})
+        assert calls == [{'item_ids': [rental_item.pk]}]
+
     def test_delete(self, auth_client, rental_item):
         """Test soft delete via POST."""
         url = reverse('rentals:rental_item_delete', args=[rental_item.pk])
@@ -178,6 +208,17 @@ class TestRentalViews:
         response = auth_client.get(url, {'export': 'excel'})
         assert response.status_code == 200
 
+    def test_export_csv_streams_rows(self, auth_client, hub_id):
+        """Test the CSV export is streamed and joins the item name."""
+        _seed_rentals(hub_id, 3)
+        url = reverse('rentals:rentals_list')
+        response = auth_client.get(url, {'export': 'csv'})
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0] == 'Reference,RentalItem,Status,Total,Customer Name,Start Date'
+        assert lines[1].startswith('R-000,Item 000,reserved,')
+        assert len(lines) == 4
+
     def test_add_form_loads(self, auth_client):
         """Test add form loads."""
         url = reverse('rentals:rental_add')
@@ -236,6 +277,54 @@ class TestRentalViews:
         response = client.get(url)
         assert response.status_code == 302
 
+    def test_list_query_count_is_constant(self, auth_client, hub_id):
+        """Test the datatable does not issue a query per row."""
+        _seed_rentals(hub_id, 100)
+        url = reverse('rentals:rentals_list')
+        auth_client.get(url, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body')
+        counts = {}
+        for per_page in (12, 96):
+            with CaptureQueriesContext(connection) as ctx:
+                response = auth_client.get(
+                    url, {'per_page': per_page}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body',
+                )
+            assert response.status_code == 200
+            counts[per_page] = len(ctx.captured_queries)
+        assert counts[12] == counts[96]
+
+    def test_list_sort_by_item_name(self, auth_client, hub_id):
+        """Test sorting by item orders rows by item name."""
+        _seed_rentals(hub_id, 3)
+        url = reverse('rentals:rentals_list')
+        response = auth_client.get(
+            url, {'sort': 'item', 'dir': 'desc'}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body',
+        )
+        content = response.content.decode()
+        assert content.index('Item 002') < content.index('Item 000')
+
+    def test_list_keyset_mode(self, auth_client, hub_id):
+        """Test cursor pages walk the list without repeating rows."""
+        _seed_rentals(hub_id, 30)
+        url = reverse('rentals:rentals_list')
+        response = auth_client.get(
+            url, {'mode': 'keyset', 'per_page': 12}, HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body',
+        )
+        page = response.context['page_obj']
+        assert [r.reference for r in page] == [f'R-{n:03d}' for n in range(12)]
+        response = auth_client.get(
+            url, {'mode': 'keyset', 'per_page': 12, 'after': page.next_cursor},
+            HTTP_HX_REQUEST='true', HTTP_HX_TARGET='datatable-body',
+        )
+        assert [r.reference for r in response.context['page_obj']] == [f'R-{n:03d}' for n in range(12, 24)]
+
+    def test_list_all_streams_chunks(self, auth_client, hub_id):
+        """Test per_page=0 returns an infinite-scroll chunk instead of the whole table."""
+        _seed_rentals(hub_id, 3)
+        url = reverse('rentals:rentals_list')
+        response = auth_client.get(url, {'per_page': 0, 'rows': 1})
+        assert response.status_code == 200
+        assert response.context['page_obj'].scroll is True
+
 
 @pytest.mark.django_db
 class TestSettings:
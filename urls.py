@@ -1,18 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, instrumentation, views
+
+# Async-native read views for ASGI deployments (see async_views.py)
+pages = async_views if getattr(settings, 'RENTALS_ASYNC_VIEWS', False) else views
 
 app_name = 'rentals'
 
 urlpatterns = [
     # Dashboard
-    path('', views.dashboard, name='dashboard'),
+    path('', pages.dashboard, name='dashboard'),
 
     # Navigation tab aliases
-    path('items/', views.rental_items_list, name='items'),
+    path('items/', pages.rental_items_list, name='items'),
 
 
     # RentalItem
-    path('rental_items/', views.rental_items_list, name='rental_items_list'),
+    path('rental_items/', pages.rental_items_list, name='rental_items_list'),
     path('rental_items/add/', views.rental_item_add, name='rental_item_add'),
     path('rental_items/<uuid:pk>/edit/', views.rental_item_edit, name='rental_item_edit'),
     path('rental_items/<uuid:pk>/delete/', views.rental_item_delete, name='rental_item_delete'),
@@ -20,7 +24,7 @@ urlpatterns = [
     path('rental_items/bulk/', views.rental_items_bulk_action, name='rental_items_bulk_action'),
 
     # Rental Item Detail
-    path('items/<uuid:pk>/', views.rental_item_detail, name='rental_item_detail'),
+    path('items/<uuid:pk>/', pages.rental_item_detail, name='rental_item_detail'),
 
     # Blackouts
     path('items/<uuid:pk>/blackouts/add/', views.blackout_add, name='blackout_add'),
@@ -28,12 +32,21 @@ urlpatterns = [
     path('items/<uuid:pk>/blackouts/<uuid:blackout_pk>/delete/', views.blackout_delete, name='blackout_delete'),
 
     # Rental
-    path('rentals/', views.rentals_list, name='rentals_list'),
+    path('rentals/', pages.rentals_list, name='rentals_list'),
     path('rentals/add/', views.rental_add, name='rental_add'),
     path('rentals/<uuid:pk>/edit/', views.rental_edit, name='rental_edit'),
     path('rentals/<uuid:pk>/delete/', views.rental_delete, name='rental_delete'),
     path('rentals/bulk/', views.rentals_bulk_action, name='rentals_bulk_action'),
 
+    # Availability calendar
+    path('calendar/', views.calendar_view, name='calendar'),
+
+    # Analytics
+    path('analytics/', views.analytics_view, name='analytics'),
+
     # Settings
     path('settings/', views.settings_view, name='settings'),
 ]
+
+# Sampled timing (RENTALS_TIMING_SAMPLE_RATE); a no-op when the rate is 0
+instrumentation.instrument_patterns(urlpatterns)
@@ -1,25 +1,95 @@
 """
 Rental Management Module Views
 """
+import csv
+import datetime
+import json
+
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
 from django.http import HttpResponse
 from django.urls import reverse
-from django.shortcuts import get_object_or_404, render as django_render
+from django.shortcuts import get_object_or_404, render as _django_render
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.http import require_POST
 
 from apps.accounts.decorators import login_required, permission_required
-from apps.core.htmx import htmx_view
-from apps.core.services import export_to_csv, export_to_excel
+from apps.core.htmx import htmx_view as _htmx_view
 from apps.modules_runtime.navigation import with_module_nav
 
-from .models import RentalItem, Rental, RentalBlackout
+from . import analytics, forecasting, fragment_cache, instrumentation, occupancy
+from .booking import BookingError, save_blackout, save_rental
+from .bulk_actions import BulkActionError, run_rental_action
+from .exports import stream_csv, stream_excel
+from .metrics import dashboard_metrics, track_bulk
+from .models import RENTAL_STATUS, RentalItem, Rental, RentalBlackout
+from .pagination import KEYSET_CHUNK_SIZE, KEYSET_THRESHOLD, cached_count, keyset_page
+from .pricing import reprice_open_rentals
+from .search import search_rental_items, search_rentals
+
+# Template rendering is timed for sampled requests (see instrumentation.py)
+django_render = instrumentation.timed_render(_django_render)
+htmx_view = instrumentation.timed_htmx_view(_htmx_view)
 
 PER_PAGE_CHOICES = [12, 24, 48, 96, 0]
 
 
+def _paginate(request, hub_id, qs, sort_key, sort_dir, per_page):
+    """
+    Page ``qs`` for a datatable.
+
+    Small result sets keep numbered pages. Large ones (or an explicit
+    ``mode=keyset``) switch to cursor pages, and "all" (``per_page=0``)
+    streams the rows as infinite-scroll chunks instead of one huge page.
+    Searches ordered by relevance always use numbered pages: cursors follow
+    ``(sort_key, pk)`` and would drop the ranking. The total comes from a
+    short-lived cache, dropped on the hub's next write, rather than a COUNT
+    per request.
+    """
+    total = cached_count(qs, namespace=f'{hub_id}:{fragment_cache.generation(hub_id)}')
+    if _uses_keyset(request, qs, per_page, total):
+        return keyset_page(
+            qs, sort_key, descending=sort_dir == 'desc',
+            after=request.GET.get('after'), before=request.GET.get('before'),
+            per_page=per_page or KEYSET_CHUNK_SIZE, count=total, scroll=per_page == 0,
+        )
+    paginator = Paginator(qs, per_page or KEYSET_CHUNK_SIZE)
+    paginator.count = total
+    return paginator.get_page(request.GET.get('page', 1))
+
+
+def _ranked(qs):
+    return qs.query.order_by[:1] == ('-search_rank',)
+
+
+def _uses_keyset(request, qs, per_page, total):
+    if _ranked(qs):
+        return False
+    return per_page == 0 or request.GET.get('mode') == 'keyset' or total > KEYSET_THRESHOLD
+
+
+def _list_state(request, default_sort):
+    """Search, sort, view and page size of a datatable request."""
+    per_page = int(request.GET.get('per_page', 12))
+    if per_page not in PER_PAGE_CHOICES:
+        per_page = 12
+    return {
+        'search_query': request.GET.get('q', '').strip(),
+        'sort_field': request.GET.get('sort', default_sort),
+        'sort_dir': request.GET.get('dir', 'asc'),
+        'current_view': request.GET.get('view', 'table'),
+        'per_page': per_page,
+    }
+
+
+def _ordered(request, qs, state, sort_key):
+    order_by = f'-{sort_key}' if state['sort_dir'] == 'desc' else sort_key
+    # Requests from the search box (rank=1) are ordered by relevance
+    if state['search_query'] and request.GET.get('rank'):
+        return qs.order_by('-search_rank', order_by)
+    return qs.order_by(order_by)
+
+
 # ======================================================================
 # Dashboard
 # ======================================================================
@@ -29,10 +99,7 @@ PER_PAGE_CHOICES = [12, 24, 48, 96, 0]
 @htmx_view('rentals/pages/index.html', 'rentals/partials/dashboard_content.html')
 def dashboard(request):
     hub_id = request.session.get('hub_id')
-    return {
-        'total_rental_items': RentalItem.objects.filter(hub_id=hub_id, is_deleted=False).count(),
-        'total_rentals': Rental.objects.filter(hub_id=hub_id, is_deleted=False).count(),
-    }
+    return {**dashboard_metrics(hub_id), 'forecast': forecasting.pressure(hub_id)}
 
 
 # ======================================================================
@@ -49,8 +116,16 @@ RENTAL_ITEM_SORT_FIELDS = {
     'created_at': 'created_at',
 }
 
+def _rental_items_query(request, hub_id, state):
+    """Searched and ordered items of the datatable; returns ``(qs, sort_key)``."""
+    qs = RentalItem.objects.filter(hub_id=hub_id)
+    if state['search_query']:
+        qs = search_rental_items(qs, state['search_query'])
+    sort_key = RENTAL_ITEM_SORT_FIELDS.get(state['sort_field'], 'code')
+    return _ordered(request, qs, state, sort_key), sort_key
+
 def _build_rental_items_context(hub_id, per_page=10):
-    qs = RentalItem.objects.filter(hub_id=hub_id, is_deleted=False).order_by('code')
+    qs = RentalItem.objects.filter(hub_id=hub_id).order_by('code')
     paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
     page_obj = paginator.get_page(1)
     return {
@@ -64,56 +139,44 @@ def _build_rental_items_context(hub_id, per_page=10):
     }
 
 def _render_rental_items_list(request, hub_id, per_page=10):
-    ctx = _build_rental_items_context(hub_id, per_page)
-    return django_render(request, 'rentals/partials/rental_items_list.html', ctx)
+    return fragment_cache.fragment_response(
+        request, hub_id, 'rentals/partials/rental_items_list.html',
+        lambda: _build_rental_items_context(hub_id, per_page), params={'per_page': per_page},
+    )
 
 @login_required
 @with_module_nav('rentals', 'items')
 @htmx_view('rentals/pages/rental_items.html', 'rentals/partials/rental_items_content.html')
 def rental_items_list(request):
     hub_id = request.session.get('hub_id')
-    search_query = request.GET.get('q', '').strip()
-    sort_field = request.GET.get('sort', 'code')
-    sort_dir = request.GET.get('dir', 'asc')
-    page_number = request.GET.get('page', 1)
-    current_view = request.GET.get('view', 'table')
-    per_page = int(request.GET.get('per_page', 12))
-    if per_page not in PER_PAGE_CHOICES:
-        per_page = 12
-
-    qs = RentalItem.objects.filter(hub_id=hub_id, is_deleted=False)
-
-    if search_query:
-        qs = qs.filter(Q(name__icontains=search_query) | Q(code__icontains=search_query) | Q(description__icontains=search_query))
-
-    order_by = RENTAL_ITEM_SORT_FIELDS.get(sort_field, 'code')
-    if sort_dir == 'desc':
-        order_by = f'-{order_by}'
-    qs = qs.order_by(order_by)
+    state = _list_state(request, 'code')
+    qs, sort_key = _rental_items_query(request, hub_id, state)
 
     export_format = request.GET.get('export')
     if export_format in ('csv', 'excel'):
         fields = ['code', 'name', 'is_available', 'is_active', 'daily_rate', 'description']
         headers = ['Code', 'Name', 'Is Available', 'Is Active', 'Daily Rate', 'Description']
         if export_format == 'csv':
-            return export_to_csv(qs, fields=fields, headers=headers, filename='rental_items.csv')
-        return export_to_excel(qs, fields=fields, headers=headers, filename='rental_items.xlsx')
+            return stream_csv(qs, fields=fields, headers=headers, filename='rental_items.csv')
+        return stream_excel(qs, fields=fields, headers=headers, filename='rental_items.xlsx')
 
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(page_number)
+    def build_context():
+        page_obj = _paginate(request, hub_id, qs, sort_key, state['sort_dir'], state['per_page'])
+        return {'rental_items': page_obj, 'page_obj': page_obj, **state}
+
+    # Datatable fragments are served from the per-hub cache; the queries
+    # in build_context() only run on a miss.
+    if request.GET.get('rows'):
+        return fragment_cache.fragment_response(
+            request, hub_id, 'rentals/partials/rental_items_rows.html', build_context,
+        )
 
     if request.htmx and request.htmx.target == 'datatable-body':
-        return django_render(request, 'rentals/partials/rental_items_list.html', {
-            'rental_items': page_obj, 'page_obj': page_obj,
-            'search_query': search_query, 'sort_field': sort_field,
-            'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
-        })
+        return fragment_cache.fragment_response(
+            request, hub_id, 'rentals/partials/rental_items_list.html', build_context,
+        )
 
-    return {
-        'rental_items': page_obj, 'page_obj': page_obj,
-        'search_query': search_query, 'sort_field': sort_field,
-        'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
-    }
+    return build_context()
 
 @login_required
 @htmx_view('rentals/pages/rental_item_add.html', 'rentals/partials/rental_item_add_content.html')
@@ -124,6 +187,8 @@ def rental_item_add(request):
         code = request.POST.get('code', '').strip()
         description = request.POST.get('description', '').strip()
         daily_rate = request.POST.get('daily_rate', '0') or '0'
+        weekly_rate = request.POST.get('weekly_rate', '0') or '0'
+        monthly_rate = request.POST.get('monthly_rate', '0') or '0'
         is_available = request.POST.get('is_available') == 'on'
         is_active = request.POST.get('is_active') == 'on'
         obj = RentalItem(hub_id=hub_id)
@@ -131,6 +196,8 @@ def rental_item_add(request):
         obj.code = code
         obj.description = description
         obj.daily_rate = daily_rate
+        obj.weekly_rate = weekly_rate
+        obj.monthly_rate = monthly_rate
         obj.is_available = is_available
         obj.is_active = is_active
         obj.save()
@@ -143,15 +210,22 @@ def rental_item_add(request):
 @htmx_view('rentals/pages/rental_item_edit.html', 'rentals/partials/rental_item_edit_content.html')
 def rental_item_edit(request, pk):
     hub_id = request.session.get('hub_id')
-    obj = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id, is_deleted=False)
+    obj = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id)
     if request.method == 'POST':
         obj.name = request.POST.get('name', '').strip()
         obj.code = request.POST.get('code', '').strip()
         obj.description = request.POST.get('description', '').strip()
-        obj.daily_rate = request.POST.get('daily_rate', '0') or '0'
+        rates = (obj.daily_rate, obj.weekly_rate, obj.monthly_rate)
+        # Decimals, so '10' and '10.00' compare equal to the stored rate
+        decimal = RentalItem._meta.get_field('daily_rate').to_python
+        obj.daily_rate = decimal(request.POST.get('daily_rate', '0') or '0')
+        obj.weekly_rate = decimal(request.POST.get('weekly_rate', '0') or '0')
+        obj.monthly_rate = decimal(request.POST.get('monthly_rate', '0') or '0')
         obj.is_available = request.POST.get('is_available') == 'on'
         obj.is_active = request.POST.get('is_active') == 'on'
         obj.save()
+        if (obj.daily_rate, obj.weekly_rate, obj.monthly_rate) != rates:
+            reprice_open_rentals(item_ids=[obj.pk])
         return _render_rental_items_list(request, hub_id)
     return {'obj': obj}
 
@@ -159,7 +233,7 @@ def rental_item_edit(request, pk):
 @require_POST
 def rental_item_delete(request, pk):
     hub_id = request.session.get('hub_id')
-    obj = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id, is_deleted=False)
+    obj = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id)
     obj.is_deleted = True
     obj.deleted_at = timezone.now()
     obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
@@ -169,7 +243,7 @@ def rental_item_delete(request, pk):
 @require_POST
 def rental_item_toggle_status(request, pk):
     hub_id = request.session.get('hub_id')
-    obj = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id, is_deleted=False)
+    obj = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id)
     obj.is_active = not obj.is_active
     obj.save(update_fields=['is_active', 'updated_at'])
     return _render_rental_items_list(request, hub_id)
@@ -180,13 +254,16 @@ def rental_items_bulk_action(request):
     hub_id = request.session.get('hub_id')
     ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
     action = request.POST.get('action', '')
-    qs = RentalItem.objects.filter(hub_id=hub_id, is_deleted=False, id__in=ids)
-    if action == 'activate':
-        qs.update(is_active=True)
-    elif action == 'deactivate':
-        qs.update(is_active=False)
-    elif action == 'delete':
-        qs.update(is_deleted=True, deleted_at=timezone.now())
+    qs = RentalItem.objects.filter(hub_id=hub_id, id__in=ids)
+    with track_bulk(RentalItem, ids):
+        if action == 'activate':
+            qs.update(is_active=True)
+        elif action == 'deactivate':
+            qs.update(is_active=False)
+        elif action == 'delete':
+            qs.update(is_deleted=True, deleted_at=timezone.now())
+    # update() skips the save signals that normally invalidate the cache
+    fragment_cache.bump(hub_id)
     return _render_rental_items_list(request, hub_id)
 
 
@@ -196,7 +273,7 @@ def rental_items_bulk_action(request):
 
 RENTAL_SORT_FIELDS = {
     'reference': 'reference',
-    'item': 'item',
+    'item': 'item__name',
     'status': 'status',
     'total': 'total',
     'customer_name': 'customer_name',
@@ -204,8 +281,28 @@ RENTAL_SORT_FIELDS = {
     'created_at': 'created_at',
 }
 
+# Columns rendered by rentals_list.html and the export; everything else stays deferred.
+RENTAL_LIST_COLUMNS = (
+    'id', 'reference', 'status', 'total', 'customer_name', 'start_date', 'item', 'item__name',
+)
+
+def _rentals_queryset(hub_id):
+    return (
+        Rental.objects.filter(hub_id=hub_id)
+        .select_related('item')
+        .only(*RENTAL_LIST_COLUMNS)
+    )
+
+def _rentals_query(request, hub_id, state):
+    """Searched and ordered rentals of the datatable; returns ``(qs, sort_key)``."""
+    qs = _rentals_queryset(hub_id)
+    if state['search_query']:
+        qs = search_rentals(qs, state['search_query'])
+    sort_key = RENTAL_SORT_FIELDS.get(state['sort_field'], 'reference')
+    return _ordered(request, qs, state, sort_key), sort_key
+
 def _build_rentals_context(hub_id, per_page=10):
-    qs = Rental.objects.filter(hub_id=hub_id, is_deleted=False).order_by('reference')
+    qs = _rentals_queryset(hub_id).order_by('reference')
     paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
     page_obj = paginator.get_page(1)
     return {
@@ -219,57 +316,58 @@ def _build_rentals_context(hub_id, per_page=10):
     }
 
 def _render_rentals_list(request, hub_id, per_page=10):
-    ctx = _build_rentals_context(hub_id, per_page)
-    return django_render(request, 'rentals/partials/rentals_list.html', ctx)
+    return fragment_cache.fragment_response(
+        request, hub_id, 'rentals/partials/rentals_list.html',
+        lambda: _build_rentals_context(hub_id, per_page), params={'per_page': per_page},
+    )
 
 @login_required
 @with_module_nav('rentals', 'rentals')
 @htmx_view('rentals/pages/rentals.html', 'rentals/partials/rentals_content.html')
 def rentals_list(request):
     hub_id = request.session.get('hub_id')
-    search_query = request.GET.get('q', '').strip()
-    sort_field = request.GET.get('sort', 'reference')
-    sort_dir = request.GET.get('dir', 'asc')
-    page_number = request.GET.get('page', 1)
-    current_view = request.GET.get('view', 'table')
-    per_page = int(request.GET.get('per_page', 12))
-    if per_page not in PER_PAGE_CHOICES:
-        per_page = 12
-
-    qs = Rental.objects.filter(hub_id=hub_id, is_deleted=False)
-
-    if search_query:
-        qs = qs.filter(Q(reference__icontains=search_query) | Q(customer_name__icontains=search_query) | Q(status__icontains=search_query) | Q(notes__icontains=search_query))
-
-    order_by = RENTAL_SORT_FIELDS.get(sort_field, 'reference')
-    if sort_dir == 'desc':
-        order_by = f'-{order_by}'
-    qs = qs.order_by(order_by)
+    state = _list_state(request, 'reference')
+    qs, sort_key = _rentals_query(request, hub_id, state)
 
     export_format = request.GET.get('export')
     if export_format in ('csv', 'excel'):
-        fields = ['reference', 'item', 'status', 'total', 'customer_name', 'start_date']
+        fields = ['reference', 'item__name', 'status', 'total', 'customer_name', 'start_date']
         headers = ['Reference', 'RentalItem', 'Status', 'Total', 'Customer Name', 'Start Date']
         if export_format == 'csv':
-            return export_to_csv(qs, fields=fields, headers=headers, filename='rentals.csv')
-        return export_to_excel(qs, fields=fields, headers=headers, filename='rentals.xlsx')
+            return stream_csv(qs, fields=fields, headers=headers, filename='rentals.csv')
+        return stream_excel(qs, fields=fields, headers=headers, filename='rentals.xlsx')
 
-    paginator = Paginator(qs, per_page if per_page > 0 else max(qs.count(), 1))
-    page_obj = paginator.get_page(page_number)
+    def build_context():
+        page_obj = _paginate(request, hub_id, qs, sort_key, state['sort_dir'], state['per_page'])
+        return {'rentals': page_obj, 'page_obj': page_obj, **state}
+
+    # Datatable fragments are served from the per-hub cache; the queries
+    # in build_context() only run on a miss.
+    if request.GET.get('rows'):
+        return fragment_cache.fragment_response(
+            request, hub_id, 'rentals/partials/rentals_rows.html', build_context,
+        )
 
     if request.htmx and request.htmx.target == 'datatable-body':
-        return django_render(request, 'rentals/partials/rentals_list.html', {
-            'rentals': page_obj, 'page_obj': page_obj,
-            'search_query': search_query, 'sort_field': sort_field,
-            'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
-        })
+        return fragment_cache.fragment_response(
+            request, hub_id, 'rentals/partials/rentals_list.html', build_context,
+        )
 
+    return build_context()
+
+def _rental_form_context(hub_id, **extra):
     return {
-        'rentals': page_obj, 'page_obj': page_obj,
-        'search_query': search_query, 'sort_field': sort_field,
-        'sort_dir': sort_dir, 'current_view': current_view, 'per_page': per_page,
+        'items': RentalItem.objects.filter(hub_id=hub_id, is_active=True).order_by('name'),
+        'status_choices': RENTAL_STATUS,
+        **extra,
     }
 
+def _rental_item_id(request, hub_id):
+    item_id = request.POST.get('item') or None
+    if item_id and not RentalItem.objects.filter(pk=item_id, hub_id=hub_id).exists():
+        return None
+    return item_id
+
 @login_required
 @htmx_view('rentals/pages/rental_add.html', 'rentals/partials/rental_add_content.html')
 def rental_add(request):
@@ -277,47 +375,52 @@ def rental_add(request):
     if request.method == 'POST':
         reference = request.POST.get('reference', '').strip()
         customer_name = request.POST.get('customer_name', '').strip()
-        status = request.POST.get('status', '').strip()
+        status = request.POST.get('status', '').strip() or 'reserved'
         start_date = request.POST.get('start_date') or None
         end_date = request.POST.get('end_date') or None
-        total = request.POST.get('total', '0') or '0'
         notes = request.POST.get('notes', '').strip()
         obj = Rental(hub_id=hub_id)
         obj.reference = reference
+        obj.item_id = _rental_item_id(request, hub_id)
         obj.customer_name = customer_name
         obj.status = status
         obj.start_date = start_date
         obj.end_date = end_date
-        obj.total = total
         obj.notes = notes
-        obj.save()
+        try:
+            save_rental(obj, reprice=True)
+        except BookingError as e:
+            return _rental_form_context(hub_id, error=str(e))
         response = HttpResponse(status=204)
         response['HX-Redirect'] = reverse('rentals:rentals_list')
         return response
-    return {}
+    return _rental_form_context(hub_id)
 
 @login_required
 @htmx_view('rentals/pages/rental_edit.html', 'rentals/partials/rental_edit_content.html')
 def rental_edit(request, pk):
     hub_id = request.session.get('hub_id')
-    obj = get_object_or_404(Rental, pk=pk, hub_id=hub_id, is_deleted=False)
+    obj = get_object_or_404(Rental, pk=pk, hub_id=hub_id)
     if request.method == 'POST':
         obj.reference = request.POST.get('reference', '').strip()
+        obj.item_id = _rental_item_id(request, hub_id) or obj.item_id
         obj.customer_name = request.POST.get('customer_name', '').strip()
-        obj.status = request.POST.get('status', '').strip()
+        obj.status = request.POST.get('status', '').strip() or obj.status
         obj.start_date = request.POST.get('start_date') or None
         obj.end_date = request.POST.get('end_date') or None
-        obj.total = request.POST.get('total', '0') or '0'
         obj.notes = request.POST.get('notes', '').strip()
-        obj.save()
+        try:
+            save_rental(obj, reprice=True)
+        except BookingError as e:
+            return _rental_form_context(hub_id, obj=obj, error=str(e))
         return _render_rentals_list(request, hub_id)
-    return {'obj': obj}
+    return _rental_form_context(hub_id, obj=obj)
 
 @login_required
 @require_POST
 def rental_delete(request, pk):
     hub_id = request.session.get('hub_id')
-    obj = get_object_or_404(Rental, pk=pk, hub_id=hub_id, is_deleted=False)
+    obj = get_object_or_404(Rental, pk=pk, hub_id=hub_id)
     obj.is_deleted = True
     obj.deleted_at = timezone.now()
     obj.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
@@ -326,13 +429,31 @@ def rental_delete(request, pk):
 @login_required
 @require_POST
 def rentals_bulk_action(request):
+    """
+    Run a bulk action and re-render only the rows it changed.
+
+    The rows are returned as out-of-band swaps (deleted rows are removed),
+    the main swap is suppressed with ``HX-Reswap: none`` and the number of
+    affected rows is sent in an ``HX-Trigger`` event.
+    """
     hub_id = request.session.get('hub_id')
     ids = [i.strip() for i in request.POST.get('ids', '').split(',') if i.strip()]
     action = request.POST.get('action', '')
-    qs = Rental.objects.filter(hub_id=hub_id, is_deleted=False, id__in=ids)
-    if action == 'delete':
-        qs.update(is_deleted=True, deleted_at=timezone.now())
-    return _render_rentals_list(request, hub_id)
+    context = {'action': action, 'count': 0}
+    try:
+        changed = run_rental_action(hub_id, ids, action, days=request.POST.get('days'))
+    except (BulkActionError, BookingError) as e:
+        context['error'] = str(e)
+    else:
+        context['count'] = len(changed)
+        if action == 'delete':
+            context['deleted_ids'] = changed
+        else:
+            context['rentals'] = _rentals_queryset(hub_id).filter(pk__in=changed).order_by('reference')
+    response = django_render(request, 'rentals/partials/rentals_bulk_response.html', context)
+    response['HX-Reswap'] = 'none'
+    response['HX-Trigger'] = json.dumps({'rentalsBulkAction': {'action': action, 'count': context['count']}})
+    return response
 
 
 # ======================================================================
@@ -344,19 +465,20 @@ def rentals_bulk_action(request):
 @htmx_view('rentals/pages/rental_item_detail.html', 'rentals/partials/rental_item_detail_content.html')
 def rental_item_detail(request, pk):
     hub_id = request.session.get('hub_id')
-    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id, is_deleted=False)
+    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id)
     return {
         'item': item,
-        'blackouts': RentalBlackout.objects.filter(item=item, is_deleted=False).order_by('-start_date'),
-        'active_rentals': Rental.objects.filter(item=item, is_deleted=False, status__in=['active', 'reserved']).order_by('-start_date')[:10],
+        'blackouts': RentalBlackout.objects.filter(item=item).order_by('-start_date'),
+        'active_rentals': Rental.objects.filter(item=item, status__in=['active', 'reserved']).order_by('-start_date')[:10],
     }
 
 
-def _render_blackouts_list(request, item):
-    blackouts = RentalBlackout.objects.filter(item=item, is_deleted=False).order_by('-start_date')
+def _render_blackouts_list(request, item, error=None):
+    blackouts = RentalBlackout.objects.filter(item=item).order_by('-start_date')
     return django_render(request, 'rentals/partials/blackouts_list.html', {
         'item': item,
         'blackouts': blackouts,
+        'error': error,
     })
 
 
@@ -365,13 +487,16 @@ def _render_blackouts_list(request, item):
 @htmx_view('rentals/pages/blackout_add.html', 'rentals/partials/blackout_add_content.html')
 def blackout_add(request, pk):
     hub_id = request.session.get('hub_id')
-    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id, is_deleted=False)
+    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id)
     blackout = RentalBlackout(hub_id=hub_id)
     blackout.item = item
     blackout.start_date = request.POST.get('start_date') or None
     blackout.end_date = request.POST.get('end_date') or None
     blackout.reason = request.POST.get('reason', '').strip()
-    blackout.save()
+    try:
+        save_blackout(blackout)
+    except BookingError as e:
+        return _render_blackouts_list(request, item, error=str(e))
     return _render_blackouts_list(request, item)
 
 
@@ -379,8 +504,8 @@ def blackout_add(request, pk):
 @require_POST
 def blackout_delete(request, pk, blackout_pk):
     hub_id = request.session.get('hub_id')
-    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id, is_deleted=False)
-    blackout = get_object_or_404(RentalBlackout, pk=blackout_pk, item=item, is_deleted=False)
+    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id)
+    blackout = get_object_or_404(RentalBlackout, pk=blackout_pk, item=item)
     blackout.is_deleted = True
     blackout.deleted_at = timezone.now()
     blackout.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
@@ -390,14 +515,126 @@ def blackout_delete(request, pk, blackout_pk):
 @login_required
 def blackout_add_panel(request, pk):
     hub_id = request.session.get('hub_id')
-    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id, is_deleted=False)
+    item = get_object_or_404(RentalItem, pk=pk, hub_id=hub_id)
     return django_render(request, 'rentals/partials/blackout_add_content.html', {'item': item})
 
 
+# ======================================================================
+# Availability Calendar
+# ======================================================================
+
+CALENDAR_CHUNK_DAYS = 14
+CALENDAR_MAX_DAYS = 92
+# How far from today the calendar can be scrolled.
+CALENDAR_MAX_OFFSET = datetime.timedelta(days=10 * 366)
+
+
+def _date_param(request, name, default):
+    try:
+        return datetime.date.fromisoformat(request.GET.get(name, ''))
+    except ValueError:
+        return default
+
+
+def _calendar_level(units, quantity):
+    if units == occupancy.BLOCKED:
+        return 'blocked'
+    if not units:
+        return 0
+    return min(4, -(-units * 4 // max(quantity, 1)))
+
+
+def _calendar_context(hub_id, start, days):
+    items, rows = occupancy.hub_occupancy(hub_id, start, days)
+    dates = [start + datetime.timedelta(days=n) for n in range(days)]
+    return {
+        'start': start,
+        'dates': dates,
+        'next_start': start + datetime.timedelta(days=days),
+        'chunk_days': days,
+        'items': items,
+        'rows': [
+            (item, [
+                {'units': units, 'level': _calendar_level(units, item.quantity_total)}
+                for units in rows[item.pk]
+            ])
+            for item in items
+        ],
+    }
+
+
+@login_required
+@with_module_nav('rentals', 'calendar')
+@htmx_view('rentals/pages/calendar.html', 'rentals/partials/calendar_content.html')
+def calendar_view(request):
+    """
+    Occupancy heatmap: one row per item, one column per day.
+
+    The first chunk of days comes with the page; further chunks are
+    requested with ``chunk=1`` as the user scrolls right. ``start`` is
+    clamped to ``CALENDAR_MAX_OFFSET`` around today.
+    """
+    hub_id = request.session.get('hub_id')
+    today = timezone.localdate()
+    start = _date_param(request, 'start', today)
+    start = min(max(start, today - CALENDAR_MAX_OFFSET), today + CALENDAR_MAX_OFFSET)
+    try:
+        days = min(max(int(request.GET.get('days', CALENDAR_CHUNK_DAYS)), 1), CALENDAR_MAX_DAYS)
+    except ValueError:
+        days = CALENDAR_CHUNK_DAYS
+
+    if request.GET.get('chunk'):
+        return django_render(
+            request, 'rentals/partials/calendar_chunk.html', _calendar_context(hub_id, start, days),
+        )
+    return _calendar_context(hub_id, start, days)
+
+
+# ======================================================================
+# Analytics
+# ======================================================================
+
+ANALYTICS_DEFAULT_DAYS = 365
+ANALYTICS_MAX_DAYS = 3 * 366
+
+
+@login_required
+@with_module_nav('rentals', 'analytics')
+@htmx_view('rentals/pages/analytics.html', 'rentals/partials/analytics_content.html')
+def analytics_view(request):
+    """Utilisation, idle time and revenue per item, category or location over a period."""
+    hub_id = request.session.get('hub_id')
+    end = _date_param(request, 'end', timezone.localdate())
+    start = _date_param(request, 'start', end - datetime.timedelta(days=ANALYTICS_DEFAULT_DAYS - 1))
+    start = min(max(start, end - datetime.timedelta(days=ANALYTICS_MAX_DAYS - 1)), end)
+    group = request.GET.get('group', 'item')
+    if group not in analytics.GROUPS:
+        group = 'item'
+    data = analytics.report(hub_id, start, end, group)
+
+    if request.GET.get('export') == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="rentals_{group}_{start}_{end}.csv"'
+        columns = [
+            'label', 'units', 'unit_days', 'blocked_days', 'available_days', 'rented_days',
+            'idle_days', 'utilisation', 'revenue', 'revenue_per_unit',
+        ]
+        writer = csv.writer(response)
+        writer.writerow([group, *columns[1:]])
+        for row in data['rows']:
+            writer.writerow([row[column] for column in columns])
+        return response
+    return {**data, 'groups': analytics.GROUPS}
+
+
 @login_required
 @permission_required('rentals.manage_settings')
 @with_module_nav('rentals', 'settings')
 @htmx_view('rentals/pages/settings.html', 'rentals/partials/settings_content.html')
 def settings_view(request):
-    return {}
+    hub_id = request.session.get('hub_id')
+    return {
+        'fragment_cache': fragment_cache.stats(hub_id),
+        'timings': instrumentation.summary(hub_id),
+    }
 